@@ -0,0 +1,105 @@
+"""
+utils/preprocessing.py의 chunk 단위 create_aggregated_df와 기존 in-memory 구현 (concat + groupby)의 결과 일치 확인 및 시간 / 메모리 비교.
+
+기간이 서로 다르고 결측이 섞인 가상 hourly site 파일을 임시 폴더에 만들고
+    in-memory (기존)   : 모든 파일을 읽어 concat 후 groupby
+    chunked           : 파일을 chunk로 읽어 시각 격자 위에 누적 (순차, 기존과 bit 단위로 같아야 함)
+    chunked parallel  : 파일 묶음별로 process pool에서 누적 후 merge (반올림 오차 범위에서 같아야 함)
+을 실행한다. peak 메모리는 tracemalloc 기준 (현재 프로세스). 하나라도 다르면 exit code 1.
+
+    python benchmarks/aggregate_bench.py --sites 200 --years 2
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+# 현재 스크립트 위치를 기준으로 repo root 경로 추가
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../"))
+sys.path.append(parent_dir)
+
+import numpy as np
+import pandas as pd
+
+from utils.preprocessing import create_aggregated_df, create_aggregated_df_in_memory
+
+
+def generate_site(rng, years):
+    """시작 / 끝이 site마다 다르고 결측이 섞인 hourly site 데이터"""
+    start = pd.Timestamp('2018-01-01') + pd.Timedelta(days=int(rng.integers(0, 120)))
+    timestamps = pd.date_range(start, periods=int(years * 365 * 24 * rng.uniform(0.6, 1.0)), freq='h')
+    n = len(timestamps)
+    hour = timestamps.hour.values
+    ghi = np.clip(np.sin(np.pi * (hour - 6) / 12), 0, None) * 900 * rng.uniform(0.3, 1.0, n)
+    df = pd.DataFrame({
+        'timestamp': timestamps,
+        'Active_Power': np.round(ghi / 1000 * rng.uniform(10, 500), 3),
+        'Global_Horizontal_Radiation': ghi,
+        'Weather_Temperature_Celsius': 20 + 10 * np.sin(np.pi * (hour - 9) / 12) + rng.normal(0, 1, n),
+        'Wind_Speed': np.abs(rng.normal(3, 2, n)),
+    })
+    # 일부 site에만 있는 열
+    if rng.random() < 0.5:
+        df['Weather_Relative_Humidity'] = np.clip(50 + rng.normal(0, 20, n), 0, 100)
+    values = df.iloc[:, 1:].to_numpy(copy=True)
+    values[rng.random(values.shape) < 0.02] = np.nan
+    df.iloc[:, 1:] = values
+    return df
+
+
+def measure(func, *args, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chunked create_aggregated_df vs in-memory concat + groupby')
+    parser.add_argument('--sites', type=int, default=100)
+    parser.add_argument('--years', type=float, default=2)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=4, help='processes for the parallel run')
+    parser.add_argument('--seed', type=int, default=2021)
+    parser.add_argument('--work_dir', type=str, default=None, help='directory for the site files; default: temporary directory')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    csv_dir = args.work_dir or tempfile.mkdtemp(prefix='aggregate_bench_')
+    os.makedirs(csv_dir, exist_ok=True)
+    start = time.perf_counter()
+    rows = 0
+    for i in range(args.sites):
+        df = generate_site(rng, args.years)
+        df.to_csv(os.path.join(csv_dir, f'site_{i:04d}.csv'), index=False)
+        rows += len(df)
+    print(f"generated {args.sites} sites, {rows} rows in {time.perf_counter() - start:.1f}s ({csv_dir})")
+
+    file_paths = [os.path.join(csv_dir, f) for f in sorted(os.listdir(csv_dir)) if f.endswith('.csv')]
+    expected, elapsed, peak = measure(create_aggregated_df_in_memory, file_paths)
+    print(f"{'in-memory':<18}{elapsed:>8.2f}s {peak:>9.1f} MB")
+    mismatches = 0
+    for name, kwargs in (('chunked', {}), ('chunked parallel', {'workers': args.workers})):
+        result, elapsed, peak = measure(create_aggregated_df, csv_dir, chunksize=args.chunksize, **kwargs)
+        print(f"{name:<18}{elapsed:>8.2f}s {peak:>9.1f} MB")
+        try:
+            pd.testing.assert_frame_equal(expected, result, check_exact='workers' not in kwargs)
+        except AssertionError as e:
+            mismatches += 1
+            print(f"{name}: mismatch\n{e}")
+
+    if args.work_dir is None:
+        shutil.rmtree(csv_dir, ignore_errors=True)
+    if mismatches:
+        print(f"{mismatches} mismatches")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+utils/anomaly.py (NumPy run-length) 와 2_drop_anomaly.py의 pandas 검출 함수의 결과 일치 확인 및 속도 비교.
+
+여러 해 / 여러 site의 가상 hourly PV 데이터에 결측 구간, 같은 값이 반복되는 고장 구간, 범위 밖 값을 심고
+site마다 두 구현을 실행해 row mask가 같은지 확인한다. 하나라도 다르면 exit code 1.
+
+    python benchmarks/anomaly_bench.py --sites 50 --years 3
+"""
+import os
+import sys
+import time
+import argparse
+
+# 현재 스크립트 위치를 기준으로 repo root 경로 추가
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../"))
+sys.path.append(parent_dir)
+
+import numpy as np
+import pandas as pd
+
+from utils import anomaly
+from utils.preprocessing import DEFAULT_RANGES
+
+
+# 2_drop_anomaly.py의 기존 구현 (비교 기준)
+def detect_consecutive_nans(df, max_consecutive=2):
+    mask = pd.DataFrame(False, index=df.index, columns=df.columns)
+    for col in df.columns:
+        is_nan = df[col].isna()
+        nan_consecutive = is_nan.rolling(window=max_consecutive, min_periods=max_consecutive).sum() == max_consecutive
+        mask[col] = nan_consecutive
+    return mask.any(axis=1)
+
+
+def detect_consecutive_identical_values(df, column, min_consecutive=10):
+    mask = (df[column] != 0) & (df[column] == df[column].shift(1))
+    count_series = mask.groupby(mask.ne(mask.shift()).cumsum()).cumsum()
+    return count_series >= min_consecutive
+
+
+def detect_out_of_range(df, ranges):
+    mask = pd.DataFrame(False, index=df.index, columns=list(ranges))
+    for column, (low, high) in ranges.items():
+        if low is not None:
+            mask[column] |= df[column] < low
+        if high is not None:
+            mask[column] |= df[column] > high
+    return mask
+
+
+def generate_site(rng, years):
+    """결측 / 고장 / 범위 밖 값이 섞인 hourly site 데이터"""
+    timestamps = pd.date_range('2018-01-01', periods=years * 365 * 24, freq='h')
+    n = len(timestamps)
+    hour = timestamps.hour.values
+    ghi = np.clip(np.sin(np.pi * (hour - 6) / 12), 0, None) * 900 * np.repeat(rng.uniform(0.3, 1.0, n // 24 + 1), 24)[:n]
+    power = np.round(ghi / 1000 * rng.uniform(0.9, 1.0, n) * 50, 2)
+    df = pd.DataFrame({
+        'timestamp': timestamps,
+        'Active_Power': power,
+        'Global_Horizontal_Radiation': ghi,
+        'Weather_Temperature_Celsius': 20 + 10 * np.sin(np.pi * (hour - 9) / 12) + rng.normal(0, 1, n),
+        'Weather_Relative_Humidity': 50 + rng.normal(0, 25, n),
+        'Wind_Speed': rng.normal(3, 2, n),
+    })
+    df['Normalized_Active_Power'] = df['Active_Power'] / df['Active_Power'].max()
+
+    # 같은 값이 이어지는 고장 구간 (5~40시간)
+    for start in rng.integers(0, n - 40, n // 500):
+        df.iloc[start:start + rng.integers(5, 40), 1] = df.iloc[start, 1] or 1.0
+    # 결측 (1~5시간 구간) 과 범위 밖 값
+    values = df.iloc[:, 1:].to_numpy()
+    for start in rng.integers(0, n - 5, n // 100):
+        values[start:start + rng.integers(1, 6), rng.integers(0, values.shape[1])] = np.nan
+    values[rng.integers(0, n, n // 200), 1] = 2500
+    df.iloc[:, 1:] = values
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NumPy run-length anomaly detection vs pandas reference')
+    parser.add_argument('--sites', type=int, default=30)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--nan_run', type=int, default=2)
+    parser.add_argument('--identical_run', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=2021)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    sites = [generate_site(rng, args.years) for _ in range(args.sites)]
+    print(f"generated {args.sites} sites x {len(sites[0])} rows in {time.perf_counter() - start:.1f}s")
+
+    elapsed = {'pandas': 0.0, 'numpy': 0.0}
+    mismatches = 0
+    totals = {'nan_run': 0, 'identical_run': 0, 'range': 0}
+    for i, df in enumerate(sites):
+        start = time.perf_counter()
+        expected_nan = detect_consecutive_nans(df, args.nan_run).to_numpy()
+        expected_identical = detect_consecutive_identical_values(df, 'Active_Power', args.identical_run).to_numpy()
+        expected_range = detect_out_of_range(df, DEFAULT_RANGES).to_numpy()
+        elapsed['pandas'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        runs = anomaly.detect_anomalies(df, DEFAULT_RANGES, args.nan_run, args.identical_run)
+        nan_mask = runs['nan_run'].row_mask(len(df))
+        identical_mask = runs['identical_run'].row_mask(len(df))
+        range_mask = runs['range'].mask(len(df))
+        elapsed['numpy'] += time.perf_counter() - start
+
+        for rule, expected, actual in (('nan_run', expected_nan, nan_mask),
+                                       ('identical_run', expected_identical, identical_mask),
+                                       ('range', expected_range, range_mask)):
+            if not np.array_equal(expected, actual):
+                mismatches += 1
+                print(f"site {i}: {rule} mismatch ({int((expected != actual).sum())} cells)")
+        totals['nan_run'] += int(nan_mask.sum())
+        totals['identical_run'] += runs['identical_run'].count()
+        totals['range'] += runs['range'].count()
+
+    print(f"flagged rows / cells: " + ', '.join(f'{rule} {count}' for rule, count in totals.items()))
+    print(f"pandas {elapsed['pandas']:.3f}s, numpy {elapsed['numpy']:.3f}s "
+          f"({elapsed['pandas'] / max(elapsed['numpy'], 1e-9):.1f}x)")
+    if mismatches:
+        print(f"{mismatches} mismatches")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import argparse
+import subprocess
+
+# 현재 스크립트 위치를 기준으로 repo root 경로 추가
+script_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(script_dir, "../"))
+sys.path.append(parent_dir)
+
+import torch
+
+# run_longExp.py의 모델 관련 기본값
+DEFAULT_CONFIG = {
+    'seq_len': 240, 'label_len': 0, 'pred_len': 24,
+    'enc_in': 5, 'dec_in': 5, 'c_out': 1,
+    'd_model': 512, 'n_heads': 8, 'e_layers': 2, 'd_layers': 1, 'd_ff': 2048,
+    'moving_avg': 25, 'factor': 1, 'distil': True, 'dropout': 0.05,
+    'embed': 'timeF', 'embed_type': 0, 'activation': 'gelu', 'output_attention': False, 'freq': 'h',
+    'fc_dropout': 0.05, 'head_dropout': 0.0, 'patch_len': 16, 'stride': 8, 'padding_patch': 'end',
+    'revin': 1, 'affine': 0, 'subtract_last': 0, 'decomposition': 0, 'kernel_size': 25, 'individual': 1,
+    'target_only': False,
+    'input_dim': 5, 'hidden_dim': 128, 'num_layers': 2, 'bidirectional': True,
+}
+
+# Exp_Main과 같은 기준으로 (x, transfer_flag)만 받는 모델
+SIMPLE_MODELS = ('DLinear', 'Linear', 'NLinear', 'PatchTST', 'LSTM')
+
+
+def make_config(model, **overrides):
+    config = dict(DEFAULT_CONFIG, model=model)
+    config.update(overrides)
+    return argparse.Namespace(**config)
+
+
+def build_model(config, device):
+    from models import Informer, Autoformer, Transformer, DLinear, Linear, NLinear, PatchTST, LSTM
+    model_dict = {
+        'Autoformer': Autoformer,
+        'Transformer': Transformer,
+        'Informer': Informer,
+        'DLinear': DLinear,
+        'NLinear': NLinear,
+        'Linear': Linear,
+        'PatchTST': PatchTST,
+        'LSTM': LSTM,
+    }
+    return model_dict[config.model].Model(config).float().to(device)
+
+
+def synthetic_batch(config, batch_size, device, n_marks=4):
+    """dataset과 같은 shape의 임의 배치 (seq_x, seq_y, seq_x_mark, seq_y_mark)"""
+    y_len = config.label_len + config.pred_len
+    return (torch.randn(batch_size, config.seq_len, config.enc_in, device=device),
+            torch.randn(batch_size, y_len, config.enc_in, device=device),
+            torch.randn(batch_size, config.seq_len, n_marks, device=device),
+            torch.randn(batch_size, y_len, n_marks, device=device))
+
+
+def forward(model, config, batch, transfer_flag=False):
+    """Exp_Main.train과 같은 방식으로 모델을 호출하고 target 채널 예측만 반환"""
+    batch_x, batch_y, batch_x_mark, batch_y_mark = batch
+    if config.model in SIMPLE_MODELS:
+        outputs = model(batch_x, transfer_flag)
+    else:
+        dec_inp = torch.zeros_like(batch_y[:, -config.pred_len:, :])
+        dec_inp = torch.cat([batch_y[:, :config.label_len, :], dec_inp], dim=1)
+        outputs = model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
+    return outputs[:, -config.pred_len:, -1:]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=parent_dir,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
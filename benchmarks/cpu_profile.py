@@ -0,0 +1,120 @@
+"""
+CPU 학습 설정별 처리량 비교.
+
+같은 모델/배치 설정에서 fp32 eager를 기준으로 bf16 autocast, torch.compile 조합의 train steps/sec를 잰다.
+
+    python benchmarks/cpu_profile.py --model PatchTST --d_model 128 --threads 8
+    python benchmarks/cpu_profile.py --model DLinear --modes fp32_eager,bf16_eager --output cpu_profile.json
+"""
+import json
+import time
+import argparse
+import contextlib
+
+from common import make_config, build_model, synthetic_batch, forward, git_revision
+
+import torch
+import torch.nn as nn
+
+MODES = {
+    # name: (autocast dtype, compile)
+    'fp32_eager': (None, False),
+    'bf16_eager': (torch.bfloat16, False),
+    'fp32_compile': (None, True),
+    'bf16_compile': (torch.bfloat16, True),
+}
+
+
+def measure(config, mode, batch_size, steps, warmup, device):
+    amp_dtype, compile_model = MODES[mode]
+    torch.manual_seed(0)
+    model = build_model(config, device)
+    if compile_model:
+        model.compile()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+    criterion = nn.MSELoss()
+    batch = synthetic_batch(config, batch_size, device)
+    target = batch[1][:, -config.pred_len:, -1:]
+
+    def autocast():
+        if amp_dtype is None:
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=device.type, dtype=amp_dtype)
+
+    def step():
+        optimizer.zero_grad()
+        with autocast():
+            loss = criterion(forward(model, config, batch).float(), target)
+        loss.backward()
+        optimizer.step()
+
+    model.train()
+    # warmup에는 torch.compile의 첫 컴파일 시간이 포함됨
+    for _ in range(warmup):
+        step()
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    elapsed = time.perf_counter() - start
+    return steps / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CPU training throughput: fp32 eager vs bf16 autocast / torch.compile')
+    parser.add_argument('--model', type=str, default='PatchTST')
+    parser.add_argument('--d_model', type=int, default=128)
+    parser.add_argument('--n_heads', type=int, default=8)
+    parser.add_argument('--e_layers', type=int, default=2)
+    parser.add_argument('--d_ff', type=int, default=256)
+    parser.add_argument('--seq_len', type=int, default=240)
+    parser.add_argument('--pred_len', type=int, default=24)
+    parser.add_argument('--batch_size', type=int, default=128)
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=0, help='torch.set_num_threads; 0: torch default')
+    parser.add_argument('--interop_threads', type=int, default=0, help='torch.set_num_interop_threads; 0: torch default')
+    parser.add_argument('--modes', type=str, default=','.join(MODES), help=f'comma separated subset of {list(MODES)}')
+    parser.add_argument('--output', type=str, default=None, help='write the report as JSON')
+    args = parser.parse_args()
+
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    if args.interop_threads > 0:
+        torch.set_num_interop_threads(args.interop_threads)
+
+    device = torch.device('cpu')
+    config = make_config(args.model, d_model=args.d_model, n_heads=args.n_heads, e_layers=args.e_layers,
+                         d_ff=args.d_ff, seq_len=args.seq_len, pred_len=args.pred_len)
+    modes = args.modes.split(',')
+    if 'fp32_eager' not in modes:
+        modes.insert(0, 'fp32_eager')  # 비교 기준
+
+    results = {}
+    for mode in modes:
+        results[mode] = measure(config, mode, args.batch_size, args.steps, args.warmup, device)
+
+    baseline = results['fp32_eager']
+    print(f"{args.model} d_model={args.d_model} e_layers={args.e_layers} batch={args.batch_size} "
+          f"threads={torch.get_num_threads()} interop={torch.get_num_interop_threads()}")
+    print(f"{'mode':<14}{'steps/s':>10}{'speedup':>10}")
+    for mode, steps_per_sec in results.items():
+        print(f"{mode:<14}{steps_per_sec:>10.2f}{steps_per_sec / baseline:>9.2f}x")
+
+    if args.output:
+        report = {
+            'git_revision': git_revision(),
+            'torch': torch.__version__,
+            'threads': torch.get_num_threads(),
+            'interop_threads': torch.get_num_interop_threads(),
+            'config': vars(config),
+            'batch_size': args.batch_size,
+            'steps': args.steps,
+            'steps_per_sec': results,
+            'speedup_vs_fp32_eager': {mode: v / baseline for mode, v in results.items()},
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
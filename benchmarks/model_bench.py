@@ -0,0 +1,187 @@
+"""
+모델별 CPU 성능 측정 (forward latency p50/p99, train step throughput, peak memory, params, FLOPs).
+
+model / seq_len / pred_len / batch_size, PatchTST 구조 (n_heads, e_layers, d_model, d_ff, patch_len) 조합을 sweep 하고
+결과를 git revision과 함께 JSON으로 저장한다. --compare로 이전 결과와 비교해 regression이 있으면 exit code 1.
+
+    python benchmarks/model_bench.py --models PatchTST,DLinear --batch_sizes 32,128 --output bench.json
+    python benchmarks/model_bench.py --models PatchTST --d_model 128,256 --e_layers 2,3 --compare bench.json
+
+각 설정은 별도 프로세스에서 실행되어 peak RSS가 이전 설정의 영향을 받지 않는다.
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import itertools
+import multiprocessing as mp
+
+from common import make_config, build_model, synthetic_batch, forward, git_revision
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+# 설정 key (compare 시 같은 설정끼리 매칭)
+CONFIG_KEYS = ('model', 'seq_len', 'pred_len', 'batch_size', 'n_heads', 'e_layers', 'd_model', 'd_ff', 'patch_len')
+# PatchTST 외 모델은 구조 sweep 없이 첫 번째 값만 사용
+PATCHTST_SWEEP = ('n_heads', 'e_layers', 'd_model', 'd_ff', 'patch_len')
+
+
+def count_flops(model, config, batch):
+    """forward 1회의 FLOPs (torch.utils.flop_counter가 없으면 None)"""
+    try:
+        from torch.utils.flop_counter import FlopCounterMode
+    except ImportError:
+        return None
+    counter = FlopCounterMode(display=False)
+    with torch.no_grad(), counter:
+        forward(model, config, batch)
+    return counter.get_total_flops()
+
+
+def run_config(setting, iters, warmup, threads):
+    """설정 하나를 측정 (자식 프로세스에서 실행)"""
+    if threads > 0:
+        torch.set_num_threads(threads)
+    torch.manual_seed(0)
+    device = torch.device('cpu')
+    batch_size = setting['batch_size']
+    config = make_config(**{k: v for k, v in setting.items() if k != 'batch_size'})
+    if config.model == 'PatchTST':
+        config.stride = config.patch_len // 2
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    model = build_model(config, device)
+    batch = synthetic_batch(config, batch_size, device)
+    target = batch[1][:, -config.pred_len:, -1:]
+    result = dict(setting)
+    result['params'] = sum(p.numel() for p in model.parameters())
+    result['flops'] = count_flops(model.eval(), config, batch)
+
+    # forward latency (eval, no_grad)
+    latencies = []
+    with torch.no_grad():
+        for it in range(warmup + iters):
+            start = time.perf_counter()
+            forward(model, config, batch)
+            if it >= warmup:
+                latencies.append(time.perf_counter() - start)
+    result['latency_p50_ms'] = float(np.percentile(latencies, 50) * 1e3)
+    result['latency_p99_ms'] = float(np.percentile(latencies, 99) * 1e3)
+
+    # train step throughput
+    model.train()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-4)
+    criterion = nn.MSELoss()
+    for it in range(warmup + iters):
+        if it == warmup:
+            start = time.perf_counter()
+        optimizer.zero_grad()
+        loss = criterion(forward(model, config, batch), target)
+        loss.backward()
+        optimizer.step()
+    elapsed = time.perf_counter() - start
+    result['train_samples_per_sec'] = iters * batch_size / elapsed
+
+    # Linux에서 ru_maxrss 단위는 KB
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result['peak_rss_mb'] = peak_rss
+    result['peak_rss_delta_mb'] = peak_rss - base_rss
+    return result
+
+
+def sweep(args):
+    def ints(value):
+        return [int(v) for v in value.split(',')]
+
+    grid = {
+        'seq_len': ints(args.seq_lens), 'pred_len': ints(args.pred_lens), 'batch_size': ints(args.batch_sizes),
+        'n_heads': ints(args.n_heads), 'e_layers': ints(args.e_layers), 'd_model': ints(args.d_model),
+        'd_ff': ints(args.d_ff), 'patch_len': ints(args.patch_len),
+    }
+    settings = []
+    for model in args.models.split(','):
+        model_grid = {k: (v if model == 'PatchTST' or k not in PATCHTST_SWEEP else v[:1]) for k, v in grid.items()}
+        for values in itertools.product(*model_grid.values()):
+            settings.append(dict(model=model, **dict(zip(model_grid, values))))
+    return settings
+
+
+def config_key(result):
+    return tuple(result[k] for k in CONFIG_KEYS)
+
+
+def compare(results, baseline_path, threshold):
+    """baseline 대비 latency p50 증가 / throughput 감소가 threshold를 넘는 설정 목록"""
+    with open(baseline_path) as f:
+        baseline = {config_key(r): r for r in json.load(f)['results']}
+    regressions = []
+    print(f"\nCompared with {baseline_path} (threshold {threshold:.0%})")
+    for r in results:
+        base = baseline.get(config_key(r))
+        if base is None:
+            continue
+        latency = r['latency_p50_ms'] / base['latency_p50_ms'] - 1
+        throughput = r['train_samples_per_sec'] / base['train_samples_per_sec'] - 1
+        regressed = latency > threshold or -throughput > threshold
+        print(f"{r['model']:<12}{str(config_key(r)[1:]):<44} latency {latency:+7.1%}  throughput {throughput:+7.1%}"
+              + ('  REGRESSION' if regressed else ''))
+        if regressed:
+            regressions.append(r)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model latency / throughput benchmark on CPU')
+    parser.add_argument('--models', type=str, default='DLinear,NLinear,Linear,PatchTST,LSTM,Transformer,Informer,Autoformer')
+    parser.add_argument('--seq_lens', type=str, default='240')
+    parser.add_argument('--pred_lens', type=str, default='24')
+    parser.add_argument('--batch_sizes', type=str, default='32')
+    parser.add_argument('--n_heads', type=str, default='8', help='PatchTST sweep (comma separated)')
+    parser.add_argument('--e_layers', type=str, default='2', help='PatchTST sweep (comma separated)')
+    parser.add_argument('--d_model', type=str, default='128', help='PatchTST sweep (comma separated)')
+    parser.add_argument('--d_ff', type=str, default='256', help='PatchTST sweep (comma separated)')
+    parser.add_argument('--patch_len', type=str, default='16', help='PatchTST sweep (comma separated)')
+    parser.add_argument('--iters', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=0, help='torch.set_num_threads; 0: torch default')
+    parser.add_argument('--output', type=str, default=None, help='write the report as JSON')
+    parser.add_argument('--compare', type=str, default=None, help='previous report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown counted as a regression')
+    args = parser.parse_args()
+
+    settings = sweep(args)
+    results = []
+    ctx = mp.get_context('spawn')
+    print(f"{'model':<12}{'config':<44}{'p50 ms':>9}{'p99 ms':>9}{'train/s':>10}{'RSS MB':>9}{'params':>11}{'GFLOPs':>9}")
+    for setting in settings:
+        # 설정마다 새 프로세스 (peak RSS 분리)
+        with ctx.Pool(1) as pool:
+            r = pool.apply(run_config, (setting, args.iters, args.warmup, args.threads))
+        results.append(r)
+        flops = f"{r['flops'] / 1e9:.2f}" if r['flops'] is not None else '-'
+        print(f"{r['model']:<12}{str(config_key(r)[1:]):<44}{r['latency_p50_ms']:>9.2f}{r['latency_p99_ms']:>9.2f}"
+              f"{r['train_samples_per_sec']:>10.1f}{r['peak_rss_mb']:>9.0f}{r['params']:>11}{flops:>9}")
+
+    if args.output:
+        report = {
+            'git_revision': git_revision(),
+            'torch': torch.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'threads': args.threads if args.threads > 0 else torch.get_num_threads(),
+            'iters': args.iters,
+            'results': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
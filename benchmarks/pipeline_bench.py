@@ -0,0 +1,241 @@
+"""
+run_longExp.py 경로 전체의 단계별 시간 / 메모리 측정과 baseline 대비 regression 검사.
+
+고정 seed로 만든 DKASC 형식의 가상 PV 데이터셋 위에서 다음 단계를 순서대로 실행한다.
+    dataset_cold   : data_provider로 train/val/test dataset 생성 (cache / scaler 없음)
+    dataset_warm   : 같은 dataset을 cache가 있는 상태에서 다시 생성
+    train          : Exp_Main.train 1 epoch (dataset 생성, validation, checkpoint 저장 포함)
+    vali           : Exp_Main.vali
+    test           : Exp_Main.test (MetricEvaluator, site_metrics.txt 저장 포함)
+    checkpoint_io  : 전체 학습 상태 저장 (CheckpointManager) + 로드
+
+    python benchmarks/pipeline_bench.py --save_baseline pipeline_baseline.json
+    python benchmarks/pipeline_bench.py --baseline pipeline_baseline.json --threshold 0.2
+
+단계별 peak RSS는 그 단계 동안 background thread가 /proc/self/statm을 주기적으로 읽은 최댓값이고
+(ru_maxrss는 process 전체 기간의 최댓값이라 앞 단계의 peak가 뒤 단계로 이어진다)
+rss_delta_mb는 단계 시작 대비 끝의 현재 RSS 차이이다.
+
+--baseline이 주어지면 어느 단계든 시간이 threshold (상대) 와 min_delta (초) 를 모두 넘게 늘거나
+peak RSS가 mem_threshold를 넘게 늘면 exit code 1로 끝난다.
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import argparse
+import tempfile
+import threading
+
+from common import parent_dir, git_revision
+
+import numpy as np
+import pandas as pd
+import torch
+
+from utils.profiler import current_rss_mb
+
+STAGES = ('dataset_cold', 'dataset_warm', 'train', 'vali', 'test', 'checkpoint_io')
+
+INPUT_CHANNELS = ['Global_Horizontal_Radiation', 'Weather_Temperature_Celsius',
+                  'Weather_Relative_Humidity', 'Wind_Speed', 'Active_Power']
+
+# 작은 PatchTST로 1 epoch (--exp_args로 덮어쓸 수 있음)
+DEFAULT_EXP_ARGS = ('--model PatchTST --data DKASC --data_type all --d_model 64 --n_heads 4 --e_layers 2 --d_ff 128 '
+                    '--batch_size 64 --num_workers 0 --train_epochs 1 --lradj TST')
+
+
+def generate_dataset(root_path, data_type, days, seed):
+    """DKASC split에 쓰이는 installation마다 hourly CSV를 생성 (같은 seed면 항상 같은 파일)"""
+    from data_provider.data_factory import split_configs
+
+    mapping = pd.read_csv(os.path.join(parent_dir, 'data_provider', 'DKASC_mapping', f'mapping_{data_type}.csv'))
+    mapping = mapping[mapping['dataset'] == 'DKASC']
+    file_names = dict(zip(mapping['mapping_name'].map(lambda x: int(x.split('_')[0])), mapping['original_name']))
+    inst_ids = sorted({i for split in split_configs['DKASC'].values() for i in split})
+
+    os.makedirs(root_path, exist_ok=True)
+    timestamps = pd.date_range('2020-01-01', periods=days * 24, freq='h')
+    hour = timestamps.hour.values
+    day_of_year = timestamps.dayofyear.values
+    for inst_id in inst_ids:
+        rng = np.random.default_rng(seed + inst_id)
+        capacity = float(file_names[inst_id].split('_')[0])
+        clear_sky = np.clip(np.sin(np.pi * (hour - 6) / 12), 0, None) * (900 + 100 * np.cos(2 * np.pi * day_of_year / 365))
+        cloud = np.repeat(rng.uniform(0.3, 1.0, days), 24)
+        ghi = clear_sky * cloud
+        df = pd.DataFrame({
+            'timestamp': timestamps,
+            'Global_Horizontal_Radiation': ghi,
+            'Weather_Temperature_Celsius': 20 + 10 * np.sin(np.pi * (hour - 9) / 12) + rng.normal(0, 1, len(hour)),
+            'Weather_Relative_Humidity': np.clip(50 - 20 * np.sin(np.pi * (hour - 9) / 12) + rng.normal(0, 5, len(hour)), 0, 100),
+            'Wind_Speed': np.abs(rng.normal(3, 1.5, len(hour))),
+            'Active_Power': capacity * ghi / 1000 * rng.uniform(0.9, 1.0, len(hour)),
+        })
+        df.to_csv(os.path.join(root_path, file_names[inst_id]), index=False)
+    return len(inst_ids)
+
+
+class RSSSampler:
+    """start()부터 stop()까지 현재 RSS를 interval초마다 읽어 단계별 peak와 시작 대비 증가량을 구한다"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.start_rss = self.peak_rss = 0.0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, current_rss_mb() or 0.0)
+
+    def start(self):
+        self.start_rss = self.peak_rss = current_rss_mb() or 0.0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        end_rss = current_rss_mb() or 0.0
+        self.peak_rss = max(self.peak_rss, end_rss)
+        return self.peak_rss, end_rss - self.start_rss
+
+
+def run_pipeline(args, root_path, ckpt_dir):
+    """한 번 실행하고 {stage: {'sec', 'peak_rss_mb', 'rss_delta_mb'}} 반환"""
+    from run_longExp import get_parser
+    from data_provider.data_factory import data_provider
+    from exp.exp_main import Exp_Main
+    from utils.checkpoint import CheckpointManager
+
+    exp_args = get_parser().parse_args(shlex.split(DEFAULT_EXP_ARGS) + shlex.split(args.exp_args) +
+                                       ['--root_path', root_path, '--random_seed', str(args.seed)])
+    torch.manual_seed(exp_args.random_seed)
+    np.random.seed(exp_args.random_seed)
+    results = {}
+    sampler = RSSSampler()
+
+    def begin():
+        sampler.start()
+        return time.perf_counter()
+
+    def record(stage, start):
+        sec = time.perf_counter() - start
+        peak, delta = sampler.stop()
+        results[stage] = {'sec': sec, 'peak_rss_mb': peak, 'rss_delta_mb': delta}
+        print(f"[pipeline] {stage}: {sec:.3f}s, peak RSS {peak:.0f} MB ({delta:+.0f} MB)")
+
+    for sub in ('cache', 'scalers'):
+        shutil.rmtree(os.path.join(root_path, sub), ignore_errors=True)
+    for stage in ('dataset_cold', 'dataset_warm'):
+        start = begin()
+        for flag in ('train', 'val', 'test'):
+            data_provider(exp_args, flag)
+        record(stage, start)
+
+    exp = Exp_Main(exp_args)
+    start = begin()
+    exp.train(output_dir=ckpt_dir)
+    record('train', start)
+
+    _, vali_loader = exp._get_data(flag='val')
+    criterion = exp._select_criterion()
+    start = begin()
+    exp.vali(vali_loader, criterion)
+    record('vali', start)
+
+    start = begin()
+    exp.test(source_model_dir=ckpt_dir)
+    record('test', start)
+
+    optimizer = exp._select_optimizer()
+    start = begin()
+    manager = CheckpointManager(ckpt_dir)
+    manager.save('bench_state.pth', {'model': exp.model.state_dict(), 'optimizer': optimizer.state_dict()})
+    manager.close()
+    torch.load(os.path.join(ckpt_dir, 'bench_state.pth'), map_location='cpu')
+    record('checkpoint_io', start)
+    return results
+
+
+def check_regressions(results, baseline, threshold, min_delta, mem_threshold):
+    regressions = []
+    print(f"\n{'stage':<15}{'sec':>9}{'base':>9}{'change':>9}{'RSS MB':>9}{'base':>9}{'delta':>9}")
+    for stage in STAGES:
+        if stage not in baseline:
+            continue
+        cur, base = results[stage], baseline[stage]
+        change = cur['sec'] / base['sec'] - 1 if base['sec'] > 0 else 0.0
+        slow = change > threshold and cur['sec'] - base['sec'] > min_delta
+        heavy = cur['peak_rss_mb'] > base['peak_rss_mb'] * (1 + mem_threshold)
+        print(f"{stage:<15}{cur['sec']:>9.3f}{base['sec']:>9.3f}{change:>+9.1%}{cur['peak_rss_mb']:>9.0f}{base['peak_rss_mb']:>9.0f}{cur['rss_delta_mb']:>+9.0f}"
+              + ('  TIME REGRESSION' if slow else '') + ('  MEMORY REGRESSION' if heavy else ''))
+        if slow or heavy:
+            regressions.append(stage)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end pipeline benchmark with baseline regression check')
+    parser.add_argument('--days', type=int, default=60, help='days of hourly data per installation')
+    parser.add_argument('--seed', type=int, default=2021)
+    parser.add_argument('--work_dir', type=str, default=None, help='dataset / checkpoint directory; default: temporary directory')
+    parser.add_argument('--repeat', type=int, default=1, help='run the pipeline N times and keep the median per stage')
+    parser.add_argument('--exp_args', type=str, default='', help=f'extra run_longExp.py arguments (defaults: "{DEFAULT_EXP_ARGS}")')
+    parser.add_argument('--baseline', type=str, default=None, help='baseline JSON to compare against')
+    parser.add_argument('--save_baseline', type=str, default=None, help='write this run as a baseline JSON')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown counted as a regression')
+    parser.add_argument('--min_delta', type=float, default=0.05, help='ignore slowdowns smaller than this many seconds')
+    parser.add_argument('--mem_threshold', type=float, default=0.2, help='relative peak RSS growth counted as a regression')
+    args = parser.parse_args()
+
+    # mapping 파일 등 repo 기준 상대 경로를 쓰므로 repo root에서 실행
+    os.chdir(parent_dir)
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='pipeline_bench_')
+    root_path = os.path.join(work_dir, 'data')
+    ckpt_dir = os.path.join(work_dir, 'checkpoints')
+    os.makedirs(ckpt_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    n_inst = generate_dataset(root_path, 'all', args.days, args.seed)
+    print(f"[pipeline] generated {n_inst} installations x {args.days} days in {time.perf_counter() - start:.1f}s ({root_path})")
+
+    runs = [run_pipeline(args, root_path, ckpt_dir) for _ in range(args.repeat)]
+    results = {stage: {key: float(np.median([run[stage][key] for run in runs])) for key in ('sec', 'peak_rss_mb', 'rss_delta_mb')}
+               for stage in STAGES}
+
+    if args.save_baseline:
+        report = {
+            'git_revision': git_revision(),
+            'torch': torch.__version__,
+            'days': args.days,
+            'seed': args.seed,
+            'exp_args': args.exp_args,
+            'rss': 'per_stage',
+            'stages': results,
+        }
+        with open(args.save_baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.work_dir is None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get('days'), baseline.get('exp_args')) != (args.days, args.exp_args):
+            print(f"Warning: baseline was recorded with days={baseline.get('days')}, exp_args='{baseline.get('exp_args')}'")
+        if baseline.get('rss') != 'per_stage':
+            print("Warning: baseline peak RSS is the process-lifetime ru_maxrss; re-record it for per-stage memory checks")
+        regressions = check_regressions(results, baseline['stages'], args.threshold, args.min_delta, args.mem_threshold)
+        if regressions:
+            print(f"\nRegressed stages: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
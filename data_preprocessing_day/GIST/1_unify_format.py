@@ -5,7 +5,7 @@ import pandas as pd
 from datetime import timedelta
 
 from tqdm import tqdm
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
 # 현재 파일에서 두 단계 상위 디렉토리를 sys.path에 추가
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(os.path.dirname(__file__)))))
 
@@ -23,82 +23,81 @@ def remove_directory_if_exists(dir_path):
     else:
         print(f"Directory not found or not a directory: {dir_path}")
 
-def combine_into_each_site(file_list, index_of_site,
-                           kor_name, eng_name,
-                           weather_data,
-                           save_dir):
-    os.makedirs(save_dir, exist_ok=True)
-    preprocessed_df = pd.DataFrame(columns=['date', 'time', 'Active_Power', 'Global_Horizontal_Radiation', 'Weather_Temperature_Celsius', 'Weather_Relative_Humidity', 'Weend_Speed'])
-    
+def load_weather_by_date(weather_data):
+    """기상 데이터를 한 번만 읽어 날짜별 DataFrame으로 나눠 둠 (모든 site가 공유)"""
     weather_info = pd.read_csv(weather_data, encoding='unicode_escape')
     weather_info.columns = ['datetime', 'temperature', 'wind_speed', 'precipitation', 'humidity']
     weather_info['datetime'] = pd.to_datetime(weather_info['datetime'])
-    # print(weather_info)
+    return {date: daily.reset_index(drop=True) for date, daily in weather_info.groupby(weather_info['datetime'].dt.date)}
+
 
+def parse_daily_pv_file(file, kor_names):
+    """
+    일별 PV csv 하나를 읽어 (날짜, 행 수, 일사량, {site 한글 이름: 발전량}) 반환. 파일에 없는 site는 빠진다.
+    모든 site를 한 번에 꺼내므로 파일마다 한 번만 읽으면 된다 (process pool worker에서 실행)
+    """
     # Define file paths for storing outliers
     env_columns = ['datetime', 'Global_Horizontal_Radiation', 'Weather_Temperature_Celsius', 'Direct_Normal_Irradiance', 'Module_Temperature_Celsius', ]
 
-    empty_rows = pd.concat([pd.DataFrame(preprocessed_df.columns)]*24, axis=1).T
-    empty_rows.columns = preprocessed_df.columns
-
-    for i, file in tqdm(enumerate(file_list), total=len(file_list), desc=f'Processing {kor_name}. Out of {index_of_site+1}/16'):
-        # read pv info
-        daily_pv_data = pd.read_csv(file)
-        daily_pv_data.columns = daily_pv_data.iloc[0]
-        daily_pv_data.columns.values[:len(env_columns)] = env_columns
-        daily_pv_data = daily_pv_data.drop([0, 1, 2])
-        daily_pv_data = daily_pv_data.reset_index(drop=True)
-
-        if kor_name not in daily_pv_data.columns:
-            continue
+    daily_pv_data = pd.read_csv(file)
+    daily_pv_data.columns = daily_pv_data.iloc[0]
+    daily_pv_data.columns.values[:len(env_columns)] = env_columns
+    daily_pv_data = daily_pv_data.drop([0, 1, 2])
+    daily_pv_data = daily_pv_data.reset_index(drop=True)
+
+    # 결측치 처리:'-' 또는 빈 값을 NaN으로 변환
+    def to_float(column):
+        return daily_pv_data[column].map(lambda x: np.nan if x in ['-', '', ' '] else x).astype(float).to_numpy()
+
+    pv_date = pd.to_datetime(file.split('_')[-2]).date()
+    active_power = {kor_name: to_float(kor_name) for kor_name in kor_names if kor_name in daily_pv_data.columns}
+    radiation = to_float('Global_Horizontal_Radiation') if active_power else None
+    return pv_date, len(daily_pv_data), radiation, active_power
+
+
+def create_combined_data(kor_name, radiation, active_power, daily_weather_data):
+    df = pd.DataFrame({
+        'timestamp': daily_weather_data['datetime'],
+        'Active_Power': active_power[kor_name],
+        'Global_Horizontal_Radiation': radiation,
+        'Weather_Temperature_Celsius': daily_weather_data['temperature'],
+        'Weather_Relative_Humidity': daily_weather_data['humidity'],
+        'Wind_Speed': daily_weather_data['wind_speed'],
+    })
+    return df
 
-        columns_to_keep = daily_pv_data.columns[:5].tolist()  # 첫 5개의 영문 컬럼 유지
-        columns_to_keep.append(kor_name)  # kor_name 컬럼 유지
-        # 나머지 컬럼 삭제
-        daily_pv_data = daily_pv_data[columns_to_keep]
 
-        # 결측치 처리:'-' 또는 빈 값을 NaN으로 변환
-        daily_pv_data = daily_pv_data.map(lambda x: np.nan if x in ['-', '', ' '] else x)
+def combine_into_each_site(file_list, site_dict, weather_data, save_dir, num_workers=None):
+    """
+    일별 PV 파일들을 병렬로 한 번씩만 읽고, 날짜로 색인한 기상 데이터와 합쳐 site마다 csv 하나로 저장.
+    site별 DataFrame은 마지막에 한 번만 concat 한다.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    weather_by_date = load_weather_by_date(weather_data)
+    kor_names = list(site_dict)
 
-        # get date
-        pv_date = file.split('_')[-2]
-        pv_date = pd.to_datetime(pv_date).date()
-        daily_weather_data = weather_info[weather_info['datetime'].dt.date == pv_date]
-        daily_weather_data = daily_weather_data.reset_index(drop=True)
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        parsed = list(tqdm(executor.map(parse_daily_pv_file, file_list, [kor_names] * len(file_list), chunksize=16),
+                           total=len(file_list), desc='Parsing daily PV files'))
 
+    site_frames = {kor_name: [] for kor_name in kor_names}
+    for pv_date, num_rows, radiation, active_power in parsed:
+        if not active_power:
+            continue
+        daily_weather_data = weather_by_date.get(pv_date, pd.DataFrame(columns=['datetime']))
         # Simply copy the datetime from daily_weather_data to daily_pv_data
-        if len(daily_pv_data) != len(daily_weather_data):
+        if num_rows != len(daily_weather_data):
             raise ValueError("The number of rows in daily_pv_data and daily_weather_data do not match.")
-        daily_pv_data['datetime'] = daily_weather_data['datetime']
+        for kor_name in active_power:
+            site_frames[kor_name].append(create_combined_data(kor_name, radiation, active_power, daily_weather_data))
 
-        filtered_df = create_combined_data(preprocessed_df, daily_pv_data, daily_weather_data)
-
-        # DataFrame 결합 (concat)
-        if preprocessed_df.empty:
-            preprocessed_df = deepcopy(filtered_df)
-        else:
-            preprocessed_df = pd.concat([preprocessed_df, filtered_df], ignore_index=True)
-
-    save_path = os.path.join(save_dir, f'{eng_name}.csv')
-    with open(save_path, 'w') as f:
-        preprocessed_df.to_csv(f, index=False)
-
-
-def create_combined_data(preprocessed_df, daily_pv_data, daily_weather_data):
-    # Step 1: 'date'와 'time' 데이터를 추출하여 새로운 DataFrame 생성
-    df = pd.DataFrame(
-        columns=['timestamp', 'Active_Power', 'Global_Horizontal_Radiation', 'Weather_Temperature_Celsius',
-                 'Weather_Relative_Humidity', 'Wind_Speed'])
-
-    # Step 2: temp_df에 데이터 채워넣기
-    df['timestamp'] = daily_weather_data['datetime']
-    df['Active_Power'] = daily_pv_data[kor_name].astype(float)
-    df['Global_Horizontal_Radiation'] = daily_pv_data['Global_Horizontal_Radiation'].astype(float)
-    df['Weather_Temperature_Celsius'] = daily_weather_data['temperature']
-    df['Weather_Relative_Humidity'] = daily_weather_data['humidity']
-    df['Wind_Speed'] = daily_weather_data['wind_speed']
-
-    return df
+    for kor_name, eng_name in site_dict.items():
+        frames = site_frames[kor_name]
+        preprocessed_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            columns=['timestamp', 'Active_Power', 'Global_Horizontal_Radiation', 'Weather_Temperature_Celsius',
+                     'Weather_Relative_Humidity', 'Wind_Speed'])
+        preprocessed_df.to_csv(os.path.join(save_dir, f'{eng_name}.csv'), index=False)
+        print(f'Saved {eng_name}: {len(frames)} days')
 
 
 def create_combined_weather_csv(create_path, project_root):
@@ -237,12 +236,10 @@ if __name__ == '__main__':
         '자연과학동': 'E8_Natural-Science-Bldg'
     }
 
-    for i, (kor_name, eng_name) in enumerate(site_dict.items()):
-        combine_into_each_site(file_list=raw_file_list,
-                               index_of_site=i,
-                               kor_name=kor_name, eng_name=eng_name,
-                               weather_data=weather_data,
-                               save_dir=save_dir)
+    combine_into_each_site(file_list=raw_file_list,
+                           site_dict=site_dict,
+                           weather_data=weather_data,
+                           save_dir=save_dir)
     check_data.process_data_and_log(
         folder_path=os.path.join(project_root, save_dir),
         log_file_path=os.path.join(log_save_dir, 'raw_data_info.txt')
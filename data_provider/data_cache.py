@@ -0,0 +1,84 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+
+# 캐시 포맷이 바뀌면 올려서 예전 캐시를 무효화
+CACHE_VERSION = 2
+CACHE_FIELDS = ('data', 'timestamps', 'stamp')
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """파일 내용 기반 sha1 해시 (파일명/mtime과 무관)"""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(csv_path, input_channels, timeenc, freq, scaler_path=None):
+    """
+    installation 하나의 캐시 키 생성.
+    파일 내용, 입력 채널, 시간 인코딩 설정, 스케일러 파일 내용 (스케일링한 경우)이 모두 같을 때만 같은 키가 나온다.
+    캐시에는 스케일링된 값이 저장되므로 scaler pkl이 바뀌면 다른 키가 되어야 inverse_transform과 어긋나지 않는다.
+    """
+    payload = json.dumps({
+        'version': CACHE_VERSION,
+        'file': file_digest(csv_path),
+        'input_channels': list(input_channels),
+        'timeenc': int(timeenc),
+        'freq': freq,
+        'scaler': file_digest(scaler_path) if scaler_path else None,
+    }, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def load_installation(cache_dir, key, mmap_mode=None):
+    """
+    캐시된 installation 배열 로드. 캐시가 없으면 None 반환.
+
+    Returns:
+        dict: 'data' (float32, [T, C]), 'timestamps' (int64 ns, [T]), 'stamp' (float32, [T, F])
+    """
+    entry_dir = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry_dir):
+        return None
+    try:
+        return {name: np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode=mmap_mode)
+                for name in CACHE_FIELDS}
+    except (OSError, ValueError):
+        # 쓰다 만 캐시 등 손상된 경우 다시 생성하도록 함
+        return None
+
+
+def save_installation(cache_dir, key, data, timestamps, stamp):
+    """
+    installation 배열을 npy로 저장.
+    임시 디렉토리에 쓴 뒤 rename 하므로 여러 프로세스가 동시에 써도 반쯤 쓰인 캐시가 보이지 않는다.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, key)
+    tmp_dir = f'{entry_dir}.tmp{os.getpid()}'
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    arrays = {
+        'data': np.ascontiguousarray(data, dtype=np.float32),
+        'timestamps': np.ascontiguousarray(timestamps, dtype=np.int64),
+        'stamp': np.ascontiguousarray(stamp, dtype=np.float32),
+    }
+    for name, arr in arrays.items():
+        np.save(os.path.join(tmp_dir, f'{name}.npy'), arr)
+
+    try:
+        os.replace(tmp_dir, entry_dir)
+    except OSError:
+        # 다른 프로세스가 먼저 같은 키를 저장한 경우
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return arrays
+
+
+def to_int64_timestamps(timestamps):
+    """pandas datetime Series/Index를 int64 (ns) 배열로 변환. NaT는 int64 최소값이 된다."""
+    return np.asarray(timestamps, dtype='datetime64[ns]').view(np.int64)
@@ -1,6 +1,9 @@
 # from data_provider.data_loader import Dataset_ETT_hour, Dataset_ETT_minute, Dataset_Custom, Dataset_Pred, \
 #      Dataset_DKASC_AliceSprings, Dataset_DKASC_Yulara, Dataset_GIST, Dataset_German, Dataset_UK, Dataset_OEDI_Georgia, Dataset_OEDI_California, Dataset_Miryang, Dataset_Miryang_MinMax, Dataset_Miryang_Standard, Dataset_SineMax
 from data_provider.data_loader import Dataset_DKASC, Dataset_GIST, Dataset_Miryang, Dataset_Germany, Dataset_OEDI_Georgia, Dataset_OEDI_California, Dataset_UK, Dataset_SineMax, Dataset_GISTchrono, Dataset_GISTchrono2, Dataset_GIST_Spring, Dataset_GIST_Summer, Dataset_GIST_Autumn, Dataset_GIST_Winter
+from data_provider.window_store import collate_windows
+from data_provider.resident_loader import ResidentLoader
+from data_provider.eval_sampler import ShardedEvalSampler
 from torch.utils.data import DataLoader, ConcatDataset
 import torch
 
@@ -107,8 +110,9 @@ split_configs = {
 }
 
 
-def data_provider(args, flag, distributed=False):
+def data_provider(args, flag, distributed=False, device=None):
     ## flag : train, val, test
+    ## device : resident_data 모드에서 데이터를 올려둘 device
     Data = data_dict[args.data]
 
     timeenc = 0 if args.embed != 'timeF' else 1
@@ -139,10 +143,37 @@ def data_provider(args, flag, distributed=False):
         size=[args.seq_len, args.label_len, args.pred_len],
         timeenc=timeenc,
         freq=freq,
-        scaler=args.scaler
+        scaler=args.scaler,
+        cache=bool(args.data_cache),
+        data_store=args.data_store,
+        load_workers=args.load_workers,
+        load_executor=args.load_executor,
         )
-    print(flag, data_set.__len__())
-    if distributed:
+    # val / test는 분산 학습 시 window를 rank별로 겹치지 않게 나눔.
+    # drop_last는 단일 프로세스와 같게 적용 (전체에서 마지막 불완전 배치만큼 제외한 뒤 나눔)
+    shard_eval = distributed and flag in ('val', 'test')
+    if shard_eval:
+        shuffle_flag = False
+
+    if args.resident_data:
+        # 전체 데이터를 device tensor로 두고 DataLoader 없이 배치 생성 (분산이면 rank별로 나눔)
+        data_loader = ResidentLoader(
+            data_set,
+            batch_size=batch_size,
+            device=device if device is not None else torch.device('cpu'),
+            shuffle=shuffle_flag,
+            drop_last=drop_last,
+            num_replicas=args.world_size if distributed else 1,
+            rank=args.rank if distributed else 0,
+            seed=args.random_seed,
+            pad=not shard_eval)
+        return data_set, data_loader
+
+    if shard_eval:
+        sampler = ShardedEvalSampler(data_set, num_replicas=args.world_size, rank=args.rank,
+                                     batch_size=batch_size, drop_last=drop_last)
+        drop_last = False  # 제외할 window는 sampler에서 이미 뺐음
+    elif distributed:
         sampler = torch.utils.data.distributed.DistributedSampler(
             data_set,
             num_replicas=args.world_size,
@@ -160,5 +191,6 @@ def data_provider(args, flag, distributed=False):
         num_workers=args.num_workers,
         drop_last=drop_last,
         pin_memory=True,
-        sampler=sampler)
+        sampler=sampler,
+        collate_fn=collate_windows if hasattr(data_set, '__getitems__') else None)
     return data_set, data_loader
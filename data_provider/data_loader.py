@@ -7,16 +7,188 @@ from torch.utils.data import Dataset, DataLoader
 from sklearn.preprocessing import StandardScaler, MinMaxScaler, RobustScaler
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.timefeatures import time_features
+from data_provider.data_cache import cache_key, load_installation, save_installation, to_int64_timestamps
+from data_provider.window_store import WindowStore
 import warnings
 import copy
 import pickle
 import joblib
 import random
+import time
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
 warnings.filterwarnings('ignore')
 
+LOAD_EXECUTORS = ('process', 'thread')
+
+
+def map_installations(func, args_list, workers=0, executor='process'):
+    """
+    installation 단위 로딩 함수를 병렬로 실행. 결과는 완료 순서와 무관하게 args_list 순서대로 반환한다.
+    workers <= 1 이면 현재 프로세스에서 순차 실행.
+    """
+    if executor not in LOAD_EXECUTORS:
+        raise ValueError(f"Unknown load executor: {executor}. Choose from {LOAD_EXECUTORS}")
+    if workers <= 1 or len(args_list) <= 1:
+        return [func(*args) for args in args_list]
+    pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    with pool_cls(max_workers=min(workers, len(args_list))) as pool:
+        return list(pool.map(func, *zip(*args_list)))
+
+
+def dump_pickle_atomic(obj, path):
+    """임시 파일에 쓴 뒤 rename 하므로 동시에 읽는 다른 프로세스가 반쯤 쓰인 파일을 보지 않는다"""
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def _time_stamp(timestamps, timeenc, freq):
+    """timestamp Series로 시간 피처 배열 생성"""
+    if timeenc == 0:
+        return pd.DataFrame({
+            'month': timestamps.dt.month,
+            'day': timestamps.dt.day,
+            'weekday': timestamps.dt.weekday,
+            'hour': timestamps.dt.hour,
+        }).values
+    return time_features(timestamps, freq=freq).transpose(1, 0)
+
+
+def load_dkasc_installation(csv_path, scaler_path, input_channels, timeenc, freq, scaler, cache, cache_dir):
+    """
+    installation 하나를 읽어 (스케일링된) 채널 값, timestamp, 시간 피처를 반환.
+    process pool에서 실행되므로 dataset 객체 대신 필요한 값만 인자로 받는다.
+
+    Returns:
+        (dict, bool): 'data', 'timestamps', 'stamp' 배열과 캐시 적중 여부
+    """
+    # 캐시가 있으면 CSV 파싱, 시간 피처 생성, 스케일링을 모두 건너뜀
+    # 키에 scaler 파일 내용이 들어가므로 scaler 파일이 없으면 (다시 fit 해야 하므로) 캐시를 쓰지 않음
+    if cache and (not scaler or os.path.exists(scaler_path)):
+        cached = load_installation(cache_dir, cache_key(csv_path, input_channels, timeenc, freq, scaler_path if scaler else None))
+        if cached is not None:
+            return cached, True
+
+    # read dataset
+    df_raw = pd.read_csv(csv_path)
+    df_raw['timestamp'] = pd.to_datetime(df_raw['timestamp'], errors='coerce')
+
+    # 필요한 컬럼만 추출
+    df_raw = df_raw[['timestamp'] + input_channels]
+
+    # 시간 피처 생성
+    data_stamp = _time_stamp(df_raw['timestamp'], timeenc, freq)
+
+    df_data = df_raw[input_channels]
+
+    if scaler:
+        # 스케일러 fit & transform 로직
+        if not os.path.exists(scaler_path):
+            scaler_dict = {}
+            for ch in input_channels:
+                ch_scaler = StandardScaler()
+                ch_scaler.fit(df_data[[ch]])
+                scaler_dict[ch] = ch_scaler
+            dump_pickle_atomic(scaler_dict, scaler_path)
+        else:
+            with open(scaler_path, 'rb') as f:
+                scaler_dict = pickle.load(f)
+
+        transformed_data = [scaler_dict[ch].transform(df_data[[ch]]) for ch in input_channels]
+        data = np.hstack(transformed_data)
+    else:
+        data = df_data.values
+
+    # 모델 입력은 어차피 float32로 변환되므로 미리 float32로 저장
+    arrays = {
+        'data': np.ascontiguousarray(data, dtype=np.float32),
+        'timestamps': to_int64_timestamps(df_raw['timestamp'].values),
+        'stamp': np.ascontiguousarray(data_stamp, dtype=np.float32),
+    }
+    if cache:
+        # scaler를 방금 fit 했을 수 있으므로 저장된 scaler 파일 기준으로 키를 다시 계산
+        key = cache_key(csv_path, input_channels, timeenc, freq, scaler_path if scaler else None)
+        save_installation(cache_dir, key, arrays['data'], arrays['timestamps'], arrays['stamp'])
+    return arrays, False
+
+
+def load_timesplit_file(file_path, input_channels, timeenc, freq, cache, cache_dir):
+    """
+    CSV 하나를 읽어 스케일링 전 채널 값, timestamp, 시간 피처를 반환.
+    시간 피처는 행 단위로 계산되므로 분할 전에 파일 단위로 만들어 캐시할 수 있다.
+
+    Returns:
+        (dict, bool): 'data', 'timestamps', 'stamp' 배열과 캐시 적중 여부
+    """
+    if cache:
+        key = cache_key(file_path, input_channels, timeenc, freq)
+        cached = load_installation(cache_dir, key)
+        if cached is not None:
+            return cached, True
+
+    df = pd.read_csv(file_path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    data_stamp = _time_stamp(df['timestamp'], timeenc, freq)
+
+    arrays = {
+        'data': np.ascontiguousarray(df[input_channels].values, dtype=np.float32),
+        'timestamps': to_int64_timestamps(df['timestamp'].values),
+        'stamp': np.ascontiguousarray(data_stamp, dtype=np.float32),
+    }
+    if cache:
+        save_installation(cache_dir, key, arrays['data'], arrays['timestamps'], arrays['stamp'])
+    return arrays, False
+
+
+class ScalerTable:
+    """
+    installation id로 바로 조회하는 Active_Power StandardScaler 파라미터 테이블.
+    scaler 파일은 dataset 생성 시 한 번만 읽고, 역변환은 배치 전체에 대한 broadcast 연산 하나로 수행한다.
+    torch tensor가 들어오면 테이블을 같은 device로 옮겨 두고 device 위에서 계산한다.
+    """
+    def __init__(self, mean, scale):
+        self.mean = np.asarray(mean, dtype=np.float64)      # [max_inst_id + 1]
+        self.scale = np.asarray(scale, dtype=np.float64)    # [max_inst_id + 1]
+        self._tensors = {}
+
+    @classmethod
+    def from_scalers(cls, scalers):
+        """scalers: {inst_id: fitted StandardScaler}"""
+        size = max(scalers) + 1
+        mean, scale = np.zeros(size), np.ones(size)
+        for inst_id, scaler in scalers.items():
+            mean[inst_id] = scaler.mean_[0]
+            scale[inst_id] = scaler.scale_[0]
+        return cls(mean, scale)
+
+    def _tables_on(self, device, dtype):
+        key = (str(device), dtype)
+        if key not in self._tensors:
+            self._tensors[key] = (torch.as_tensor(self.mean, dtype=dtype, device=device),
+                                  torch.as_tensor(self.scale, dtype=dtype, device=device))
+        return self._tensors[key]
+
+    def inverse_transform(self, data, inst_ids):
+        """
+        data: [B, ...] numpy array 또는 torch tensor, inst_ids: [B]
+        모든 채널에 해당 installation의 Active_Power scaler를 적용 (기존 동작과 동일)
+        """
+        if torch.is_tensor(data):
+            mean, scale = self._tables_on(data.device, data.dtype)
+            idx = torch.as_tensor(inst_ids, device=data.device).long().reshape(-1)
+            shape = (-1,) + (1,) * (data.dim() - 1)
+            return data * scale[idx].view(shape) + mean[idx].view(shape)
+        data = np.asarray(data)
+        idx = np.asarray(inst_ids, dtype=np.int64).reshape(-1)
+        shape = (-1,) + (1,) * (data.ndim - 1)
+        inverse = data * self.scale[idx].reshape(shape) + self.mean[idx].reshape(shape)
+        return inverse.astype(data.dtype, copy=False)
+
+
 class Dataset_DKASC(Dataset):
     def __init__(self,
                  root_path, data_path=None,
@@ -25,6 +197,10 @@ class Dataset_DKASC(Dataset):
                  timeenc=0, freq='h',
                  scaler=True,
                  input_channels=None,
+                 cache=True,
+                 data_store='memory',
+                 load_workers=0,
+                 load_executor='process',
                 ):
         """
         이 예시는 installation 단위로 데이터가 나뉘어 있고,
@@ -39,7 +215,12 @@ class Dataset_DKASC(Dataset):
             timeenc (int): 시간 인코딩 방법.
             freq (str): 시간 데이터 빈도.
             scaler (bool): 스케일링 여부.
+            cache (bool): 전처리된 installation 배열을 root_path/cache에 저장하고 재사용할지 여부.
+            data_store (str): 'memory' 또는 'mmap'. mmap이면 전체 배열을 memory-map 파일 하나로 두고 worker 간 공유.
+            load_workers (int): installation 로딩에 쓸 worker 수. 0 또는 1이면 순차 로딩.
+            load_executor (str): 'process' 또는 'thread'. load_workers에 쓸 pool 종류.
         """
+        load_start = time.time()
 
         if size is None:
             raise ValueError("size cannot be None. Please specify seq_len, label_len, and pred_len explicitly.")
@@ -55,13 +236,16 @@ class Dataset_DKASC(Dataset):
         self.freq = freq
         self.scaler = scaler
         self.split_configs = split_configs
+        self.cache = cache
+        self.data_store = data_store
+        self.load_workers = load_workers
+        self.load_executor = load_executor
 
         # input_channels가 None이면 기본값 사용
         if input_channels is None:
             input_channels = ['Global_Horizontal_Radiation', 'Weather_Temperature_Celsius',
                               'Weather_Relative_Humidity', 'Wind_Speed', 'Active_Power']
         self.input_channels = input_channels
-        print(f"Input_channels: {self.input_channels}")
 
         # mapping 파일 로드
         dataset_name = self.__class__.__name__.split('_')[-1]  # 클래스 이름에서 데이터셋 이름 추출
@@ -83,24 +267,53 @@ class Dataset_DKASC(Dataset):
         # 스케일러 저장 경로
         self.scaler_dir = os.path.join(root_path, 'scalers')
         os.makedirs(self.scaler_dir, exist_ok=True)
+        # 전처리 결과 캐시 경로
+        self.cache_dir = os.path.join(root_path, 'cache')
 
         # 데이터를 저장할 리스트
         self.data_x_list = []
         self.data_y_list = []
         self.data_stamp_list = []
+        self.timestamp_list = []
         self.inst_id_list = []
         self.capacity_info = {}
+        self.num_cached = 0
 
         # 데이터 준비 및 indices 생성
         self._prepare_data()
-        self.indices = self._create_indices()
+        self._build_store()
+        self.window_offsets = self._create_indices()
+        self.scaler_table = self._build_scaler_table() if self.scaler else None
+        print(f"[{self.flag}] {self.__class__.__name__}: {len(self.inst_id_list)} installations ({self.num_cached} cached), "
+              f"{len(self)} windows, {len(self.input_channels)} channels, loaded in {time.time() - load_start:.1f}s "
+              f"(load_workers={self.load_workers})")
+
+    def _build_scaler_table(self):
+        """installation별 scaler 파일을 한 번만 읽어 inst_id -> (mean, scale) 테이블 생성"""
+        scalers = {}
+        for inst_id in self.inst_id_list:
+            file_name = self.current_dataset[self.current_dataset['index'] == inst_id]['original_name'].values[0]
+            with open(os.path.join(self.scaler_dir, f"{file_name}_scaler.pkl"), 'rb') as f:
+                scalers[inst_id] = pickle.load(f)['Active_Power']
+        return ScalerTable.from_scalers(scalers)
+
+    def _build_store(self):
+        """installation별 배열을 WindowStore 하나로 합치고 리스트는 store의 view로 교체"""
+        self.store = WindowStore.build(self.data_x_list, self.data_stamp_list, backend=self.data_store,
+                                       store_dir=self.cache_dir, name=f'{self.__class__.__name__}_{self.flag}')
+        self.data_x_list = [self.store.series(i) for i in range(len(self.store))]
+        self.data_y_list = self.data_x_list
+        self.data_stamp_list = [self.store.stamps(i) for i in range(len(self.store))]
+        # __getitems__에서 배치마다 리스트를 배열로 바꾸지 않도록 한 번만 생성
+        self.inst_id_array = np.asarray(self.inst_id_list, dtype=np.int64)
 
     def _prepare_data(self):
+        load_args = []
         for inst_id in self.inst_list:
             # inst_id를 기반으로 파일 이름 가져오기
             file_row = self.current_dataset[self.current_dataset['index'] == inst_id]
             if file_row.empty:
-                raise ValueError(f"No matching file found for inst_id {inst_id} in dataset {current_dataset}.")
+                raise ValueError(f"No matching file found for inst_id {inst_id} in dataset {self.current_dataset}.")
             
             # 파일명과 capacity 정보 추출
             file_name = file_row['original_name'].values[0]
@@ -115,63 +328,29 @@ class Dataset_DKASC(Dataset):
             csv_path = os.path.join(self.root_path, file_name)
             if not os.path.exists(csv_path):
                 raise FileNotFoundError(f"Data file not found: {csv_path}")
-            
-            # read dataset
-            df_raw = pd.read_csv(csv_path)
-            df_raw['timestamp'] = pd.to_datetime(df_raw['timestamp'], errors='coerce')
-
-            # 필요한 컬럼만 추출
-            df_raw = df_raw[['timestamp'] + self.input_channels]
-
-            # 시간 피처 생성
-            df_stamp = pd.DataFrame()
-            df_stamp['timestamp'] = df_raw['timestamp']
-            if self.timeenc == 0:
-                df_stamp['month'] = df_stamp['timestamp'].dt.month
-                df_stamp['day'] = df_stamp['timestamp'].dt.day
-                df_stamp['weekday'] = df_stamp['timestamp'].dt.weekday
-                df_stamp['hour'] = df_stamp['timestamp'].dt.hour
-                data_stamp = df_stamp[['month', 'day', 'weekday', 'hour']].values
-            else:
-                data_stamp = time_features(df_stamp['timestamp'], freq=self.freq).transpose(1, 0)
-
-            df_data = df_raw[self.input_channels]
             scaler_path = os.path.join(self.scaler_dir, f"{file_name}_scaler.pkl")
-
-            if self.scaler:
-                # 스케일러 fit & transform 로직
-                if not os.path.exists(scaler_path):
-                    scaler_dict = {}
-                    for ch in self.input_channels:
-                        scaler = StandardScaler()
-                        scaler.fit(df_data[[ch]])
-                        scaler_dict[ch] = scaler
-                    with open(scaler_path, 'wb') as f:
-                        pickle.dump(scaler_dict, f)
-                else:
-                    with open(scaler_path, 'rb') as f:
-                        scaler_dict = pickle.load(f)
-
-                transformed_data = [scaler_dict[ch].transform(df_data[[ch]]) for ch in self.input_channels]
-                data = np.hstack(transformed_data)
-            else:
-                data = df_data.values
-
-            self.data_x_list.append(data)
-            self.data_y_list.append(data)
-            self.data_stamp_list.append(data_stamp)
+            load_args.append((csv_path, scaler_path, self.input_channels, self.timeenc, self.freq,
+                              self.scaler, self.cache, self.cache_dir))
+
+        # installation별 로딩은 서로 독립이므로 병렬로 실행하고 inst_list 순서대로 모음
+        results = map_installations(load_dkasc_installation, load_args, self.load_workers, self.load_executor)
+        for arrays, cached in results:
+            self.num_cached += int(cached)
+            self.data_x_list.append(arrays['data'])
+            self.data_y_list.append(arrays['data'])
+            self.data_stamp_list.append(arrays['stamp'])
+            self.timestamp_list.append(arrays['timestamps'])
 
     def _create_indices(self):
-        indices = []
-        for inst_idx, data_x in enumerate(self.data_x_list):
-            total_len = len(data_x)
-            max_start = total_len - self.seq_len - self.pred_len + 1
-            for s in range(max_start):
-                indices.append((inst_idx, s))
-        return indices
+        """installation별 window 개수의 누적합 테이블 생성 (window마다 튜플을 만들지 않음)"""
+        return self.store.window_offsets(self.seq_len + self.pred_len)
+
+    def locate(self, index):
+        """window index (스칼라 또는 배열) -> (installation 위치, 시작 offset)"""
+        return self.store.locate(self.window_offsets, index)
 
     def __getitem__(self, index):
-        inst_idx, s_begin = self.indices[index]
+        inst_idx, s_begin = self.locate(index)
         inst_id = self.inst_id_list[inst_idx]
 
         data_x = self.data_x_list[inst_idx]
@@ -189,8 +368,28 @@ class Dataset_DKASC(Dataset):
 
         return seq_x, seq_y, seq_x_mark, seq_y_mark, inst_id
 
+    def __getitems__(self, indices):
+        """
+        DataLoader의 batched fetch 경로. 배치 전체를 fancy-index 한 번으로 모아
+        이미 쌓인 float32 텐서 (seq_x [B, seq_len, C], seq_y, seq_x_mark, seq_y_mark, inst_id [B])를 반환.
+        """
+        inst_idx, s_begin = self.locate(indices)
+        s_rows = self.store.row_index(inst_idx, s_begin)
+        r_rows = s_rows + self.seq_len - self.label_len
+        r_len = self.label_len + self.pred_len
+
+        seq_x = self.store.gather(self.store.data, s_rows, self.seq_len)
+        seq_y = self.store.gather(self.store.data, r_rows, r_len)
+        seq_x_mark = self.store.gather(self.store.stamp, s_rows, self.seq_len)
+        seq_y_mark = self.store.gather(self.store.stamp, r_rows, r_len)
+        inst_id = self.inst_id_array[inst_idx]
+
+        return (torch.from_numpy(seq_x), torch.from_numpy(seq_y),
+                torch.from_numpy(seq_x_mark), torch.from_numpy(seq_y_mark),
+                torch.from_numpy(inst_id))
+
     def __len__(self):
-        return len(self.indices)
+        return int(self.window_offsets[-1])
 
     def inverse_transform(self, data, inst_ids):
         """
@@ -198,40 +397,13 @@ class Dataset_DKASC(Dataset):
         
         Args:
             inst_ids: 배치 내 각 데이터의 installation ID (배치 크기만큼의 길이)
-            data: 변환할 데이터 (batch_size, seq_len, feature_dim)
+            data: 변환할 데이터 (batch_size, seq_len, feature_dim). numpy array 또는 torch tensor (device 유지)
         Returns:
             inverse_data: 역변환된 데이터 (입력과 같은 shape)
         """
         if not self.scaler:
             return data
-            
-        data_org = data.copy()
-        inverse_data = np.zeros_like(data_org)
-        
-        # unique한 installation IDs 추출
-        unique_inst_ids = np.unique(inst_ids)
-        
-        # 각 unique installation에 대해
-        for inst_id in unique_inst_ids:
-            # 현재 installation의 스케일러 로드
-            file_row = self.current_dataset[self.current_dataset['index'] == inst_id]
-            file_name = file_row['original_name'].values[0]
-            scaler_path = os.path.join(self.scaler_dir, f"{file_name}_scaler.pkl")
-            
-            with open(scaler_path, 'rb') as f:
-                scaler_dict = pickle.load(f)
-                
-            # 현재 installation에 해당하는 데이터의 인덱스 찾기
-            inst_mask = (inst_ids == inst_id)
-            
-            # 해당하는 데이터만 추출하여 역변환
-            inst_data = data_org[inst_mask].reshape(-1, 1)
-            inverse_inst_data = scaler_dict['Active_Power'].inverse_transform(inst_data)
-            
-            # 역변환된 데이터를 원래 위치에 복원
-            inverse_data[inst_mask] = inverse_inst_data.reshape(data_org[inst_mask].shape)
-        
-        return inverse_data
+        return self.scaler_table.inverse_transform(data, inst_ids)
 
 
 ########################################################################################
@@ -243,6 +415,7 @@ class Dataset_GIST(Dataset_DKASC):
                  flag='train', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
         input_channels = ['Global_Horizontal_Radiation',
                           'Weather_Temperature_Celsius',
@@ -250,7 +423,7 @@ class Dataset_GIST(Dataset_DKASC):
                           'Wind_Speed',
                           'Active_Power']
         super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler,
-                         input_channels=input_channels)
+                         input_channels=input_channels, **kwargs)
 
 #######################################################################################
 
@@ -261,8 +434,9 @@ class Dataset_Miryang(Dataset_DKASC):
                  flag='train', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 
 
 #######################################################################################
@@ -274,8 +448,9 @@ class Dataset_Germany(Dataset_DKASC):
                  flag='train', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 
 
 #######################################################################################
@@ -287,8 +462,9 @@ class Dataset_GISTchrono(Dataset_DKASC):
                  flag='train', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 
 
 class Dataset_GISTchrono2(Dataset_DKASC):
@@ -298,8 +474,9 @@ class Dataset_GISTchrono2(Dataset_DKASC):
                  flag='train', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 
 
 class Dataset_GIST_Spring(Dataset_DKASC):
@@ -309,8 +486,9 @@ class Dataset_GIST_Spring(Dataset_DKASC):
                  flag='test', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 
 
 class Dataset_GIST_Summer(Dataset_DKASC):
@@ -320,8 +498,9 @@ class Dataset_GIST_Summer(Dataset_DKASC):
                  flag='test', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 
 class Dataset_GIST_Autumn(Dataset_DKASC):
     def __init__(self,
@@ -330,8 +509,9 @@ class Dataset_GIST_Autumn(Dataset_DKASC):
                  flag='test', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 
 class Dataset_GIST_Winter(Dataset_DKASC):
     def __init__(self,
@@ -340,13 +520,15 @@ class Dataset_GIST_Winter(Dataset_DKASC):
                  flag='test', size=None,
                  timeenc=0, freq='h',
                  scaler=True,
+                 **kwargs,
                  ):
-        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler)
+        super().__init__(root_path, data_path, data_type, split_configs, flag, size, timeenc, freq, scaler, **kwargs)
 #######################################################################################
 
 class Dataset_TimeSplit(Dataset):
     def __init__(self, root_path, data_path=None, data_type='all', split_configs=None,
-                 flag='train', size=None, timeenc=0, freq='h', scaler=True, input_channels=None):
+                 flag='train', size=None, timeenc=0, freq='h', scaler=True, input_channels=None,
+                 cache=True, data_store='memory', load_workers=0, load_executor='process'):
         """
         시계열 데이터를 시간 순으로 분할하는 데이터셋 클래스
         Args:
@@ -359,7 +541,12 @@ class Dataset_TimeSplit(Dataset):
             freq (str): 시계열 데이터 frequency
             scaler (bool): 스케일링 적용 여부
             input_channels (list): 입력 데이터 채널 목록
+            cache (bool): 파일별 파싱 결과를 root_path/cache에 저장하고 재사용할지 여부
+            data_store (str): 'memory' 또는 'mmap'. mmap이면 전체 배열을 memory-map 파일 하나로 두고 worker 간 공유
+            load_workers (int): 파일 로딩에 쓸 worker 수. 0 또는 1이면 순차 로딩
+            load_executor (str): 'process' 또는 'thread'. load_workers에 쓸 pool 종류
         """
+        load_start = time.time()
         self.root_path = root_path
         self.data_path = data_path
         self.flag = flag
@@ -367,6 +554,10 @@ class Dataset_TimeSplit(Dataset):
         self.freq = freq
         self.scaler = scaler
         self.split_configs = split_configs
+        self.cache = cache
+        self.data_store = data_store
+        self.load_workers = load_workers
+        self.load_executor = load_executor
 
         if size is None:
             raise ValueError("size cannot be None. Please specify seq_len, label_len, and pred_len explicitly.")
@@ -380,42 +571,64 @@ class Dataset_TimeSplit(Dataset):
         # 스케일러 저장 경로
         self.scaler_dir = os.path.join(root_path, 'scalers')
         os.makedirs(self.scaler_dir, exist_ok=True)
+        # 파싱 결과 캐시 경로
+        self.cache_dir = os.path.join(root_path, 'cache')
 
         # 데이터를 저장할 리스트
         self.data_x_list = []
         self.data_y_list = []
         self.data_stamp_list = []
+        self.timestamp_list = []
 
         self.inst_info = {}  # {file_name: capacity} 형태로 저장
-        self.inst_id_list = []
-        self.timestamp_inst_ids = []  # 각 시점별 installation ID를 저장할 리스트 추가
+        self.inst_id_list = []  # data_x_list와 같은 순서의 installation ID
+        self.num_cached = 0
 
         # 데이터 준비
         self._prepare_data()
-        self.indices = self._create_indices()
-
-    def _get_split_dates(self, df):
+        self._build_store()
+        self.window_offsets = self._create_indices()
+        self.scaler_table = self._build_scaler_table() if self.scaler else None
+        print(f"[{self.flag}] {self.__class__.__name__}: {len(self.inst_id_list)} installations ({self.num_cached} cached), "
+              f"{len(self)} windows, {len(self.input_channels)} channels, loaded in {time.time() - load_start:.1f}s "
+              f"(load_workers={self.load_workers})")
+
+    def _build_scaler_table(self):
+        """모든 installation이 같은 scaler를 쓰므로 같은 값으로 채운 테이블 생성 (scaler 파일은 한 번만 읽음)"""
+        scaler = self._load_scalers()['Active_Power']
+        return ScalerTable.from_scalers({inst_id: scaler for inst_id in self.inst_id_list})
+
+    def _build_store(self):
+        """installation별 배열을 WindowStore 하나로 합치고 리스트는 store의 view로 교체"""
+        self.store = WindowStore.build(self.data_x_list, self.data_stamp_list, backend=self.data_store,
+                                       store_dir=self.cache_dir, name=f'{self.__class__.__name__}_{self.flag}')
+        self.data_x_list = [self.store.series(i) for i in range(len(self.store))]
+        self.data_y_list = self.data_x_list
+        self.data_stamp_list = [self.store.stamps(i) for i in range(len(self.store))]
+        # __getitems__에서 배치마다 리스트를 배열로 바꾸지 않도록 한 번만 생성
+        self.inst_id_array = np.asarray(self.inst_id_list, dtype=np.int64)
+
+    def _get_split_dates(self, timestamps):
         """시간 분할을 위한 날짜 계산"""
-        total_days = (df['timestamp'].max() - df['timestamp'].min()).days
+        total_days = (timestamps.max() - timestamps.min()).days
         train_end = int(total_days * self.split_configs['train'])
         val_end = train_end + int(total_days * self.split_configs['val'])
         
-        train_date = df['timestamp'].min() + pd.Timedelta(days=train_end)
-        val_date = df['timestamp'].min() + pd.Timedelta(days=val_end)
+        train_date = timestamps.min() + pd.Timedelta(days=train_end)
+        val_date = timestamps.min() + pd.Timedelta(days=val_end)
         
         return train_date, val_date
 
     def _fit_scalers(self, train_data):
         """training data로 scaler를 학습하고 저장"""
         scaler_dict = {}
-        for ch in self.input_channels:
+        for ch_idx, ch in enumerate(self.input_channels):
             scaler = StandardScaler()
-            scaler.fit(train_data[[ch]])
+            scaler.fit(train_data[:, [ch_idx]])
             scaler_dict[ch] = scaler
         
         scaler_path = os.path.join(self.scaler_dir, f"{self.__class__.__name__}_scalers.pkl")
-        with open(scaler_path, 'wb') as f:
-            pickle.dump(scaler_dict, f)
+        dump_pickle_atomic(scaler_dict, scaler_path)
         return scaler_dict
 
     def _load_scalers(self):
@@ -430,91 +643,69 @@ class Dataset_TimeSplit(Dataset):
 
         if self.data_path is not None:
             # 단일 파일인 경우
-            file_name = os.listdir(self.root_path)[0]
-            file_path = os.path.join(self.root_path, file_name)
-            df = pd.read_csv(file_path)
-            inst_id = self._process_single_file(df, self.data_path)
-            self.timestamp_inst_ids = [inst_id] * len(df)
-            
+            file_name = [f for f in sorted(os.listdir(self.root_path)) if f.endswith('.csv')][0]
+            file_list = [(os.path.join(self.root_path, file_name), self.data_path)]
         else:
             # 디렉토리의 모든 CSV 파일 처리
-            dfs = []
-            for file in os.listdir(self.root_path):
-                if file.endswith('.csv'):
-                    df = pd.read_csv(os.path.join(self.root_path, file))
-                    inst_id = self._process_single_file(df, file)
-                    self.timestamp_inst_ids.extend([inst_id] * len(df))
-                    dfs.append(df)
-            df = pd.concat(dfs, ignore_index=True)
-
-        # # CSV 파일 로드
-        # if self.data_path is not None:
-        #     df = pd.read_csv(os.path.join(self.root_path, self.data_path))
-        # else:
-        #     # 디렉토리의 모든 CSV 파일 로드
-        #     dfs = []
-        #     for file in os.listdir(self.root_path):
-        #         if file.endswith('.csv'):
-        #             df_temp = pd.read_csv(os.path.join(self.root_path, file))
-        #             dfs.append(df_temp)
-        #     df = pd.concat(dfs, ignore_index=True)
-
-        # timestamp 처리
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp')
-        
-        # 시간 기반 분할
-        train_date, val_date = self._get_split_dates(df)
+            file_list = [(os.path.join(self.root_path, file), file)
+                         for file in sorted(os.listdir(self.root_path)) if file.endswith('.csv')]
+
+        # 파일별 로딩은 병렬로 실행하고 결과는 file_list 순서대로 모음
+        load_args = [(file_path, self.input_channels, self.timeenc, self.freq, self.cache, self.cache_dir)
+                     for file_path, _ in file_list]
+        results = map_installations(load_timesplit_file, load_args, self.load_workers, self.load_executor)
+
+        # installation별로 시간순 정렬된 배열을 따로 유지 (여러 site가 섞인 window가 생기지 않도록)
+        series = []
+        for (file_path, file_name), (arrays, cached) in zip(file_list, results):
+            self.num_cached += int(cached)
+            self._process_single_file(arrays['data'], file_name)
+            order = np.argsort(arrays['timestamps'], kind='stable')
+            series.append((arrays['data'][order], arrays['timestamps'][order], arrays['stamp'][order]))
+
+        # 시간 기반 분할 (모든 installation이 같은 분할 날짜를 공유)
+        all_timestamps = np.concatenate([timestamps for _, timestamps, _ in series])
+        train_date, val_date = self._get_split_dates(pd.to_datetime(all_timestamps))
+
+        def subset_mask(timestamps):
+            # flag에 따른 데이터 선택
+            if self.flag == 'train':
+                return timestamps < train_date.value
+            elif self.flag == 'val':
+                return (timestamps >= train_date.value) & (timestamps < val_date.value)
+            else:  # test
+                return timestamps >= val_date.value
 
-        # 전체 데이터에서 훈련 데이터 추출
-        train_data = df[df['timestamp'] < train_date]
-        
         # Scaler 처리
         if self.scaler:
             if self.flag == 'train':
                 # 훈련 데이터로 scaler를 학습하고 저장
-                scaler_dict = self._fit_scalers(train_data[self.input_channels])
+                train_data = np.concatenate([data[timestamps < train_date.value] for data, timestamps, _ in series])
+                scaler_dict = self._fit_scalers(train_data)
             else:
                 # 저장된 scaler 로드
                 scaler_dict = self._load_scalers()
 
-        # flag에 따른 데이터 선택
-        if self.flag == 'train':
-            df_subset = df[df['timestamp'] < train_date]
-        elif self.flag == 'val':
-            df_subset = df[(df['timestamp'] >= train_date) & 
-                        (df['timestamp'] < val_date)]
-        else:  # test
-            df_subset = df[df['timestamp'] >= val_date]
+        for data, timestamps, data_stamp in series:
+            mask = subset_mask(timestamps)
+            data = data[mask]
 
-        # 시간 특성 생성
-        if self.timeenc == 0:
-            data_stamp = pd.DataFrame({
-                'month': df_subset['timestamp'].dt.month,
-                'day': df_subset['timestamp'].dt.day,
-                'weekday': df_subset['timestamp'].dt.weekday,
-                'hour': df_subset['timestamp'].dt.hour,
-            }).values
-        else:
-            data_stamp = time_features(df_subset['timestamp'], freq=self.freq).transpose(1, 0)
-
-        # 데이터 변환
-        df_data = df_subset[self.input_channels]
-        if self.scaler:
-            transformed_data = [scaler_dict[ch].transform(df_data[[ch]]) for ch in self.input_channels]
-            data = np.hstack(transformed_data)
-        else:
-            data = df_data.values
+            # 데이터 변환
+            if self.scaler and len(data):
+                transformed_data = [scaler_dict[ch].transform(data[:, [ch_idx]]) for ch_idx, ch in enumerate(self.input_channels)]
+                data = np.hstack(transformed_data)
 
-        self.data_x_list.append(data)
-        self.data_y_list.append(data)
-        self.data_stamp_list.append(data_stamp)
+            data = np.ascontiguousarray(data, dtype=np.float32)
+            self.data_x_list.append(data)
+            self.data_y_list.append(data)
+            self.data_stamp_list.append(data_stamp[mask])
+            self.timestamp_list.append(timestamps[mask])
 
-    def _process_single_file(self, df, file_name):
+    def _process_single_file(self, data, file_name):
         """개별 파일 처리 및 installation 정보 저장"""
         try:
             # Active_Power 컬럼의 최대값을 capacity로 사용
-            capacity = df['Active_Power'].max()
+            capacity = float(np.nanmax(data[:, self.input_channels.index('Active_Power')]))
             inst_id = len(self.inst_info)  # 순차적인 ID 부여
             self.inst_info[file_name] = {
                 'capacity': capacity,
@@ -523,7 +714,7 @@ class Dataset_TimeSplit(Dataset):
             }
             self.inst_id_list.append(inst_id)
             return inst_id
-        except KeyError:
+        except ValueError:
             print(f"Warning: 'Active_Power' column not found in file: {file_name}")
             capacity = 1.0  # 기본값 설정
             inst_id = len(self.inst_info)
@@ -536,70 +727,78 @@ class Dataset_TimeSplit(Dataset):
             return inst_id
 
     def _create_indices(self):
-        """시퀀스 인덱스 생성"""
-        indices = []
-        data_x = self.data_x_list[0]  # 단일 array 사용
-        total_len = len(data_x)
-        max_start = total_len - self.seq_len - self.pred_len + 1
-        for s in range(max_start):
-            indices.append(s)
-        return indices
+        """installation별 window 개수의 누적합 테이블 생성 (window는 한 installation 안에서만 만들어짐)"""
+        return self.store.window_offsets(self.seq_len + self.pred_len)
+
+    def locate(self, index):
+        """window index (스칼라 또는 배열) -> (installation 위치, 시작 offset)"""
+        return self.store.locate(self.window_offsets, index)
 
     def __getitem__(self, index):
-        s_begin = self.indices[index]
+        inst_idx, s_begin = self.locate(index)
+        inst_id = self.inst_id_list[inst_idx]
+
         s_end = s_begin + self.seq_len
         r_begin = s_end - self.label_len
         r_end = r_begin + self.label_len + self.pred_len
 
-        seq_x = self.data_x_list[0][s_begin:s_end]
-        seq_y = self.data_y_list[0][r_begin:r_end]
-        seq_x_mark = self.data_stamp_list[0][s_begin:s_end]
-        seq_y_mark = self.data_stamp_list[0][r_begin:r_end]
-
-        # 해당 시점의 installation ID 반환
-        inst_id = self.timestamp_inst_ids[s_begin]
+        seq_x = self.data_x_list[inst_idx][s_begin:s_end]
+        seq_y = self.data_y_list[inst_idx][r_begin:r_end]
+        seq_x_mark = self.data_stamp_list[inst_idx][s_begin:s_end]
+        seq_y_mark = self.data_stamp_list[inst_idx][r_begin:r_end]
 
         return seq_x, seq_y, seq_x_mark, seq_y_mark, inst_id
 
+    def __getitems__(self, indices):
+        """배치 전체를 fancy-index 한 번으로 모아 이미 쌓인 float32 텐서로 반환"""
+        inst_idx, s_begin = self.locate(indices)
+        s_rows = self.store.row_index(inst_idx, s_begin)
+        r_rows = s_rows + self.seq_len - self.label_len
+        r_len = self.label_len + self.pred_len
+
+        seq_x = self.store.gather(self.store.data, s_rows, self.seq_len)
+        seq_y = self.store.gather(self.store.data, r_rows, r_len)
+        seq_x_mark = self.store.gather(self.store.stamp, s_rows, self.seq_len)
+        seq_y_mark = self.store.gather(self.store.stamp, r_rows, r_len)
+        inst_id = self.inst_id_array[inst_idx]
+
+        return (torch.from_numpy(seq_x), torch.from_numpy(seq_y),
+                torch.from_numpy(seq_x_mark), torch.from_numpy(seq_y_mark),
+                torch.from_numpy(inst_id))
+
     def __len__(self):
-        return len(self.indices)
+        return int(self.window_offsets[-1])
 
     def inverse_transform(self, data, inst_ids=None):
-        """스케일링된 데이터를 원래 스케일로 변환"""
+        """스케일링된 데이터를 원래 스케일로 변환 (numpy array 또는 torch tensor)"""
         if not self.scaler:
             return data
-            
-        data_org = data.copy()
-        scaler_dict = self._load_scalers()
-        
+        if inst_ids is None:
+            inst_ids = np.full(len(data), self.inst_id_list[0], dtype=np.int64)
         # Active_Power에 대한 역변환만 수행
-        inverse_data = scaler_dict['Active_Power'].inverse_transform(
-            data_org.reshape(-1, 1)
-        ).reshape(data_org.shape)
-        
-        return inverse_data
+        return self.scaler_table.inverse_transform(data, inst_ids)
 
 class Dataset_OEDI_California(Dataset_TimeSplit):
     def __init__(self, root_path, data_path=None, data_type='all', split_configs=None,
-                 flag='train', size=None, timeenc=0, freq='h', scaler=True):
+                 flag='train', size=None, timeenc=0, freq='h', scaler=True, **kwargs):
         input_channels = ['Global_Horizontal_Radiation', 'Weather_Temperature_Celsius',
                           'Wind_Speed', 'Active_Power']
         super().__init__(root_path, data_path, data_type, split_configs, flag, size,
-                         timeenc, freq, scaler, input_channels=input_channels)
+                         timeenc, freq, scaler, input_channels=input_channels, **kwargs)
 
 class Dataset_OEDI_Georgia(Dataset_TimeSplit):
     def __init__(self, root_path, data_path=None, data_type='all', split_configs=None,
-                 flag='train', size=None, timeenc=0, freq='h', scaler=True):
+                 flag='train', size=None, timeenc=0, freq='h', scaler=True, **kwargs):
         input_channels = ['Global_Horizontal_Radiation', 'Weather_Temperature_Celsius',
                           'Wind_Speed', 'Active_Power']
         super().__init__(root_path, data_path, data_type, split_configs, flag, size,
-                         timeenc, freq, scaler, input_channels=input_channels)
+                         timeenc, freq, scaler, input_channels=input_channels, **kwargs)
 
 class Dataset_UK(Dataset_TimeSplit):
     def __init__(self, root_path, data_path=None, data_type='all', split_configs=None,
-                 flag='train', size=None, timeenc=0, freq='h', scaler=True):
+                 flag='train', size=None, timeenc=0, freq='h', scaler=True, **kwargs):
         super().__init__(root_path, data_path, data_type, split_configs, flag, size,
-                         timeenc, freq, scaler)
+                         timeenc, freq, scaler, **kwargs)
 
 ####################################################
 
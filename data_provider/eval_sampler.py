@@ -0,0 +1,24 @@
+import torch
+
+
+class ShardedEvalSampler(torch.utils.data.Sampler):
+    """
+    평가용 분산 sampler. DistributedSampler와 달리 padding 없이 window를 rank별 연속 구간으로 나눈다.
+    rank마다 샘플 수는 최대 1개 차이가 난다.
+    drop_last면 단일 프로세스 DataLoader(batch_size, drop_last=True)가 버리는 마지막 불완전 배치의 window를
+    먼저 제외하고 나누므로, 셔플하지 않는 평가 (test)에서는 rank별 통계량을 합치면 단일 프로세스 결과와 같다.
+    """
+    def __init__(self, dataset, num_replicas, rank, batch_size=1, drop_last=False):
+        self.num_replicas = num_replicas
+        self.rank = rank
+        num_windows = len(dataset)
+        if drop_last:
+            num_windows -= num_windows % batch_size
+        self.start = rank * num_windows // num_replicas
+        self.stop = (rank + 1) * num_windows // num_replicas
+
+    def __iter__(self):
+        return iter(range(self.start, self.stop))
+
+    def __len__(self):
+        return self.stop - self.start
@@ -0,0 +1,92 @@
+import math
+import numpy as np
+import torch
+
+
+class ResidentLoader:
+    """
+    dataset의 WindowStore 전체와 window 시작 행 테이블을 학습 device의 tensor로 올려두고
+    DataLoader / worker 프로세스 없이 배치를 만드는 loader.
+
+    셔플 순서는 device 위에서 randperm으로 만들고, 배치는 시작 행 + arange 인덱스로 한 번에 gather 한다.
+    num_replicas > 1 이면 DistributedSampler와 같은 방식으로 (padding 후 rank 간격으로) 나눠 가진다.
+    pad=False 이면 (평가용) padding 없이 rank별 연속 구간으로 나눠 각 window를 한 번씩만 돌려준다.
+    epoch마다 seed + epoch으로 순서를 정하므로 모든 rank가 같은 순열을 본다.
+    DistributedSampler처럼 epoch은 자동으로 늘지 않으므로 학습 loop에서 epoch마다 set_epoch()을 호출해야 한다
+    (중간에 멈춘 iteration이나 재개 시 건너뛴 배치와 무관하게 epoch별 순열이 정해짐).
+
+    DataLoader와 같은 (seq_x, seq_y, seq_x_mark, seq_y_mark, inst_id) 배치를 돌려준다.
+    """
+    def __init__(self, dataset, batch_size, device, shuffle=True, drop_last=True,
+                 num_replicas=1, rank=0, seed=0, pad=True):
+        if not hasattr(dataset, 'store'):
+            raise ValueError(f"{dataset.__class__.__name__} has no WindowStore and cannot be used as resident data")
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.device = device
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed
+        self.pad = pad
+        self.epoch = 0
+
+        self.seq_len, self.label_len, self.pred_len = dataset.seq_len, dataset.label_len, dataset.pred_len
+
+        store = dataset.store
+        self.data = torch.as_tensor(np.asarray(store.data, dtype=np.float32), device=device)
+        self.stamp = torch.as_tensor(np.asarray(store.stamp, dtype=np.float32), device=device)
+
+        # window i의 연속 배열 기준 시작 행과 installation ID
+        window_offsets = dataset.window_offsets
+        num_windows = int(window_offsets[-1])
+        series_idx, start = store.locate(window_offsets, np.arange(num_windows, dtype=np.int64))
+        self.starts = torch.as_tensor(store.row_index(series_idx, start), dtype=torch.long, device=device)
+        self.inst_ids = torch.as_tensor(dataset.inst_id_array[series_idx], device=device)
+
+        self.x_steps = torch.arange(self.seq_len, device=device)
+        self.y_steps = torch.arange(self.label_len + self.pred_len, device=device) + (self.seq_len - self.label_len)
+
+        # DistributedSampler와 같은 rank별 샘플 수
+        self.num_samples = math.ceil(num_windows / num_replicas)
+        self.total_size = self.num_samples * num_replicas
+        if not pad:
+            # ShardedEvalSampler와 같은 연속 구간 (drop_last면 단일 프로세스에서 버려질 마지막 배치를 먼저 제외)
+            if drop_last:
+                num_windows -= num_windows % batch_size
+            self.shard_start = rank * num_windows // num_replicas
+            self.num_samples = (rank + 1) * num_windows // num_replicas - self.shard_start
+            self.drop_last = False
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        if self.drop_last:
+            return self.num_samples // self.batch_size
+        return math.ceil(self.num_samples / self.batch_size)
+
+    def _indices(self):
+        num_windows = len(self.starts)
+        if self.shuffle:
+            generator = torch.Generator(device=self.device)
+            generator.manual_seed(self.seed + self.epoch)
+            indices = torch.randperm(num_windows, generator=generator, device=self.device)
+        else:
+            indices = torch.arange(num_windows, device=self.device)
+        if not self.pad:
+            return indices[self.shard_start:self.shard_start + self.num_samples]
+        if self.total_size > num_windows:
+            # 모든 rank가 같은 수의 샘플을 갖도록 앞쪽 index를 반복해서 채움
+            indices = torch.cat([indices, indices.repeat(math.ceil(self.total_size / num_windows))[:self.total_size - num_windows]])
+        return indices[self.rank:self.total_size:self.num_replicas]
+
+    def __iter__(self):
+        indices = self._indices()
+        for b in range(len(self)):
+            idx = indices[b * self.batch_size:(b + 1) * self.batch_size]
+            starts = self.starts[idx]
+            x_rows = starts[:, None] + self.x_steps                        # [B x seq_len]
+            y_rows = starts[:, None] + self.y_steps                        # [B x label_len + pred_len]
+            yield self.data[x_rows], self.data[y_rows], self.stamp[x_rows], self.stamp[y_rows], self.inst_ids[idx]
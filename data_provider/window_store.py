@@ -0,0 +1,182 @@
+import os
+import re
+import time
+import hashlib
+import numpy as np
+
+# 이 시간 (초) 동안 쓰이거나 열리지 않은 다른 digest의 store 파일만 삭제
+STALE_SECONDS = 24 * 60 * 60
+
+
+class WindowStore:
+    """
+    installation별 시계열 배열을 하나의 연속 배열로 합치고 offsets 테이블로 구분하는 저장소.
+
+    backend='memory' 이면 프로세스 메모리에 하나의 배열로 들고 있고,
+    backend='mmap' 이면 npy 파일로 쓴 뒤 read-only memory-map으로 연다.
+    mmap은 같은 파일을 여는 DataLoader worker / DDP rank가 page cache를 공유하므로
+    worker 수가 늘어도 RSS가 데이터 크기만큼 늘어나지 않는다.
+
+    Attributes:
+        data (np.ndarray): [total_len, C] float32, 모든 installation의 채널 값
+        stamp (np.ndarray): [total_len, F] float32, 시간 피처
+        offsets (np.ndarray): [n_series + 1] int64, series i는 data[offsets[i]:offsets[i+1]]
+    """
+    BACKENDS = ('memory', 'mmap')
+
+    def __init__(self, data, stamp, offsets):
+        self.data = data
+        self.stamp = stamp
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, data_list, stamp_list, backend='memory', store_dir=None, name='store'):
+        if backend not in cls.BACKENDS:
+            raise ValueError(f"Unknown data store backend: {backend}. Choose from {cls.BACKENDS}")
+
+        lengths = np.array([len(d) for d in data_list], dtype=np.int64)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+
+        if backend == 'memory':
+            data = np.ascontiguousarray(np.concatenate(data_list), dtype=np.float32)
+            stamp = np.ascontiguousarray(np.concatenate(stamp_list), dtype=np.float32)
+            return cls(data, stamp, offsets)
+
+        if store_dir is None:
+            raise ValueError("store_dir is required for the mmap backend")
+        os.makedirs(store_dir, exist_ok=True)
+
+        # 같은 내용이면 같은 파일을 쓰도록 내용 해시로 파일명 결정 (rank 간 page cache 공유)
+        digest = _arrays_digest(data_list + stamp_list)
+        data_path = os.path.join(store_dir, f'{name}_{digest}_data.npy')
+        stamp_path = os.path.join(store_dir, f'{name}_{digest}_stamp.npy')
+        data = _load_or_write(data_path, data_list)
+        stamp = _load_or_write(stamp_path, stamp_list)
+        _remove_stale_files(store_dir, name, digest, time.time() - STALE_SECONDS)
+        return cls(data, stamp, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def series(self, i):
+        """i번째 installation의 채널 배열 (복사 없는 view)"""
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def stamps(self, i):
+        """i번째 installation의 시간 피처 (복사 없는 view)"""
+        return self.stamp[self.offsets[i]:self.offsets[i + 1]]
+
+    def window_offsets(self, window_len):
+        """
+        installation별 유효 window 개수의 누적합 테이블.
+        window i는 series j (window_offsets[j] <= i < window_offsets[j+1])의 (i - window_offsets[j]) 위치에서 시작한다.
+        window마다 (inst_idx, start) 튜플을 만들지 않으므로 메모리와 생성 시간이 installation 수에만 비례한다.
+
+        Returns:
+            np.ndarray: [n_series + 1] int64
+        """
+        counts = np.maximum(self.lengths - window_len + 1, 0)
+        window_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        window_offsets[1:] = np.cumsum(counts)
+        return window_offsets
+
+    @staticmethod
+    def locate(window_offsets, index):
+        """
+        window index -> (series 위치, series 내 시작 offset). index는 스칼라 또는 정수 배열.
+        """
+        index = np.asarray(index, dtype=np.int64)
+        if np.any((index < 0) | (index >= window_offsets[-1])):
+            raise IndexError(f"window index out of range (num windows: {window_offsets[-1]})")
+        series_idx = np.searchsorted(window_offsets, index, side='right') - 1
+        return series_idx, index - window_offsets[series_idx]
+
+    def row_index(self, series_idx, start):
+        """(series 위치, series 내 offset) -> 연속 배열 기준 행 번호"""
+        return self.offsets[series_idx] + start
+
+    @staticmethod
+    def gather(array, row_starts, length):
+        """
+        row_starts 각각에서 시작하는 길이 length의 구간을 한 번의 fancy-index로 모아 [B, length, C] 배열 생성
+        """
+        rows = np.asarray(row_starts, dtype=np.int64)[:, None] + np.arange(length, dtype=np.int64)
+        return np.ascontiguousarray(array[rows], dtype=np.float32)
+
+
+def collate_windows(batch):
+    """
+    __getitems__가 이미 쌓아서 돌려준 배치는 그대로 통과시키고,
+    __getitems__를 지원하지 않는 PyTorch 버전에서 샘플 리스트가 들어오면 default_collate 사용
+    """
+    if isinstance(batch, tuple):
+        return batch
+    from torch.utils.data.dataloader import default_collate
+    return default_collate(batch)
+
+
+def _arrays_digest(arrays):
+    h = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr, dtype=np.float32)
+        h.update(str(arr.shape).encode('utf-8'))
+        h.update(memoryview(arr).cast('B'))
+    return h.hexdigest()[:16]
+
+
+def _remove_stale_files(store_dir, name, digest, before):
+    """
+    같은 name의 다른 digest 파일 (데이터 / 설정이 바뀌기 전의 store) 중 mtime이 before보다 오래된 것만 삭제.
+    store를 열 때마다 mtime을 갱신하므로 (_write_concatenated) 설정이 다른 실행이 같은 cache_dir를
+    동시에 써도 최근에 열린 파일은 지우지 않는다. 이미 memory-map으로 열어둔 프로세스는 파일이 지워져도 계속 읽을 수 있다.
+    """
+    pattern = re.compile(rf'{re.escape(name)}_([0-9a-f]{{16}})_(data|stamp)\.npy')
+    for file_name in os.listdir(store_dir):
+        match = pattern.fullmatch(file_name)
+        if match and match.group(1) != digest:
+            path = os.path.join(store_dir, file_name)
+            try:
+                if os.stat(path).st_mtime < before:
+                    os.remove(path)
+            except FileNotFoundError:
+                # 다른 rank가 먼저 지운 경우
+                pass
+
+
+def _load_or_write(path, arrays):
+    """path를 (없으면 arrays로 써서) read-only memory-map으로 연다"""
+    _write_concatenated(path, arrays)
+    try:
+        return np.load(path, mmap_mode='r')
+    except FileNotFoundError:
+        # 확인과 load 사이에 다른 프로세스가 오래된 파일로 보고 지운 경우 다시 씀
+        _write_concatenated(path, arrays)
+        return np.load(path, mmap_mode='r')
+
+
+def _write_concatenated(path, arrays):
+    """arrays를 행 방향으로 이어 붙여 npy 파일로 저장. 이미 있으면 사용 중 표시로 mtime만 갱신."""
+    try:
+        os.utime(path)
+        return
+    except FileNotFoundError:
+        pass
+    except OSError:
+        # 다른 사용자의 파일 등 mtime을 바꿀 수 없어도 읽기는 가능
+        return
+    total_len = sum(len(arr) for arr in arrays)
+    n_cols = arrays[0].shape[1]
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(total_len, n_cols))
+    start = 0
+    for arr in arrays:
+        out[start:start + len(arr)] = arr
+        start += len(arr)
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
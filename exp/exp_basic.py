@@ -10,15 +10,14 @@ class Exp_Basic(object):
     def __init__(self, args):
         self.args = args
         self._init_distributed_mode(args)  # Initialize distributed training
-        self.device = torch.device(f'cuda:{args.local_rank}' if torch.cuda.is_available() else 'cpu')
+        if args.distributed:
+            # gloo backend는 GPU가 있어도 CPU에서 학습
+            self.device = torch.device(f'cuda:{args.local_rank}' if args.dist_backend == 'nccl' else 'cpu')
+        else:
+            self.device = torch.device(f'cuda:{args.local_rank}' if torch.cuda.is_available() else 'cpu')
+        # DDP wrapping은 _build_model에서 (freeze / compile 이후에) 처리
         model = self._build_model()
         model = model.to(self.device)
-        if args.distributed:
-            model = nn.parallel.DistributedDataParallel(
-                model,
-                device_ids=[args.local_rank],
-                output_device=args.local_rank
-            )
         self.model = model
 
     def _build_model(self):
@@ -67,20 +66,48 @@ class Exp_Basic(object):
 
         args.distributed = True
 
-        # 명시적으로 GPU 디바이스 설정
-        torch.cuda.set_device(args.local_rank)
-        args.dist_backend = 'nccl'
-
-        dist.init_process_group(
-            backend=args.dist_backend,
-            init_method='env://',
-            world_size=args.world_size,
-            rank=args.rank,
-            )
-        dist.barrier(device_ids=[args.local_rank])
-        # torch.distributed.barrier(device_ids=[args.local_rank])
+        # backend는 device 기준으로 선택: GPU면 nccl, CPU면 gloo
+        backend = getattr(args, 'dist_backend', 'auto')
+        if backend == 'auto':
+            backend = 'nccl' if torch.cuda.is_available() else 'gloo'
+        args.dist_backend = backend
+
+        if backend == 'nccl':
+            # 명시적으로 GPU 디바이스 설정
+            torch.cuda.set_device(args.local_rank)
+        elif getattr(args, 'cpu_threads', 0) <= 0:
+            # 한 노드에 rank가 여러 개면 core를 나눠 가져서 thread 과다 할당을 막음
+            local_world_size = int(os.environ.get('LOCAL_WORLD_SIZE', 1))
+            num_cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+            torch.set_num_threads(max(1, num_cores // local_world_size))
+
+        # itr 반복으로 Exp를 다시 만들 때는 이미 만든 process group을 재사용
+        if not dist.is_initialized():
+            dist.init_process_group(
+                backend=backend,
+                init_method='env://',
+                world_size=args.world_size,
+                rank=args.rank,
+                )
+        if backend == 'nccl':
+            dist.barrier(device_ids=[args.local_rank])
+        else:
+            dist.barrier()
         self._setup_for_distributed(args.rank == 0)
 
+    def _is_main_process(self):
+        return not self.args.distributed or self.args.rank == 0
+
+    def _all_reduce_sum(self, values):
+        """
+        values (list of float)를 모든 rank에 대해 합산. 분산 학습이 아니면 그대로 돌려줌
+        """
+        if not self.args.distributed:
+            return list(values)
+        tensor = torch.tensor(values, dtype=torch.float64, device=self.device)
+        dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+        return tensor.tolist()
+
     def _setup_for_distributed(self, is_master):
         """
         This function disables printing when not in master process
@@ -1,15 +1,22 @@
 from data_provider.data_factory import data_provider
+from data_provider.window_store import collate_windows
 from exp.exp_basic import Exp_Basic
 from models import Informer, Autoformer, Transformer, DLinear, Linear, NLinear, PatchTST, LSTM
 # from models.Stat_models import Naive_repeat, Arima
-from utils.tools import EarlyStopping, adjust_learning_rate, visual, test_params_flop, visual_out, visual_original
+from utils.tools import EarlyStopping, adjust_learning_rate, visual, test_params_flop, visual_out, visual_original, unwrap_model, SyncCounter
 from utils.metrics import MetricEvaluator
+from utils.feature_cache import FeatureCache
+from utils.ridge_probe import RidgeStats, solve_ridge, ridge_memory_bytes
+from utils.checkpoint import CheckpointManager, get_rng_state, set_rng_state
+from utils.profiler import StageTimer
 
 import numpy as np
 import torch
 import torch.nn as nn
+import torch.distributed as dist
 from torch import optim
 from torch.optim import lr_scheduler
+from torch.utils.data import DataLoader
 import matplotlib.pyplot as plt
 import os
 
@@ -22,6 +29,8 @@ from matplotlib.ticker import MaxNLocator
 import os
 import time
 import datetime
+import itertools
+import contextlib
 
 import warnings
 import matplotlib.pyplot as plt
@@ -38,6 +47,13 @@ class Exp_Main(Exp_Basic):
         self.project_name = "pv-forecasting-freeze-test"
         current_time = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         self.run_name = f"{self.args.model}_run_{current_time}"
+        # 학습 / 검증 loop에서 device -> host 동기화 횟수 (epoch마다 초기화)
+        self.sync_counter = SyncCounter()
+        self.stage_timers = {}
+        self.target_only_checked = False
+        if self.args.sync_debug and self.device.type == 'cuda':
+            # SyncCounter를 거치지 않는 동기화까지 CUDA가 경고하도록 함 (opt-in, 디버깅용)
+            torch.cuda.set_sync_debug_mode('warn')
 
     def _build_model(self):
         model_dict = {
@@ -65,19 +81,28 @@ class Exp_Main(Exp_Basic):
         print(f"Total parameters: {total_params}")
         print(f"Trainable parameters: {trainable_params}")
 
-        if self.args.resume:
+        # training_state.pth가 있으면 train()에서 optimizer 등과 함께 복원
+        if self.args.resume and not os.path.exists(os.path.join('./checkpoints', self.args.source_model_dir, 'training_state.pth')):
             model = self.load_model(model, self.args.source_model_dir)
 
         # 2. 사전 학습된 모델 로드 및 레이어 프리징
         if (self.args.num_freeze_layers > 0) or (self.args.linear_probe):
             model = self._freeze_layers(model)
         
+        # torch.compile: nn.Module.compile은 모듈을 감싸지 않으므로 state_dict key가 그대로 유지됨
+        if self.args.compile:
+            model.compile()
+
         # 3. 분산 학습 설정
         if self.args.distributed:
+            # CPU (gloo)에서는 device_ids 없이 wrapping
+            on_gpu = self.device.type == 'cuda'
+            # target_only + individual head이면 target 채널 head만 gradient를 받으므로 나머지 채널 head는 unused
             model = nn.parallel.DistributedDataParallel(
                 model,
-                device_ids=[self.args.local_rank],
-                output_device=self.args.local_rank
+                device_ids=[self.args.local_rank] if on_gpu else None,
+                output_device=self.args.local_rank if on_gpu else None,
+                find_unused_parameters=bool(self.args.target_only and self.args.individual)
             )
         
         return model
@@ -86,11 +111,14 @@ class Exp_Main(Exp_Basic):
         """Helper function to handle layer freezing"""
         model = self.load_model(model, self.args.source_model_dir)
 
+        # feature cache는 prefix 출력을 고정값으로 쓰므로 input embedding과 RevIN까지 함께 프리징
+        freeze_prefix = self._use_feature_cache()
+
         # Linear probing: Freeze all except head
         if self.args.linear_probe:
             for name, param in model.named_parameters():
                 # Exclude positional and input embedding from freezing
-                if 'W_pos' in name or 'W_P' in name:
+                if ('W_pos' in name or 'W_P' in name) and not freeze_prefix:
                     continue
                 if 'head' not in name:
                     param.requires_grad = False
@@ -103,7 +131,9 @@ class Exp_Main(Exp_Basic):
             layers_to_freeze = list(range(0, self.args.num_freeze_layers))
             
             # Build a list of layers to freeze (excluding head)
-            freeze_layers = [f'backbone.encoder.layers.{i}' for i in layers_to_freeze]
+            freeze_layers = [f'backbone.encoder.layers.{i}.' for i in layers_to_freeze]
+            if freeze_prefix:
+                freeze_layers += ['backbone.W_P', 'backbone.W_pos', 'revin_layer']
             
             # Freeze specified layers
             for name, param in model.named_parameters():
@@ -113,8 +143,178 @@ class Exp_Main(Exp_Basic):
 
         return model
 
+    def _check_target_only(self, batch_x, transfer_flag, rtol=1e-4, atol=1e-5):
+        """
+        target_only 모드일 때 target 채널만 통과시킨 출력이 전체 채널 경로의 target 출력과 같은지 확인.
+        channel-independent 가정이 깨지는 설정(예: 채널 간 섞이는 head)이면 여기서 바로 실패시킨다.
+        전체 채널 forward가 한 번 더 들어가므로 프로세스에서 처음 한 번만 확인한다.
+        """
+        if not (self.args.target_only and self.args.model == 'PatchTST') or self.target_only_checked:
+            return
+        self.target_only_checked = True
+        model = self.model.module if hasattr(self.model, 'module') else self.model
+        max_err, scale = model.target_only_max_error(batch_x, transfer_flag)
+        if max_err > atol + rtol * scale:
+            raise RuntimeError(f"target_only output differs from the full-channel path (max abs error {max_err:.3e})")
+        print(f'target_only equivalence check passed (max abs error {max_err:.3e})')
+
+    def _use_feature_cache(self):
+        if self.args.feature_cache == 'none' or not (self.args.linear_probe or self.args.num_freeze_layers > 0):
+            return False
+        if self.args.model != 'PatchTST' or self.args.decomposition:
+            raise ValueError("--feature_cache is only supported for PatchTST without decomposition")
+        if self.args.distributed:
+            raise ValueError("--feature_cache is not supported with distributed training")
+        return True
+
+    def _num_frozen_layers(self):
+        # linear probing이면 encoder 전체가 frozen prefix
+        if self.args.linear_probe:
+            return self.args.e_layers
+        return min(self.args.num_freeze_layers, self.args.e_layers)
+
+    def _cache_target_only(self):
+        """
+        feature cache에 target 채널만 저장할지. loss에는 target 채널만 쓰이므로 suffix가 채널을 섞지 않으면 충분하다:
+        --target_only 이거나, encoder 전체가 frozen (linear probing)이라 suffix가 채널별 head뿐인 경우
+        (학습 모드 BatchNorm이 있는 encoder layer가 suffix에 남으면 배치 통계에 모든 채널이 들어가므로 제외)
+        """
+        return self.args.target_only or self._num_frozen_layers() == self.args.e_layers
+
+    def _sequential_loader(self, data_set):
+        """셔플 없이 마지막 배치까지 모든 window를 순서대로 돌려주는 DataLoader"""
+        return DataLoader(data_set, batch_size=self.args.batch_size, shuffle=False, drop_last=False,
+                          num_workers=self.args.num_workers, pin_memory=True,
+                          collate_fn=collate_windows if hasattr(data_set, '__getitems__') else None)
+
+    def _build_feature_cache(self, data_loader, cache_dir):
+        """
+        frozen prefix의 출력을 window마다 한 번 계산해 저장.
+        prefix는 학습되지 않으므로 eval 모드(dropout off, BatchNorm running stats)로 계산한다.
+        """
+        n_frozen = self._num_frozen_layers()
+        cache = FeatureCache(len(data_loader.dataset), backend=self.args.feature_cache, cache_dir=cache_dir)
+        self.model.eval()
+        with torch.no_grad():
+            for batch_x, batch_y, _, _, _ in data_loader:
+                batch_x = batch_x.float().to(self.device)
+                features = self.model.forward_prefix(batch_x, n_frozen, self._cache_target_only())
+                cache.append(features, batch_y[:, -self.args.pred_len:, -1:].float())
+        self.model.train()
+        return cache
+
+    def _vali_cached(self, vali_cache, criterion, transfer_flag):
+        total_loss = torch.zeros((), dtype=torch.float64, device=self.device)
+        num_batches = 0
+        n_frozen = self._num_frozen_layers()
+        self.model.eval()
+        with torch.no_grad():
+            for features, batch_y in vali_cache.batches(self.args.batch_size, self.device, shuffle=False, drop_last=False):
+                outputs = self.model.forward_suffix(features, n_frozen, transfer_flag, self._cache_target_only())
+                outputs = outputs[:, -self.args.pred_len:, -1:]
+                loss = criterion(outputs, batch_y)
+                total_loss += loss.detach()
+                num_batches += 1
+        self.model.train()
+        return self.sync_counter.item(total_loss) / num_batches
+
+    def _ridge_probe_batch(self, batch_x, batch_y):
+        """
+        linear probe head의 입력 feature와 head 공간의 target, 샘플 가중치 계산.
+        head 출력 o는 RevIN denorm을 거쳐 y = (o - b) / (a + eps^2) * stdev + mean 이 되므로
+        target을 head 공간으로 옮기고 (stdev / (a + eps^2))^2 로 가중하면 원래 MSE와 같은 목적함수가 된다.
+        """
+        model = self.model
+        features = model.forward_prefix(batch_x, self.args.e_layers)
+        hidden = features['hidden'][:, -1]                                         # [bs x patch_num x d_model]
+        h = hidden.transpose(1, 2).reshape(hidden.shape[0], -1)                    # Flatten_Head와 같은 순서 (d_model x patch_num)
+        y = batch_y[:, -self.args.pred_len:, -1]                                   # [bs x pred_len]
+        w = torch.ones_like(y[:, 0])
+        if model.model.revin:
+            revin = model.model.revin_layer
+            center = features['last' if revin.subtract_last else 'mean'][:, 0, -1:]
+            stdev = features['stdev'][:, 0, -1:]
+            t = (y - center) / stdev
+            scale = stdev[:, 0]
+            if revin.affine:
+                c = features['n_in'] - 1
+                a = revin.affine_weight[c] + revin.eps * revin.eps
+                t = t * a + revin.affine_bias[c]
+                scale = scale / a
+            w = scale ** 2
+        else:
+            t = y
+        return h, t, w
+
+    def _fit_ridge_probe(self, save_path, transfer_flag):
+        """
+        linear probing의 head를 AdamW 대신 ridge 회귀의 닫힌 해로 계산.
+        train loader 한 번으로 Gram 행렬과 cross-covariance를 누적하고 val split에서 lambda를 고른 뒤 checkpoint.pth로 저장한다.
+        """
+        if self.args.model != 'PatchTST' or self.args.decomposition or self.args.distributed:
+            raise ValueError("--probe_solver ridge is only supported for single-process PatchTST without decomposition")
+        train_data, train_loader = self._get_data(flag='train')
+        _, vali_loader = self._get_data(flag='val')
+
+        backbone = self.model.model
+        head = backbone.head
+        n_features = backbone.head_nf
+        fit_time = time.time()
+
+        def accumulate(data_loader, flag):
+            stats = RidgeStats(n_features, self.args.pred_len, self.device)
+            for batch_x, batch_y, _, _, _ in data_loader:
+                batch_x = batch_x.float().to(self.device)
+                batch_y = batch_y.float().to(self.device)
+                stats.update(*self._ridge_probe_batch(batch_x, batch_y))
+            if stats.n == 0:
+                raise ValueError(f"--probe_solver ridge got no {flag} windows (the split is smaller than one batch with drop_last)")
+            return stats
+
+        n_in = len(train_data.input_channels)
+        self.model.eval()
+        with torch.no_grad():
+            train_stats = accumulate(train_loader, 'train')
+            vali_stats = accumulate(vali_loader, 'val')
+            weight, bias, best_lambda, results = solve_ridge(train_stats, vali_stats)
+
+            for lam, mse in results:
+                print(f'\tridge lambda: {lam:.3e} | Vali Loss: {mse:.7f}')
+            print(f'Ridge probe: lambda {best_lambda:.3e} chosen on val ({train_stats.n} train windows, {time.time() - fit_time:.1f}s)')
+
+            # target 채널이 통과하는 head에 해를 씀 (transfer padding 시 앞쪽 채널이 0으로 채워짐)
+            if head.individual:
+                linear = head.linears[(5 if transfer_flag and n_in < 5 else n_in) - 1]
+            else:
+                linear = head.linear
+            linear.weight.copy_(weight.to(linear.weight))
+            linear.bias.copy_(bias.to(linear.bias))
+        self.model.train()
+
+        best_model_path = os.path.join(save_path, 'checkpoint.pth')
+        torch.save(self.model.state_dict(), best_model_path)
+        torch.save(self.model.state_dict(), os.path.join(save_path, 'model_latest.pth'))
+        return self.model
+
+    def _amp_dtype(self):
+        """use_amp에서 쓸 autocast dtype. auto이면 CUDA는 fp16, CPU는 bf16"""
+        if self.args.amp_dtype == 'auto':
+            return torch.float16 if self.device.type == 'cuda' else torch.bfloat16
+        return {'fp16': torch.float16, 'bf16': torch.bfloat16}[self.args.amp_dtype]
+
+    def _autocast(self):
+        """use_amp이면 현재 device에 맞는 autocast context, 아니면 아무것도 하지 않는 context"""
+        if not self.args.use_amp:
+            return contextlib.nullcontext()
+        return torch.autocast(device_type=self.device.type, dtype=self._amp_dtype())
+
+    def _grad_scaler(self):
+        # loss scaling은 CUDA fp16에서만 필요 (bf16은 fp32와 지수 범위가 같음)
+        enabled = self.device.type == 'cuda' and self._amp_dtype() == torch.float16
+        return torch.cuda.amp.GradScaler(enabled=enabled)
+
     def _get_data(self, flag):
-        data_set, data_loader = data_provider(self.args, flag, self.args.distributed)
+        data_set, data_loader = data_provider(self.args, flag, self.args.distributed, device=self.device)
         return data_set, data_loader
 
     def _select_optimizer(self, part=None):
@@ -147,7 +347,7 @@ class Exp_Main(Exp_Basic):
         elif (self.args.num_freeze_layers > 0) or (self.args.linear_probe) or self.args.is_fully_finetune:
             model_path = os.path.join(source_model_dir, 'checkpoint.pth')
 
-        model.load_state_dict(torch.load(model_path))
+        model.load_state_dict(torch.load(model_path, map_location='cpu'))
         print(f'Model loaded from {model_path}')
         return model 
 
@@ -177,6 +377,15 @@ class Exp_Main(Exp_Basic):
                 config=config
             )        
         
+        if self.args.linear_probe and self.args.probe_solver == 'ridge':
+            # head_nf = d_model * patch_num 이 크면 Gram 행렬이 수 GB가 되므로 그때는 AdamW로 학습
+            ridge_gb = ridge_memory_bytes(unwrap_model(self.model).model.head_nf) / 2 ** 30
+            if ridge_gb <= self.args.ridge_max_gb:
+                os.makedirs(self.args.output_dir, exist_ok=True)
+                return self._fit_ridge_probe(self.args.output_dir, transfer_flag=True)
+            print(f'Warning: ridge probe needs {ridge_gb:.1f} GB for its Gram matrices (--ridge_max_gb {self.args.ridge_max_gb}); '
+                  f'falling back to adamw')
+
         train_data, train_loader = self._get_data(flag='train')
         vali_data, vali_loader = self._get_data(flag='val')
         vali_data, vali_loader = self._get_data(flag='test')
@@ -184,13 +393,26 @@ class Exp_Main(Exp_Basic):
         save_path = os.path.join(self.args.output_dir) if 'checkpoint.pth' not in self.args.output_dir else self.args.output_dir
         os.makedirs(save_path, exist_ok=True)
 
+        train_cache, vali_cache = None, None
+        if self._use_feature_cache():
+            cache_time = time.time()
+            cache_dir = os.path.join(save_path, 'feature_cache')
+            # 셔플 / 마지막 배치 버리기는 epoch마다 FeatureCache.batches에서 하므로 train window는 순서대로 전부 저장
+            train_cache = self._build_feature_cache(self._sequential_loader(train_data), os.path.join(cache_dir, 'train'))
+            vali_cache = self._build_feature_cache(vali_loader, os.path.join(cache_dir, 'val'))
+            print(f'Feature cache ({self.args.feature_cache}): {len(train_cache)} train / {len(vali_cache)} val windows, '
+                  f'{self._num_frozen_layers()} frozen layers, {time.time() - cache_time:.1f}s')
+
         train_steps = len(train_loader)
-        early_stopping = EarlyStopping(patience=self.args.patience, verbose=True)
+        # checkpoint 쓰기는 background thread에서 처리 (rank 0만)
+        checkpoint_manager = CheckpointManager(save_path, enabled=self._is_main_process())
+        early_stopping = EarlyStopping(patience=self.args.patience, verbose=True, save=self._is_main_process(),
+                                       checkpoint_manager=checkpoint_manager)
         model_optim = self._select_optimizer()
         criterion = self._select_criterion()
         
-        if self.args.use_amp:
-            scaler = torch.cuda.amp.GradScaler()
+        scaler = self._grad_scaler() if self.args.use_amp else None
+        timer = self._stage_timer('train', save_path)
             
         scheduler = lr_scheduler.OneCycleLR(
             optimizer=model_optim,
@@ -202,26 +424,113 @@ class Exp_Main(Exp_Basic):
         transfer_flag = True if (self.args.num_freeze_layers > 0) or self.args.linear_probe or self.args.is_fully_finetune else False
         print(f'Transfer learning flag: {transfer_flag}')
 
-        for epoch in range(self.args.train_epochs):
+        start_epoch, global_step = 0, 0
+        resume_state = self._load_training_state() if self.args.resume else None
+        if resume_state is not None:
+            unwrap_model(self.model).load_state_dict(resume_state['model'])
+            model_optim.load_state_dict(resume_state['optimizer'])
+            scheduler.load_state_dict(resume_state['scheduler'])
+            if scaler is not None and resume_state['scaler'] is not None:
+                scaler.load_state_dict(resume_state['scaler'])
+            early_stopping.load_state_dict(resume_state['early_stopping'])
+            start_epoch, global_step = resume_state['epoch'], resume_state['global_step']
+            print(f"Resuming from epoch {start_epoch + 1}, step {resume_state['step']}")
+
+        for epoch in range(start_epoch, self.args.train_epochs):
             iter_count = 0
-            train_losses = []
+            # loss 합은 device에 누적하고 log 주기 / epoch 끝에서만 host로 가져옴
+            train_loss_sum = torch.zeros((), dtype=torch.float64, device=self.device)
+            train_loss_count = 0
+            self.sync_counter.reset()
             epoch_time = time.time()
+            skip_steps = 0
+            if resume_state is not None:
+                # 중단된 epoch 시작 시점의 RNG로 되돌려 같은 셔플 순서를 만든 뒤, 이미 학습한 배치는 건너뜀
+                set_rng_state(resume_state['epoch_rng'])
+                skip_steps = resume_state['step']
+                train_loss_sum.fill_(resume_state['train_loss_sum'])
+                train_loss_count = resume_state['train_loss_count']
+            # 셔플 순서를 결정하는 RNG 상태 (mid-epoch checkpoint에 저장)
+            epoch_rng = get_rng_state()
             
             self.model.train()
-            for i, (batch_x, batch_y, batch_x_mark, batch_y_mark, _) in enumerate(train_loader):
+            if isinstance(getattr(train_loader, 'sampler', None), torch.utils.data.distributed.DistributedSampler):
+                train_loader.sampler.set_epoch(epoch)
+            elif hasattr(train_loader, 'set_epoch'):
+                train_loader.set_epoch(epoch)
+            if train_cache is not None:
+                train_batches = train_cache.batches(self.args.batch_size, self.device, shuffle=True, drop_last=True)
+            else:
+                train_batches = train_loader
+            train_iter = iter(train_batches)
+            if skip_steps > 0:
+                for _ in itertools.islice(train_iter, skip_steps):
+                    pass
+                # dropout 등은 저장 시점의 RNG에서 이어감
+                set_rng_state(resume_state['rng'])
+            resume_state = None
+            timer.start_epoch()
+            for i, batch in enumerate(train_iter, start=skip_steps):
+                timer.begin_step()
                 iter_count += 1
                 model_optim.zero_grad()
                 
-                batch_x = batch_x.float().to(self.device)
-                batch_y = batch_y.float().to(self.device)
-                batch_x_mark = batch_x_mark.float().to(self.device)
-                batch_y_mark = batch_y_mark.float().to(self.device)
+                if train_cache is not None:
+                    # frozen prefix는 캐시된 값을 사용하고 나머지 layer/head만 계산
+                    features, batch_y = batch
+                    if self.args.use_amp:
+                        with self._autocast():
+                            outputs = self.model.forward_suffix(features, self._num_frozen_layers(), transfer_flag, self._cache_target_only())
+                            outputs = outputs[:, -self.args.pred_len:, -1:]
+                            loss = criterion(outputs, batch_y)
+                        timer.lap('forward')
+                        scaler.scale(loss).backward()
+                        timer.lap('backward')
+                        scaler.step(model_optim)
+                        scaler.update()
+                        timer.lap('optimizer')
+                    else:
+                        outputs = self.model.forward_suffix(features, self._num_frozen_layers(), transfer_flag, self._cache_target_only())
+                        outputs = outputs[:, -self.args.pred_len:, -1:]
+                        loss = criterion(outputs, batch_y)
+                        timer.lap('forward')
+                        loss.backward()
+                        timer.lap('backward')
+                        model_optim.step()
+                        timer.lap('optimizer')
+                else:
+                    batch_x, batch_y, batch_x_mark, batch_y_mark, _ = batch
+                    batch_x = batch_x.float().to(self.device)
+                    batch_y = batch_y.float().to(self.device)
+                    batch_x_mark = batch_x_mark.float().to(self.device)
+                    batch_y_mark = batch_y_mark.float().to(self.device)
                 
-                dec_inp = torch.zeros_like(batch_y[:, -self.args.pred_len:, :]).float()
-                dec_inp = torch.cat([batch_y[:, :self.args.label_len, :], dec_inp], dim=1).float().to(self.device)
+                    dec_inp = torch.zeros_like(batch_y[:, -self.args.pred_len:, :]).float()
+                    dec_inp = torch.cat([batch_y[:, :self.args.label_len, :], dec_inp], dim=1).float().to(self.device)
+                    timer.lap('h2d')
                 
-                if self.args.use_amp:
-                    with torch.cuda.amp.autocast():
+                    if self.args.use_amp:
+                        with self._autocast():
+                            if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
+                                outputs = self.model(batch_x, transfer_flag)
+                            else:
+                                if self.args.output_attention:
+                                    outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
+                                else:
+                                    outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
+                        
+                            f_dim = -1 if self.args.features == 'MS' else 0
+                            outputs = outputs[:, -self.args.pred_len:, f_dim:]
+                            batch_y = batch_y[:, -self.args.pred_len:, f_dim:].to(self.device)
+                            loss = criterion(outputs, batch_y)
+                        timer.lap('forward')
+                        
+                        scaler.scale(loss).backward()
+                        timer.lap('backward')
+                        scaler.step(model_optim)
+                        scaler.update()
+                        timer.lap('optimizer')
+                    else:
                         if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
                             outputs = self.model(batch_x, transfer_flag)
                         else:
@@ -229,41 +538,29 @@ class Exp_Main(Exp_Basic):
                                 outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
                             else:
                                 outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
-                        
-                        f_dim = -1 if self.args.features == 'MS' else 0
-                        outputs = outputs[:, -self.args.pred_len:, f_dim:]
-                        batch_y = batch_y[:, -self.args.pred_len:, f_dim:].to(self.device)
-                        loss = criterion(outputs, batch_y)
-                        
-                    scaler.scale(loss).backward()
-                    scaler.step(model_optim)
-                    scaler.update()
-                else:
-                    if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
-                        outputs = self.model(batch_x, transfer_flag)
-                    else:
-                        if self.args.output_attention:
-                            outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
-                        else:
-                            outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
                     
-                    outputs = outputs[:, -self.args.pred_len:, -1:]
-                    batch_y = batch_y[:, -self.args.pred_len:, -1:].to(self.device)
-                    loss = criterion(outputs, batch_y)
-                    # loss = self.masked_loss(outputs, batch_y, mask_value=-9999, loss_fn=criterion)  ### BSH
+                        outputs = outputs[:, -self.args.pred_len:, -1:]
+                        batch_y = batch_y[:, -self.args.pred_len:, -1:].to(self.device)
+                        loss = criterion(outputs, batch_y)
+                        # loss = self.masked_loss(outputs, batch_y, mask_value=-9999, loss_fn=criterion)  ### BSH
+                        timer.lap('forward')
                     
-                    loss.backward()
-                    model_optim.step()
+                        loss.backward()
+                        timer.lap('backward')
+                        model_optim.step()
+                        timer.lap('optimizer')
                 
-                train_losses.append(loss.item())
+                train_loss_sum += loss.detach()
+                train_loss_count += 1
 
                 if (i + 1) % 100 == 0:
+                    loss_value = self.sync_counter.item(loss)
                     if self.args.wandb and (not self.args.distributed or self.args.rank == 0):
                         wandb.log({
                             "iteration": (epoch * len(train_loader)) + i + 1,
-                            "train_loss_iteration": loss.item()
+                            "train_loss_iteration": loss_value
                         })
-                    print(f"\titers: {i+1}, epoch: {epoch+1} | loss: {loss.item():.7f}")
+                    print(f"\titers: {i+1}, epoch: {epoch+1} | loss: {loss_value:.7f}")
                     speed = (time.time() - epoch_time) / iter_count
                     left_time = speed * ((self.args.train_epochs - epoch) * train_steps - i)
                     print(f'\tspeed: {speed:.4f}s/iter; left time: {left_time:.4f}s')
@@ -273,12 +570,26 @@ class Exp_Main(Exp_Basic):
                 if self.args.lradj == 'TST':
                     adjust_learning_rate(model_optim, scheduler, epoch + 1, self.args, printout=False)
                     scheduler.step()
+
+                global_step += 1
+                if self.args.save_every_steps > 0 and global_step % self.args.save_every_steps == 0:
+                    timer.lap('other')
+                    self._save_training_state(checkpoint_manager, epoch, i + 1, global_step, epoch_rng,
+                                              (train_loss_sum, train_loss_count),
+                                              model_optim, scheduler, scaler, early_stopping)
+                    timer.lap('checkpoint')
+                timer.end_step(len(batch_y))
+            timer.end_epoch()
             
-            train_loss = np.average(train_losses)
-            vali_loss = self.vali(vali_loader, criterion)
+            train_loss = self.sync_counter.item(train_loss_sum) / train_loss_count
+            if vali_cache is not None:
+                vali_loss = self._vali_cached(vali_cache, criterion, transfer_flag)
+            else:
+                vali_loss = self.vali(vali_loader, criterion)
             
             print(f"Epoch: {epoch + 1} | Train Loss: {train_loss:.7f}, Vali Loss: {vali_loss:.7f}")
             print(f"└ cost time: {time.time() - epoch_time}")
+            print(f"└ host syncs: {self.sync_counter.count}")
             if self.args.wandb and (not self.args.distributed or self.args.rank == 0):
                 wandb.log({
                     "epoch": epoch + 1,
@@ -286,6 +597,7 @@ class Exp_Main(Exp_Basic):
                     "validation_loss": vali_loss,
                 })
             
+            # vali_loss는 모든 rank에서 같은 값이므로 early stop 판단도 rank 간에 일치함
             early_stopping(vali_loss, self.model, save_path)
             if early_stopping.early_stop:
                 print("Early stopping triggered")
@@ -295,31 +607,93 @@ class Exp_Main(Exp_Basic):
                 adjust_learning_rate(model_optim, scheduler, epoch + 1, self.args)
             else:
                 print(f'Learning rate updated to {scheduler.get_last_lr()[0]}')
+
+            # epoch 경계 checkpoint: 다음 epoch의 0번째 step부터 재개
+            self._save_training_state(checkpoint_manager, epoch + 1, 0, global_step, get_rng_state(), (0.0, 0),
+                                      model_optim, scheduler, scaler, early_stopping)
         
+        checkpoint_manager.close()
+        if self.args.distributed:
+            dist.barrier()  # rank 0이 checkpoint를 다 쓸 때까지 대기
+        if train_cache is not None:
+            train_cache.close()
+            vali_cache.close()
+
         best_model_path = os.path.join(save_path, 'checkpoint.pth')
-        if self.args.wandb:
+        if self.args.wandb and self._is_main_process():
             upload_files_to_wandb(
                 project_name=self.project_name,
                 run_name=self.run_name,
                 model_weights_path=best_model_path
             )
-
-        final_model_artifact = wandb.Artifact('final_model_weights', type='model')
-        final_model_artifact.add_file(best_model_path)
-        if self.args.wandb:
+            final_model_artifact = wandb.Artifact('final_model_weights', type='model')
+            final_model_artifact.add_file(best_model_path)
             wandb.log_artifact(final_model_artifact)
 
-        self.model.load_state_dict(torch.load(best_model_path))
+        # checkpoint는 rank 0만 저장하므로 (multi-node면 다른 rank에서는 파일이 없음) rank 0이 읽어서 전달
+        best_state = [torch.load(best_model_path, map_location='cpu') if self._is_main_process() else None]
+        if self.args.distributed:
+            dist.broadcast_object_list(best_state, src=0)
+        unwrap_model(self.model).load_state_dict(best_state[0])
         return self.model
 
+    def _stage_timer(self, phase, out_dir):
+        """--profile 일 때 phase별 구간 시간 기록. epoch 번호가 이어지도록 (phase, out_dir)마다 하나를 재사용"""
+        key = (phase, out_dir)
+        if key not in self.stage_timers:
+            trace_steps = tuple(int(v) for v in self.args.profile_trace.split(':')) if self.args.profile_trace else None
+            self.stage_timers[key] = StageTimer(phase, out_dir, self.device,
+                                                enabled=self.args.profile and self._is_main_process(),
+                                                trace_steps=trace_steps)
+        return self.stage_timers[key]
+
+    def _save_training_state(self, checkpoint_manager, epoch, step, global_step, epoch_rng, train_loss,
+                             optimizer, scheduler, scaler, early_stopping):
+        """
+        --resume으로 정확히 같은 step부터 이어서 학습하기 위한 전체 학습 상태를 training_state.pth로 저장.
+        epoch의 step번째 배치까지 학습한 상태이며, epoch_rng는 그 epoch의 셔플 순서를 만든 RNG 상태.
+        train_loss는 그 epoch에서 지금까지의 (loss 합, 배치 수)
+        """
+        if not checkpoint_manager.enabled:
+            return
+        checkpoint_manager.save('training_state.pth', {
+            'model': unwrap_model(self.model).state_dict(),
+            'optimizer': optimizer.state_dict(),
+            'scheduler': scheduler.state_dict(),
+            'scaler': scaler.state_dict() if scaler is not None else None,
+            'early_stopping': early_stopping.state_dict(),
+            'epoch': epoch,
+            'step': step,
+            'global_step': global_step,
+            'epoch_rng': epoch_rng,
+            'rng': get_rng_state(),
+            'train_loss_sum': train_loss[0],
+            'train_loss_count': train_loss[1],
+        })
+
+    def _load_training_state(self):
+        path = os.path.join('./checkpoints', self.args.source_model_dir, 'training_state.pth')
+        if not os.path.exists(path):
+            print(f'No training state found at {path}; resuming from model weights only')
+            return None
+        print(f'Training state loaded from {path}')
+        return torch.load(path, map_location='cpu', weights_only=False)
+
     def vali(self, vali_loader, criterion):
-        total_loss = []
+        """window 평균 loss. 분산 학습이면 rank별로 나눠 평가한 뒤 합산"""
+        total_loss = torch.zeros((), dtype=torch.float64, device=self.device)
+        total_count = 0
         transfer_flag = True if (self.args.num_freeze_layers > 0) or self.args.linear_probe or self.args.is_fully_finetune else False
         print(f'Transfer learning flag: {transfer_flag}')
         self.model.eval()
+        # rank마다 배치 수가 다를 수 있으므로 평가는 DDP를 거치지 않고 내부 모듈로 수행
+        model = unwrap_model(self.model)
+        timer = self._stage_timer('vali', self.args.output_dir)
+        timer.start_epoch()
         
         with torch.no_grad():
             for i, (batch_x, batch_y, batch_x_mark, batch_y_mark, _) in enumerate(vali_loader):
+                timer.begin_step()
                 batch_x = batch_x.float().to(self.device)
                 batch_y = batch_y.float().to(self.device)
                 batch_x_mark = batch_x_mark.float().to(self.device)
@@ -327,33 +701,42 @@ class Exp_Main(Exp_Basic):
                 
                 dec_inp = torch.zeros_like(batch_y[:, -self.args.pred_len:, :]).float()
                 dec_inp = torch.cat([batch_y[:, :self.args.label_len, :], dec_inp], dim=1).float().to(self.device)
+                timer.lap('h2d')
+
+                if i == 0:
+                    self._check_target_only(batch_x, transfer_flag)
                 
                 if self.args.use_amp:
-                    with torch.cuda.amp.autocast():
+                    with self._autocast():
                         if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
-                            outputs = self.model(batch_x, transfer_flag)
+                            outputs = model(batch_x, transfer_flag)
                         else:
                             if self.args.output_attention:
-                                outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
+                                outputs = model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
                             else:
-                                outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
+                                outputs = model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
                 else:
                     if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
-                        outputs = self.model(batch_x, transfer_flag)
+                        outputs = model(batch_x, transfer_flag)
                     else:
                         if self.args.output_attention:
-                            outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
+                            outputs = model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
                         else:
-                            outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
+                            outputs = model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
                 
-                outputs = outputs[:, -self.args.pred_len:, -1:]
+                outputs = outputs[:, -self.args.pred_len:, -1:].float()
                 batch_y = batch_y[:, -self.args.pred_len:, -1:].to(self.device)
                 
                 loss = criterion(outputs, batch_y)
-                total_loss.append(loss.item())
+                total_loss += loss.detach() * len(batch_y)
+                total_count += len(batch_y)
+                timer.lap('forward')
+                timer.end_step(len(batch_y))
+        timer.end_epoch()
         
         self.model.train()
-        return np.average(total_loss)
+        loss_sum, count = self._all_reduce_sum([self.sync_counter.item(total_loss), total_count])
+        return loss_sum / count
 
     def test(self, source_model_dir=None):
         test_data, test_loader = self._get_data(flag='test')
@@ -375,7 +758,7 @@ class Exp_Main(Exp_Basic):
             print(f"Model path: {model_path}")
             model_path = os.path.join(model_path, 'checkpoint.pth')
         print(f"Load model from '{model_path}'")
-        self.model.load_state_dict(torch.load(model_path))
+        unwrap_model(self.model).load_state_dict(torch.load(model_path, map_location=self.device))
         
         # MetricEvaluator 초기화
         # evaluator = MetricEvaluator(file_path=os.path.join(folder_path, "site_metrics.txt"))
@@ -386,15 +769,17 @@ class Exp_Main(Exp_Basic):
             ref_mse_path=self.args.ref_mse_path,
             )
 
-        pred_list = []
-        true_list = []
-        input_list = []
         transfer_flag = True if (self.args.num_freeze_layers > 0) or self.args.linear_probe or self.args.is_fully_finetune else False
         print(f'Transfer learning flag: {transfer_flag}')
         
         self.model.eval()
+        # rank마다 배치 수가 다를 수 있으므로 평가는 DDP를 거치지 않고 내부 모듈로 수행
+        model = unwrap_model(self.model)
+        timer = self._stage_timer('test', result_path)
+        timer.start_epoch()
         with torch.no_grad():
             for i, (batch_x, batch_y, batch_x_mark, batch_y_mark, inst_id) in tqdm(enumerate(test_loader)):
+                timer.begin_step()
                 batch_x = batch_x.float().to(self.device)
                 batch_y = batch_y.float().to(self.device)
                 batch_x_mark = batch_x_mark.float().to(self.device)
@@ -402,28 +787,28 @@ class Exp_Main(Exp_Basic):
                 
                 dec_inp = torch.zeros_like(batch_y[:, -self.args.pred_len:, :]).float()
                 dec_inp = torch.cat([batch_y[:, :self.args.label_len, :], dec_inp], dim=1).float().to(self.device)
+                timer.lap('h2d')
+
+                if i == 0:
+                    self._check_target_only(batch_x, transfer_flag)
               
-                if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
-                    outputs = self.model(batch_x, transfer_flag)
-                else:
-                    if self.args.output_attention:
-                        outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
+                with self._autocast():
+                    if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
+                        outputs = model(batch_x, transfer_flag)
                     else:
-                        outputs = self.model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
+                        if self.args.output_attention:
+                            outputs = model(batch_x, batch_x_mark, dec_inp, batch_y_mark)[0]
+                        else:
+                            outputs = model(batch_x, batch_x_mark, dec_inp, batch_y_mark)
                 
-                outputs = outputs[:, -self.args.pred_len:, -1:]
+                outputs = outputs[:, -self.args.pred_len:, -1:].float()
                 batch_y = batch_y[:, -self.args.pred_len:, -1:].to(self.device)
+                timer.lap('forward')
                 
-                # numpy 변환 및 inverse transform
-                outputs_np = outputs.detach().cpu().numpy()
-                batch_y_np = batch_y.detach().cpu().numpy()
-                batch_x_np = batch_x.detach().cpu().numpy()
+                # inverse transform은 device 위에서 배치 전체에 한 번에 적용한 뒤 numpy로 변환
                 inst_id_np = inst_id.cpu().numpy()
-                
-                # inverse transform 적용
-                input_seq = test_data.inverse_transform(batch_x_np, inst_id_np)
-                pred = test_data.inverse_transform(outputs_np, inst_id_np)
-                true = test_data.inverse_transform(batch_y_np, inst_id_np)
+                pred = test_data.inverse_transform(outputs, inst_id).cpu().numpy()
+                true = test_data.inverse_transform(batch_y, inst_id).cpu().numpy()
 
                 # input_seq = batch_x_np
                 # pred = outputs_np
@@ -431,10 +816,7 @@ class Exp_Main(Exp_Basic):
 
                 # denormalized 데이터로 평가 수행
                 evaluator.update(inst_id=inst_id_np, preds=pred, targets=true)
-                
-                pred_list.append(pred)
-                true_list.append(true)
-                input_list.append(input_seq)
+                timer.end_step(len(batch_y))
 
                 # if i % 10 == 0:
                 #     # self.plot_predictions(i, batch_x_np[0, -5:, -1], batch_y_np[0], outputs_np[0], folder_path)
@@ -445,7 +827,18 @@ class Exp_Main(Exp_Basic):
                 #                           result_path)
         # print(f"Plotting complete. Results saved in {folder_path}")
 
-        # TODO: metric 계산하는거 개선해야 함.
+        timer.end_epoch()
+
+        # 각 rank가 모은 site별 통계량을 합친 뒤 rank 0만 metric 계산 / 결과 저장
+        if self.args.distributed:
+            states = [None] * self.args.world_size
+            dist.all_gather_object(states, evaluator.state())
+            if not self._is_main_process():
+                return
+            for rank, state in enumerate(states):
+                if rank != self.args.rank:
+                    evaluator.merge(state)
+
         # metric 계산 및 결과 출력
         results, overall_mape = evaluator.evaluate_scale_metrics()
 
@@ -671,7 +1064,7 @@ class Exp_Main(Exp_Basic):
             print(f"Model path: {model_path}")
             model_path = os.path.join(model_path, 'checkpoint.pth')
         print(f"Load model from '{model_path}'")
-        self.model.load_state_dict(torch.load(model_path))
+        unwrap_model(self.model).load_state_dict(torch.load(model_path, map_location=self.device))
 
         if 'checkpoint.pth' in model_path:
             # folder_path = os.path.join('./test_results/', model_path.split('/')[:-1])
@@ -693,8 +1086,11 @@ class Exp_Main(Exp_Basic):
         print(f'Transfer learning flag: {transfer_flag}')
         
         self.model.eval()
+        timer = self._stage_timer('predict', result_path)
+        timer.start_epoch()
         with torch.no_grad():
             for i, (batch_x, batch_y, batch_x_mark, batch_y_mark, inst_id) in tqdm(enumerate(test_loader)):
+                timer.begin_step()
                 batch_x = batch_x.float().to(self.device)
                 batch_y = batch_y.float().to(self.device)
                 batch_x_mark = batch_x_mark.float().to(self.device)
@@ -702,6 +1098,10 @@ class Exp_Main(Exp_Basic):
                 
                 dec_inp = torch.zeros_like(batch_y[:, -self.args.pred_len:, :]).float()
                 dec_inp = torch.cat([batch_y[:, :self.args.label_len, :], dec_inp], dim=1).float().to(self.device)
+                timer.lap('h2d')
+
+                if i == 0:
+                    self._check_target_only(batch_x, transfer_flag)
               
                 if 'Linear' in self.args.model or 'TST' in self.args.model or self.args.model == 'LSTM':
                     outputs = self.model(batch_x, transfer_flag)
@@ -713,6 +1113,7 @@ class Exp_Main(Exp_Basic):
                 
                 outputs = outputs[:, -self.args.pred_len:, -1:]
                 batch_y = batch_y[:, -self.args.pred_len:, -1:].to(self.device)
+                timer.lap('forward')
                 
                 # numpy 변환 및 inverse transform
                 outputs_np = outputs.detach().cpu().numpy()
@@ -720,10 +1121,10 @@ class Exp_Main(Exp_Basic):
                 batch_x_np = batch_x.detach().cpu().numpy()
                 inst_id_np = inst_id.cpu().numpy()
                 
-                # inverse transform 적용
-                input_seq = test_data.inverse_transform(batch_x_np, inst_id_np)
-                pred = test_data.inverse_transform(outputs_np, inst_id_np)
-                true = test_data.inverse_transform(batch_y_np, inst_id_np)
+                # inverse transform은 device 위에서 배치 전체에 한 번에 적용
+                input_seq = test_data.inverse_transform(batch_x, inst_id).cpu().numpy()
+                pred = test_data.inverse_transform(outputs, inst_id).cpu().numpy()
+                true = test_data.inverse_transform(batch_y, inst_id).cpu().numpy()
 
                 # input_seq = batch_x_np
                 # pred = outputs_np
@@ -745,6 +1146,8 @@ class Exp_Main(Exp_Basic):
                                           result_path, 
                                           target_dataset,
                                           run_name)
+                timer.end_step(len(batch_y))
+        timer.end_epoch()
         # print(f"Plotting complete. Results saved in {folder_path}")
 
         # TODO: metric 계산하는거 개선해야 함.
@@ -57,14 +57,37 @@ class PatchTST_backbone(nn.Module):
             self.head = Flatten_Head(self.individual, self.n_vars, self.head_nf, target_window, head_dropout=head_dropout)
         
         self.padding = False
-    def forward(self, z, transfer_flag=True):                                                                   # z: [bs x nvars x seq_len]
+    def forward(self, z, transfer_flag=True, target_only=False):                                               # z: [bs x nvars x seq_len]
+        features = self.forward_prefix(z, 0, target_only)
+        return self.forward_suffix(features, 0, transfer_flag, target_only)
+
+    def forward_prefix(self, z, n_frozen, target_only=False):                          # z: [bs x nvars x seq_len]
+        """
+        RevIN norm -> patching -> input encoding -> encoder.layers[:n_frozen] 까지 계산.
+        frozen prefix의 출력을 캐시해두고 forward_suffix로 나머지만 학습할 때 사용한다.
+
+        Returns:
+            dict: 'hidden' [bs x nvars x patch_num x d_model],
+                  res_attention이고 남은 layer가 있으면 'scores' [bs x nvars x n_heads x patch_num x patch_num],
+                  revin이면 'mean'(또는 'last')/'stdev' [bs x 1 x nvars], 입력 채널 수 'n_in' (int)
+        """
+        n_in = z.shape[1]
+        # target_only: channel-independent 구조이므로 target(마지막) 채널만 encoder/head에 통과시킴
+        channels = slice(None)
+        if target_only:
+            channels = slice(n_in - 1, n_in)
+            z = z[:, -1:, :]                                                                # z: [bs x 1 x seq_len]
+        bs, n_vars = z.shape[0], z.shape[1]
+
+        features = {'n_in': n_in}
         # norm
-    
-  
         if self.revin: 
             z = z.permute(0,2,1)
-            z = self.revin_layer(z, 'norm')
+            z = self.revin_layer(z, 'norm', channels)
             z = z.permute(0,2,1)
+            stat = 'last' if self.revin_layer.subtract_last else 'mean'
+            features[stat] = getattr(self.revin_layer, stat)
+            features['stdev'] = self.revin_layer.stdev
             
         # do patching
         if self.padding_patch == 'end':
@@ -73,22 +96,53 @@ class PatchTST_backbone(nn.Module):
         z = z.permute(0,1,3,2)                                                              # z: [bs x nvars x patch_len x patch_num]
         
         # model
-        z = self.backbone(z)
-        if transfer_flag and z.shape[1] < 5:    #
-            self.padding = True
-            original_channel = z.shape[1]
-            padding = torch.zeros((z.shape[0], 5 - original_channel, z.shape[2], z.shape[3])).to(z.device)
-            z = torch.cat((padding, z), dim=1)                                               # z: [bs x nvars x d_model x patch_num]
-        z = self.head(z)                                                                    # z: [bs x nvars x target_window] 
-      
-        if self.padding:
-            z = z[:, 5 - original_channel:, :]
+        u = self.backbone.embed(z)                                                          # u: [bs * nvars x patch_num x d_model]
+        u, scores = self.backbone.encoder.forward_layers(u, stop=n_frozen)
+        features['hidden'] = u.reshape(bs, n_vars, u.shape[-2], u.shape[-1])
+        # encoder 전체가 frozen이면 (linear probing) suffix에서 scores를 쓰지 않으므로 돌려주지 않음
+        if scores is not None and n_frozen < len(self.backbone.encoder.layers):
+            features['scores'] = scores.reshape(bs, n_vars, *scores.shape[1:])
+        return features
+
+    def forward_suffix(self, features, n_frozen, transfer_flag=True, target_only=False):
+        """
+        forward_prefix(.., n_frozen, ..)의 출력에서 encoder.layers[n_frozen:] -> head -> RevIN denorm 계산.
+        """
+        n_in = features['n_in']
+        hidden = features['hidden']                                                         # hidden: [bs x nvars x patch_num x d_model]
+        bs, n_vars = hidden.shape[0], hidden.shape[1]
+        u = hidden.reshape(bs * n_vars, hidden.shape[-2], hidden.shape[-1])
+        scores = features.get('scores')
+        if scores is not None:
+            scores = scores.reshape(bs * n_vars, *scores.shape[2:])
+        u, _ = self.backbone.encoder.forward_layers(u, scores, start=n_frozen)
+        z = u.reshape(bs, n_vars, u.shape[-2], u.shape[-1]).permute(0,1,3,2)               # z: [bs x nvars x d_model x patch_num]
+
+        channels = slice(None)
+        if target_only:
+            channels = slice(n_in - 1, n_in)
+            # 전체 경로에서 target 채널이 통과하는 head 채널 (transfer padding 시 앞쪽이 0으로 채워짐)
+            head_idx = (5 if transfer_flag and n_in < 5 else n_in) - 1
+            z = self.head(z, target_idx=head_idx)                                           # z: [bs x 1 x target_window]
+        else:
+            if transfer_flag and z.shape[1] < 5:    #
+                self.padding = True
+                original_channel = z.shape[1]
+                padding = torch.zeros((z.shape[0], 5 - original_channel, z.shape[2], z.shape[3])).to(z.device)
+                z = torch.cat((padding, z), dim=1)                                           # z: [bs x nvars x d_model x patch_num]
+            z = self.head(z)                                                                # z: [bs x nvars x target_window] 
+          
+            if self.padding:
+                z = z[:, 5 - original_channel:, :]
             
 
         # denorm
         if self.revin: 
+            stat = 'last' if self.revin_layer.subtract_last else 'mean'
+            setattr(self.revin_layer, stat, features[stat])
+            self.revin_layer.stdev = features['stdev']
             z = z.permute(0,2,1)
-            z = self.revin_layer(z, 'denorm')
+            z = self.revin_layer(z, 'denorm', channels)
             z = z.permute(0,2,1)
         return z
     
@@ -118,11 +172,13 @@ class Flatten_Head(nn.Module):
             self.linear = nn.Linear(nf, target_window)
             self.dropout = nn.Dropout(head_dropout)
             
-    def forward(self, x):                                 # x: [bs x nvars x d_model x patch_num]
+    def forward(self, x, target_idx=None):                # x: [bs x nvars x d_model x patch_num]
         if self.individual:
+            # target_idx가 주어지면 x에는 target 채널 하나만 있고 해당 채널의 head만 사용
+            channels = range(self.n_vars) if target_idx is None else [target_idx]
             x_out = []
-            for i in range(self.n_vars):
-                z = self.flattens[i](x[:,i,:,:])          # z: [bs x d_model * patch_num]
+            for out_idx, i in enumerate(channels):
+                z = self.flattens[i](x[:,out_idx,:,:])    # z: [bs x d_model * patch_num]
                 z = self.linears[i](z)                    # z: [bs x target_window]
                 z = self.dropouts[i](z)
                 x_out.append(z)
@@ -169,11 +225,7 @@ class TSTiEncoder(nn.Module):  #i means channel-independent
         
         n_vars = x.shape[1]
         # Input encoding
-        x = x.permute(0,1,3,2)                                                   # x: [bs x nvars x patch_num x patch_len]
-        x = self.W_P(x)                                                          # x: [bs x nvars x patch_num x d_model]
-
-        u = torch.reshape(x, (x.shape[0]*x.shape[1],x.shape[2],x.shape[3]))      # u: [bs * nvars x patch_num x d_model]
-        u = self.dropout(u + self.W_pos)                                         # u: [bs * nvars x patch_num x d_model]
+        u = self.embed(x)                                                        # u: [bs * nvars x patch_num x d_model]
 
         # Encoder
         z = self.encoder(u)                                                      # z: [bs * nvars x patch_num x d_model]
@@ -181,6 +233,14 @@ class TSTiEncoder(nn.Module):  #i means channel-independent
         z = z.permute(0,1,3,2)                                                   # z: [bs x nvars x d_model x patch_num]
         
         return z    
+
+    def embed(self, x) -> Tensor:                                                # x: [bs x nvars x patch_len x patch_num]
+        x = x.permute(0,1,3,2)                                                   # x: [bs x nvars x patch_num x patch_len]
+        x = self.W_P(x)                                                          # x: [bs x nvars x patch_num x d_model]
+
+        u = torch.reshape(x, (x.shape[0]*x.shape[1],x.shape[2],x.shape[3]))      # u: [bs * nvars x patch_num x d_model]
+        u = self.dropout(u + self.W_pos)                                         # u: [bs * nvars x patch_num x d_model]
+        return u
             
             
     
@@ -207,6 +267,17 @@ class TSTEncoder(nn.Module):
             for mod in self.layers: output = mod(output, key_padding_mask=key_padding_mask, attn_mask=attn_mask)
             return output
 
+    def forward_layers(self, src:Tensor, prev:Optional[Tensor]=None, start:int=0, stop:Optional[int]=None,
+                       key_padding_mask:Optional[Tensor]=None, attn_mask:Optional[Tensor]=None):
+        """layers[start:stop]만 통과. res_attention이면 마지막 layer의 scores도 함께 반환 (아니면 None)"""
+        output, scores = src, prev
+        for mod in self.layers[start:stop]:
+            if self.res_attention:
+                output, scores = mod(output, prev=scores, key_padding_mask=key_padding_mask, attn_mask=attn_mask)
+            else:
+                output = mod(output, key_padding_mask=key_padding_mask, attn_mask=attn_mask)
+        return output, scores
+
 
 
 class TSTEncoderLayer(nn.Module):
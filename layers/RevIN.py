@@ -18,12 +18,13 @@ class RevIN(nn.Module):
         if self.affine:
             self._init_params()
 
-    def forward(self, x, mode:str):
+    def forward(self, x, mode:str, channels=slice(None)):
+        # channels: x가 전체 채널 중 일부만 담고 있을 때 사용할 affine 파라미터 범위
         if mode == 'norm':
             self._get_statistics(x)
-            x = self._normalize(x)
+            x = self._normalize(x, channels)
         elif mode == 'denorm':
-            x = self._denormalize(x)
+            x = self._denormalize(x, channels)
         else: raise NotImplementedError
         return x
 
@@ -40,21 +41,21 @@ class RevIN(nn.Module):
             self.mean = torch.mean(x, dim=dim2reduce, keepdim=True).detach()
         self.stdev = torch.sqrt(torch.var(x, dim=dim2reduce, keepdim=True, unbiased=False) + self.eps).detach()
 
-    def _normalize(self, x):
+    def _normalize(self, x, channels=slice(None)):
         if self.subtract_last:
             x = x - self.last
         else:
             x = x - self.mean
         x = x / self.stdev
         if self.affine:
-            x = x * self.affine_weight
-            x = x + self.affine_bias
+            x = x * self.affine_weight[channels]
+            x = x + self.affine_bias[channels]
         return x
 
-    def _denormalize(self, x):
+    def _denormalize(self, x, channels=slice(None)):
         if self.affine:
-            x = x - self.affine_bias
-            x = x / (self.affine_weight + self.eps*self.eps)
+            x = x - self.affine_bias[channels]
+            x = x / (self.affine_weight[channels] + self.eps*self.eps)
         x = x * self.stdev
         if self.subtract_last:
             x = x + self.last
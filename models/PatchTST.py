@@ -46,6 +46,11 @@ class Model(nn.Module):
         kernel_size = configs.kernel_size
         
         
+        # target_only: MS 출력에서 target(마지막) 채널만 backbone에 통과시킴 (channel-independent 구조에서 결과 동일)
+        self.target_only = getattr(configs, 'target_only', False)
+        if self.target_only and pretrain_head:
+            raise ValueError("target_only is not supported with pretrain_head")
+
         # model
         self.decomposition = decomposition
         if self.decomposition:
@@ -78,16 +83,47 @@ class Model(nn.Module):
     
         self.relu = nn.ReLU()
     
-    def forward(self, x, transfer_flag):           # x: [Batch, Input length, Channel]
+    def forward(self, x, transfer_flag, target_only=None):           # x: [Batch, Input length, Channel]
+        # target_only이면 출력은 [Batch, Output length, 1] (target 채널만)
+        if target_only is None:
+            target_only = self.target_only
         if self.decomposition:
             res_init, trend_init = self.decomp_module(x)
             res_init, trend_init = res_init.permute(0,2,1), trend_init.permute(0,2,1)  # x: [Batch, Channel, Input length]
-            res = self.model_res(res_init)
-            trend = self.model_trend(trend_init)
+            res = self.model_res(res_init, target_only=target_only)
+            trend = self.model_trend(trend_init, target_only=target_only)
             x = res + trend
             x = x.permute(0,2,1)    # x: [Batch, Input length, Channel]
         else:
             x = x.permute(0,2,1)    # x: [Batch, Channel, Input length]
-            x = self.model(x, transfer_flag)
+            x = self.model(x, transfer_flag, target_only=target_only)
             x = x.permute(0,2,1)    # x: [Batch, Input length, Channel]
-        return x
\ No newline at end of file
+        return x
+
+    def forward_prefix(self, x, n_frozen, target_only=None):     # x: [Batch, Input length, Channel]
+        """frozen prefix (encoder.layers[:n_frozen]까지)의 출력. feature cache에 저장하는 값"""
+        if self.decomposition:
+            raise NotImplementedError("forward_prefix is not supported with decomposition")
+        if target_only is None:
+            target_only = self.target_only
+        return self.model.forward_prefix(x.permute(0,2,1), n_frozen, target_only)
+
+    def forward_suffix(self, features, n_frozen, transfer_flag, target_only=None):
+        """forward_prefix의 출력에서 나머지 layer와 head를 계산. forward와 같은 [Batch, Output length, Channel] 반환"""
+        if target_only is None:
+            target_only = self.target_only
+        x = self.model.forward_suffix(features, n_frozen, transfer_flag, target_only)
+        return x.permute(0,2,1)
+
+    @torch.no_grad()
+    def target_only_max_error(self, x, transfer_flag):
+        """
+        같은 입력에 대해 전체 채널 경로의 target 출력과 target_only 경로 출력의 최대 절대 오차.
+        BatchNorm/Dropout의 영향을 없애기 위해 eval 모드에서 비교하고 원래 모드로 되돌린다.
+        """
+        was_training = self.training
+        self.eval()
+        full = self.forward(x, transfer_flag, target_only=False)[:, :, -1:]
+        target = self.forward(x, transfer_flag, target_only=True)
+        self.train(was_training)
+        return (full - target).abs().max().item(), full.abs().max().item()
\ No newline at end of file
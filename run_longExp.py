@@ -8,8 +8,7 @@ import numpy as np
 import json
 from utils.tools import StoreDictKeyPair 
 
-if __name__ == '__main__':
-    
+def get_parser():
     parser = argparse.ArgumentParser(description='Autoformer & Transformer family for Time Series Forecasting')
 
     # random seed
@@ -21,6 +20,13 @@ if __name__ == '__main__':
     parser.add_argument('--num_freeze_layers', type=int, default=0,
                         help='num of transformer freeze layer. 0: finetune all layers or do not transfer learning')
     parser.add_argument('--linear_probe', action='store_true', default=False, help='whether to perform linear probing (only train head)')
+    parser.add_argument('--probe_solver', type=str, default='adamw',
+                        help='linear probing head solver. ridge: closed-form ridge regression with lambda chosen on val. options: [adamw, ridge]')
+    parser.add_argument('--ridge_max_gb', type=float, default=4.0,
+                        help='with --probe_solver ridge, fall back to adamw if the float64 Gram matrices would need more memory than this (GB)')
+    parser.add_argument('--feature_cache', type=str, default='none',
+                        help='PatchTST transfer learning: compute the frozen prefix once and train the rest from cached features. '
+                             'W_P/W_pos and RevIN are frozen as well. options: [none, memory, mmap]')
 
     parser.add_argument('--is_inference', type=int, default=0, help='status')
 
@@ -39,6 +45,15 @@ if __name__ == '__main__':
     # parser.add_argument('--root_path', type=str, default='./data/GIST_dataset/', help='root path of the source domain data file')
     # parser.add_argument('--data_path', type=str, default='GIST_sisuldong.csv', help='source domain data file')
     parser.add_argument('--scaler', type=bool, default=True, help='StandardScaler')
+    parser.add_argument('--data_cache', type=int, default=1,
+                        help='cache parsed installation arrays under <root_path>/cache; True 1 False 0')
+    parser.add_argument('--data_store', type=str, default='memory',
+                        help='dataset array backend, options: [memory, mmap]. mmap shares one memory-mapped file across workers/ranks')
+    parser.add_argument('--resident_data', action='store_true', default=False,
+                        help='keep the whole dataset on the training device and build batches there without DataLoader workers')
+    parser.add_argument('--load_workers', type=int, default=0,
+                        help='number of parallel workers for loading installations when building a dataset; 0: sequential')
+    parser.add_argument('--load_executor', type=str, default='process', help='pool for --load_workers. options: [process, thread]')
     parser.add_argument('--freq', type=str, default='h',
                         help='freq for time 2 encoding, options:[s:secondly, t:minutely, h:hourly, d:daily, b:business days, w:weekly, m:monthly], you can also use more detailed freq like 15min or 3h')
     parser.add_argument('--output_dir', type=str, default='./checkpoints/', help='location of model checkpoints, recommend to use setting name')
@@ -65,6 +80,9 @@ if __name__ == '__main__':
     parser.add_argument('--decomposition', type=int, default=0, help='decomposition; True 1 False 0')
     parser.add_argument('--kernel_size', type=int, default=25, help='decomposition-kernel')
     parser.add_argument('--individual', type=int, default=1, help='individual head; True 1 False 0')
+    parser.add_argument('--target_only', action='store_true', default=False,
+                        help='PatchTST: run only the target (last) channel through the backbone; '
+                             'BatchNorm batch statistics then come from the target channel alone during training')
 
     # Formers 
     parser.add_argument('--embed_type', type=int, default=0, help='0: default 1: value embedding + temporal embedding + positional embedding 2: value embedding + temporal embedding 3: value embedding + positional embedding 4: value embedding')
@@ -106,6 +124,11 @@ if __name__ == '__main__':
     parser.add_argument('--lradj', type=str, default='type3', help='adjust learning rate')
     parser.add_argument('--pct_start', type=float, default=0.3, help='pct_start')
     parser.add_argument('--use_amp', action='store_true', help='use automatic mixed precision training', default=False)
+    parser.add_argument('--amp_dtype', type=str, default='auto',
+                        help='autocast dtype for --use_amp. auto: fp16 on CUDA, bf16 on CPU. options: [auto, fp16, bf16]')
+    parser.add_argument('--compile', action='store_true', default=False, help='compile the model with torch.compile')
+    parser.add_argument('--cpu_threads', type=int, default=0, help='intra-op threads (torch.set_num_threads); 0: torch default')
+    parser.add_argument('--interop_threads', type=int, default=0, help='inter-op threads (torch.set_num_interop_threads); 0: torch default')
 
     # GPU
     # parser.add_argument('--use_gpu', type=bool, default=True, help='use gpu')
@@ -114,25 +137,41 @@ if __name__ == '__main__':
     parser.add_argument('--devices', type=str, default='0', help='device ids of multile gpus')
     parser.add_argument('--test_flop', action='store_true', default=False, help='See utils/tools for usage')
 
-    parser.add_argument('--resume', action='store_true', default=False, help='resume')
+    parser.add_argument('--resume', action='store_true', default=False,
+                        help='resume from source_model_dir (full training state if training_state.pth exists, otherwise model_latest.pth weights)')
+    parser.add_argument('--profile', action='store_true', default=False,
+                        help='record per-step stage times (data/h2d/forward/backward/optimizer/checkpoint) to profile_*.json/csv')
+    parser.add_argument('--profile_trace', type=str, default=None,
+                        help='with --profile, capture a torch.profiler chrome trace for steps start:stop of the first epoch')
+    parser.add_argument('--sync_debug', action='store_true', default=False,
+                        help='on CUDA, warn on every device-host synchronization (torch.cuda.set_sync_debug_mode) to find hidden syncs')
+    parser.add_argument('--save_every_steps', type=int, default=0,
+                        help='also write training_state.pth every N optimizer steps; 0: only at epoch end')
 
     parser.add_argument('--world_size', default=1, type=int, help='number of distributed processes')
     parser.add_argument('--local_rank', default=-1, type=int, help='Local rank for distributed training')
     parser.add_argument('--dist_url', default='env://', help='url used to set up distributed training')
     parser.add_argument('--dist_on_itp', action='store_true', help='Use distributed training on internal cluster')
     parser.add_argument('--distributed', action='store_true', help='Use distributed training', default=False)
+    parser.add_argument('--dist_backend', type=str, default='auto', choices=['auto', 'nccl', 'gloo'],
+                        help='distributed backend; auto: nccl if CUDA is available, otherwise gloo (CPU)')
     parser.add_argument('--wandb', action='store_true', help='Use wandb')
     parser.add_argument('--wandb_id', type=str, default=None, help='wandb id that you want to resume')
     parser.add_argument('--wandb_resume', type=str, default=None, help='Resume a run that must use the same run ID. set "must" to resume')
-    
+    return parser
+
+
+if __name__ == '__main__':
+    parser = get_parser()
     args = parser.parse_args()
 
-    # Distributed Training Setup
-    if args.distributed:
-        args.local_rank = int(os.environ["LOCAL_RANK"])  # Read local rank from environment variable
-        dist.init_process_group(backend="nccl", init_method="env://")
-        args.rank = dist.get_rank()  # Get global rank
-        torch.cuda.set_device(args.local_rank)
+    # CPU thread 설정은 다른 torch 연산보다 먼저 해야 함
+    if args.cpu_threads > 0:
+        torch.set_num_threads(args.cpu_threads)
+    if args.interop_threads > 0:
+        torch.set_num_interop_threads(args.interop_threads)
+
+    # Distributed Training Setup은 Exp_Basic._init_distributed_mode에서 (torchrun 환경변수 기준으로) 처리
 
     # random seed
     fix_seed = args.random_seed
@@ -148,9 +187,6 @@ if __name__ == '__main__':
         print(args)
     
     Exp = Exp_Main
-
-    if args.distributed:
-        dist.destroy_process_group()
     
     if (args.is_pretraining) and (not args.is_inference):
         for ii in range(args.itr):
@@ -261,3 +297,6 @@ if __name__ == '__main__':
             print('***************** Test Done *****************')
      
             torch.cuda.empty_cache()
+
+    if dist.is_initialized():
+        dist.destroy_process_group()
@@ -0,0 +1,22 @@
+import argparse
+
+from utils.preprocessing import DATASET_RULES, VARIANT_RULES, run
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description='Drop anomalies from uniform_format_data for every PV dataset')
+    parser.add_argument('--datasets', type=str, default=','.join(DATASET_RULES),
+                        help=f"comma separated dataset names. options: [{', '.join(DATASET_RULES)}]")
+    parser.add_argument('--variant', type=str, default='day', help=f"options: [{', '.join(VARIANT_RULES)}]")
+    parser.add_argument('--workers', type=int, default=0, help='processes for per-file work; 0: cpu count, 1: run in this process')
+    parser.add_argument('--data_root', type=str, default=None, help='directory containing <dataset>/uniform_format_data; default: ./data')
+    parser.add_argument('--no_report', action='store_true', default=False,
+                        help='skip processed_info (check_data log and correlation plots)')
+    parser.add_argument('--full', action='store_true', default=False,
+                        help='ignore the manifest and reprocess every file; default: only new, changed or appended files')
+    return parser
+
+
+if __name__ == '__main__':
+    args = get_parser().parse_args()
+    run(args.datasets.split(','), args.variant, workers=args.workers, data_root=args.data_root, report=not args.no_report, full=args.full)
@@ -0,0 +1,133 @@
+"""
+2_drop_anomaly 규칙의 run-length 기반 이상치 검출.
+
+열마다 pandas rolling / groupby-cumsum을 돌리는 대신 (행, 열) 2-D 배열 전체를 한 번의 np.diff로 run-length encoding 한다.
+결과는 dense mask가 아니라 규칙이 적용되는 구간의 경계 (column, start, end)와 규칙별 개수 (Runs)로 돌려주며,
+필요할 때만 row_mask / mask로 펼친다.
+
+기존 함수와 결과가 같도록 구간을 정의한다.
+    detect_consecutive_nans(df, m)                   == nan_runs(df, m).row_mask(len(df))
+    detect_consecutive_identical_values(df, col, m)  == identical_runs(df[[col]], m).row_mask(len(df))
+"""
+import numpy as np
+import pandas as pd
+
+
+class Runs:
+    """
+    열별 구간 [start, end) 목록. column / start / end는 같은 길이의 int 배열이며 (column, start) 순으로 정렬되어 있다.
+    같은 열의 구간은 겹치지 않는다.
+    """
+    def __init__(self, column, start, end, num_columns):
+        self.column = column
+        self.start = start
+        self.end = end
+        self.num_columns = num_columns
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def lengths(self):
+        return self.end - self.start
+
+    def count(self):
+        """구간에 포함된 (행, 열) 수"""
+        return int(self.lengths.sum())
+
+    def counts_per_column(self):
+        return np.bincount(self.column, weights=self.lengths, minlength=self.num_columns).astype(np.int64)
+
+    def row_mask(self, num_rows):
+        """어느 열이든 구간에 포함된 행의 mask (열 간 OR)"""
+        depth = np.bincount(self.start, minlength=num_rows + 1) - np.bincount(self.end, minlength=num_rows + 1)
+        return np.cumsum(depth[:-1]) > 0
+
+    def mask(self, num_rows):
+        """(num_rows, num_columns) dense mask"""
+        size = (num_rows + 1) * self.num_columns
+        depth = (np.bincount(self.start * self.num_columns + self.column, minlength=size)
+                 - np.bincount(self.end * self.num_columns + self.column, minlength=size))
+        return np.cumsum(depth.reshape(num_rows + 1, self.num_columns)[:-1], axis=0) > 0
+
+    def __repr__(self):
+        return f'Runs({len(self)} runs, {self.count()} cells, {self.num_columns} columns)'
+
+
+def _as_2d(values):
+    values = values.to_numpy() if isinstance(values, (pd.DataFrame, pd.Series)) else np.asarray(values)
+    return values.reshape(len(values), -1)
+
+
+def find_runs(mask):
+    """2-D bool mask (행, 열)에서 열별로 연속된 True 구간"""
+    mask = _as_2d(mask).astype(bool, copy=False)
+    num_rows, num_columns = mask.shape
+    padded = np.zeros((num_columns, num_rows + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask.T
+    edges = np.diff(padded, axis=1)
+    # 전치한 배열에서 nonzero를 구하므로 (column, row) 순으로 정렬되고, 열마다 시작(+1) / 끝(-1)이 번갈아 나옴
+    column, row = np.nonzero(edges)
+    return Runs(column[0::2], row[0::2], row[1::2], num_columns)
+
+
+def min_length_runs(mask, min_length):
+    """
+    길이가 min_length 이상인 True 구간에서 min_length번째 행부터 구간 끝까지 [start + min_length - 1, end).
+    rolling(window=min_length).sum() == min_length 나 run 내 누적 개수 >= min_length 로 표시되는 행과 같다.
+    """
+    runs = find_runs(mask)
+    keep = runs.lengths >= min_length
+    return Runs(runs.column[keep], runs.start[keep] + min_length - 1, runs.end[keep], runs.num_columns)
+
+
+def nan_runs(values, min_length=2):
+    """열마다 min_length개 이상 연속된 결측이 끝나는 행들 (detect_consecutive_nans)"""
+    is_nan = values.isna().to_numpy() if isinstance(values, (pd.DataFrame, pd.Series)) else pd.isna(values)
+    return min_length_runs(is_nan, min_length)
+
+
+def identical_runs(values, min_length=10):
+    """
+    열마다 0이 아닌 같은 값이 바로 앞 행과 같은 경우 (결측끼리는 다른 값으로 봄)가 이어지는 구간에서,
+    min_length번째 반복부터의 행들 (detect_consecutive_identical_values)
+    """
+    values = _as_2d(values)
+    repeated = np.zeros(values.shape, dtype=bool)
+    repeated[1:] = (values[1:] != 0) & (values[1:] == values[:-1])
+    return min_length_runs(repeated, min_length)
+
+
+def out_of_range(values, low, high):
+    """
+    열마다 low 미만 / high 초과인 행들. low / high는 열별 경계 배열 (NaN이면 해당 방향 제한 없음).
+    결측 값은 범위 밖으로 보지 않는다.
+    """
+    values = _as_2d(values).astype(float, copy=False)
+    with np.errstate(invalid='ignore'):
+        mask = (values < np.asarray(low, dtype=float)) | (values > np.asarray(high, dtype=float))
+    return find_runs(mask)
+
+
+def range_bounds(columns, ranges):
+    """DATASET_RULES 형식의 {열: (min, max)}를 columns 순서의 (low, high) 배열로 (None -> NaN)"""
+    low = np.array([np.nan if ranges[c][0] is None else ranges[c][0] for c in columns], dtype=float)
+    high = np.array([np.nan if ranges[c][1] is None else ranges[c][1] for c in columns], dtype=float)
+    return low, high
+
+
+def detect_anomalies(df, ranges=None, nan_run=2, identical_run=10, identical_columns=('Active_Power',)):
+    """
+    DataFrame 하나에 대해 규칙별 Runs를 한 번에 계산.
+        'range'         : ranges의 열들 (df에 있는 열만, Runs.column은 그 순서의 index)
+        'identical_run' : identical_columns
+        'nan_run'       : df의 모든 열
+    """
+    result = {}
+    if ranges:
+        range_columns = [c for c in ranges if c in df.columns]
+        low, high = range_bounds(range_columns, ranges)
+        result['range'] = out_of_range(df[range_columns], low, high)
+    result['identical_run'] = identical_runs(df[list(identical_columns)], identical_run)
+    result['nan_run'] = nan_runs(df, nan_run)
+    return result
@@ -0,0 +1,81 @@
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+
+def to_cpu(obj):
+    """state_dict 등 중첩된 dict / list 안의 tensor를 CPU 복사본으로 바꿈 (학습이 이어져도 값이 바뀌지 않도록 clone)"""
+    if torch.is_tensor(obj):
+        return obj.detach().to('cpu', copy=True)
+    if isinstance(obj, dict):
+        return {k: to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(to_cpu(v) for v in obj)
+    return obj
+
+
+def get_rng_state():
+    state = {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+
+class CheckpointManager:
+    """
+    checkpoint 저장을 background thread에서 수행.
+
+    save()는 호출 시점의 값을 CPU로 복사만 하고 바로 돌아오며, 직렬화 / 디스크 쓰기는 별도 thread에서 한다.
+    파일은 임시 파일에 쓴 뒤 os.replace로 교체하므로 중간에 프로세스가 죽어도 이전 checkpoint가 깨지지 않는다.
+    대기 중인 쓰기는 max_pending개까지만 두어 CPU 복사본이 쌓이지 않게 한다 (넘으면 가장 오래된 쓰기를 기다림).
+    enabled=False 이면 (분산 학습의 rank 0 이외) 아무것도 쓰지 않는다.
+    """
+    def __init__(self, save_dir, enabled=True, max_pending=4):
+        self.save_dir = save_dir
+        self.enabled = enabled
+        self.max_pending = max_pending
+        # worker가 하나라 같은 파일에 대한 쓰기는 요청 순서대로 처리됨
+        self.executor = ThreadPoolExecutor(max_workers=1) if enabled else None
+        self.pending = []
+
+    def save(self, filename, state):
+        if not self.enabled:
+            return
+        self.pending = [f for f in self.pending if not f.done() or f.exception() is not None]
+        while len(self.pending) >= self.max_pending:
+            self.pending.pop(0).result()
+        self.pending.append(self.executor.submit(self._write, os.path.join(self.save_dir, filename), to_cpu(state)))
+
+    @staticmethod
+    def _write(path, state):
+        tmp_path = path + '.tmp'
+        torch.save(state, tmp_path)
+        os.replace(tmp_path, path)
+
+    def wait(self):
+        """진행 중인 쓰기가 끝날 때까지 대기 (쓰기 중 발생한 예외는 여기서 다시 발생)"""
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+
+    def close(self):
+        self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.enabled = False
@@ -0,0 +1,81 @@
+import os
+import shutil
+import numpy as np
+import torch
+
+
+class FeatureCache:
+    """
+    transfer learning 시 frozen prefix (RevIN + input encoding + 앞쪽 encoder layer)의 출력을 window 단위로 저장.
+    prefix는 학습되지 않으므로 한 번만 계산해두고 이후 epoch은 저장된 값으로 나머지 layer/head만 학습한다.
+
+    backend='memory' 이면 RAM에, backend='mmap' 이면 cache_dir 아래 npy memory-map 파일에 저장한다.
+    tensor가 아닌 값 (예: 입력 채널 수 n_in)은 모든 window에서 같다고 보고 한 번만 저장한다.
+    """
+    BACKENDS = ('memory', 'mmap')
+
+    def __init__(self, n_rows, backend='memory', cache_dir=None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown feature cache backend: {backend}. Choose from {self.BACKENDS}")
+        if backend == 'mmap' and cache_dir is None:
+            raise ValueError("cache_dir is required for the mmap backend")
+        self.n_rows = n_rows
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.arrays = {}
+        self.constants = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _allocate(self, name, shape, dtype):
+        shape = (self.n_rows,) + tuple(shape)
+        if self.backend == 'memory':
+            return np.empty(shape, dtype=dtype)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return np.lib.format.open_memmap(os.path.join(self.cache_dir, f'{name}.npy'), mode='w+', dtype=dtype, shape=shape)
+
+    def append(self, features, target):
+        """
+        features: forward_prefix 출력 dict (tensor 값은 [bs x ...]), target: [bs x pred_len x 1]
+        """
+        features = dict(features, target=target)
+        bs = target.shape[0]
+        if self.size + bs > self.n_rows:
+            raise ValueError(f"FeatureCache is full ({self.n_rows} rows)")
+        for name, value in features.items():
+            if not torch.is_tensor(value):
+                self.constants[name] = value
+                continue
+            value = value.detach().float().cpu().numpy()
+            if name not in self.arrays:
+                self.arrays[name] = self._allocate(name, value.shape[1:], np.float32)
+            self.arrays[name][self.size:self.size + bs] = value
+        self.size += bs
+
+    def batches(self, batch_size, device, shuffle=True, drop_last=True, generator=None):
+        """
+        저장된 window를 batch 단위로 돌려줌.
+
+        Yields:
+            (dict, torch.Tensor): forward_suffix에 넣을 features와 target
+        """
+        order = torch.randperm(self.size, generator=generator).numpy() if shuffle else np.arange(self.size)
+        for b in range(self.num_batches(batch_size, drop_last)):
+            # mmap은 정렬된 index로 읽어야 디스크 접근이 순차에 가까워짐
+            idx = np.sort(order[b * batch_size:(b + 1) * batch_size])
+            batch = {name: torch.from_numpy(np.ascontiguousarray(arr[idx])).to(device, non_blocking=True)
+                     for name, arr in self.arrays.items()}
+            target = batch.pop('target')
+            batch.update(self.constants)
+            yield batch, target
+
+    def num_batches(self, batch_size, drop_last=True):
+        return self.size // batch_size if drop_last else -(-self.size // batch_size)
+
+    def close(self):
+        """저장된 배열을 해제하고 mmap 파일을 지움"""
+        self.arrays = {}
+        if self.backend == 'mmap':
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
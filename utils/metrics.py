@@ -1,8 +1,11 @@
 import numpy as np
 import pandas as pd
 import json
-from sklearn.metrics import r2_score
-from collections import defaultdict
+
+# site별로 누적하는 충분 통계량. 이것만으로 MAE/RMSE/MBE/R2/MSE/MAPE/skill score를 정확히 계산할 수 있다.
+# n_rows: MAPE 분모 (window 수 x pred_len), n: 원소 수
+STAT_FIELDS = ('n_rows', 'n', 'sum_err', 'sum_abs_err', 'sum_sq_err', 'sum_target', 'sum_sq_target')
+
 
 class MetricEvaluator:
     def __init__(self, save_path, dataset_name='DKASC', data_type='all', ref_mse_path=None):
@@ -14,7 +17,8 @@ class MetricEvaluator:
             ref_mse_path: Reference MSE 파일 경로 (JSON 또는 CSV)
         """
         self.save_path = save_path
-        self.data = defaultdict(lambda: {"preds": [], "targets": []})
+        # 예측값/실제값을 쌓아두지 않고 site별 float64 누적합만 저장 (메모리 O(site 수))
+        self.stats = {}
         self.ref_mse_dict = self._load_reference_mse(ref_mse_path)
         
         # mapping 파일 로드
@@ -38,11 +42,46 @@ class MetricEvaluator:
             raise ValueError("Reference MSE file must be either JSON or CSV")
 
     def update(self, inst_id, preds, targets):
-        """매 배치마다 installation ID와 예측값, 실제값을 저장"""
-        for i, site_id in enumerate(inst_id):
-            site_id = site_id.item()  # tensor to scalar
-            self.data[site_id]["preds"].append(preds[i])
-            self.data[site_id]["targets"].append(targets[i])
+        """매 배치마다 installation ID별로 오차/실제값의 누적합을 갱신"""
+        inst_id = np.asarray(inst_id).reshape(-1)
+        preds = np.asarray(preds, dtype=np.float64)
+        targets = np.asarray(targets, dtype=np.float64)
+        err = (preds - targets).reshape(len(inst_id), -1)
+        targets = targets.reshape(len(inst_id), -1)
+
+        # window별 합을 구한 뒤 같은 site끼리 bincount로 모음
+        sites, inverse = np.unique(inst_id, return_inverse=True)
+        per_window = np.stack([
+            np.full(len(inst_id), preds.shape[1] if preds.ndim > 1 else 1, dtype=np.float64),
+            np.full(len(inst_id), err.shape[1], dtype=np.float64),
+            err.sum(axis=1),
+            np.abs(err).sum(axis=1),
+            (err ** 2).sum(axis=1),
+            targets.sum(axis=1),
+            (targets ** 2).sum(axis=1),
+        ], axis=1)
+        per_site = np.stack([np.bincount(inverse, weights=col, minlength=len(sites)) for col in per_window.T], axis=1)
+        for site_id, row in zip(sites.tolist(), per_site):
+            if site_id in self.stats:
+                self.stats[site_id] += row
+            else:
+                self.stats[site_id] = row.copy()
+
+    def state(self):
+        """누적 통계량 (site_ids [S], stats [S x len(STAT_FIELDS)]). 다른 worker/rank와 합칠 때 사용"""
+        site_ids = np.array(sorted(self.stats), dtype=np.int64)
+        stats = np.stack([self.stats[s] for s in site_ids]) if len(site_ids) else np.zeros((0, len(STAT_FIELDS)))
+        return site_ids, stats
+
+    def merge(self, other):
+        """다른 evaluator 또는 state() 결과를 합침"""
+        site_ids, stats = other.state() if isinstance(other, MetricEvaluator) else other
+        for site_id, row in zip(np.asarray(site_ids).tolist(), np.asarray(stats, dtype=np.float64)):
+            if site_id in self.stats:
+                self.stats[site_id] = self.stats[site_id] + row
+            else:
+                self.stats[site_id] = row.copy()
+        return self
 
     def _get_site_capacity(self, site_id):
         """mapping 파일에서 site의 용량 정보 가져오기"""
@@ -56,13 +95,20 @@ class MetricEvaluator:
         except (IndexError, ValueError):
             raise ValueError(f"Invalid capacity format in filename: {file_name}")
     
-    def _calculate_metrics(self, preds, targets, scale_name):
-        """주어진 그룹의 metric 계산"""
-        mae = np.mean(np.abs(preds - targets))
-        rmse = np.sqrt(np.mean((preds - targets) ** 2))
-        mbe = np.mean(preds - targets)
-        r2 = r2_score(targets.flatten(), preds.flatten())
-        mse = np.mean((preds - targets) ** 2)
+    def _calculate_metrics(self, stats, scale_name):
+        """주어진 그룹의 누적 통계량으로 metric 계산"""
+        st = dict(zip(STAT_FIELDS, stats))
+        n = st['n']
+        mae = st['sum_abs_err'] / n
+        mse = st['sum_sq_err'] / n
+        rmse = np.sqrt(mse)
+        mbe = st['sum_err'] / n
+        # sklearn r2_score와 같은 정의: 1 - SSE / SST (SST가 0이면 완전 일치일 때만 1)
+        sst = st['sum_sq_target'] - st['sum_target'] ** 2 / n
+        if sst > 0:
+            r2 = 1 - st['sum_sq_err'] / sst
+        else:
+            r2 = 1.0 if st['sum_sq_err'] == 0 else 0.0
         skill_score = self.calculate_skill_score(scale_name, mse)
         return mae, rmse, mbe, r2, mse, skill_score
 
@@ -71,16 +117,15 @@ class MetricEvaluator:
         total_error = 0
         total_samples = 0
         
-        for site_id, site_data in self.data.items():
-            site_preds = np.concatenate(site_data["preds"])
-            site_targets = np.concatenate(site_data["targets"])
+        for site_id, site_stats in self.stats.items():
+            st = dict(zip(STAT_FIELDS, site_stats))
             site_capacity = self._get_site_capacity(site_id)
             
             # 각 지점별 절대 오차의 합을 해당 지점의 설치 용량으로 나눔
             epsilon = 1e-10
-            site_error = np.sum(np.abs(site_preds - site_targets)) / max(site_capacity, epsilon)
+            site_error = st['sum_abs_err'] / max(site_capacity, epsilon)
             total_error += site_error
-            total_samples += len(site_targets)
+            total_samples += st['n_rows']
         
         mape = (total_error / total_samples) * 100
         return mape
@@ -109,7 +154,7 @@ class MetricEvaluator:
         
         # mapping 파일의 용량 정보를 기반으로 100kW 구간 확인
         large_capacities = []
-        for site_id in self.data.keys():
+        for site_id in self.stats.keys():
             capacity = self._get_site_capacity(site_id)
             if capacity >= 100:
                 group_start = int((capacity // 100) * 100)
@@ -131,25 +176,19 @@ class MetricEvaluator:
         
         # 각 용량 범위별로 metric 계산
         for group_name, min_cap, max_cap in capacity_ranges:
-            group_preds = []
-            group_targets = []
+            group_stats = np.zeros(len(STAT_FIELDS))
             group_sites = set()
             
-            # 해당 용량 범위에 속하는 site의 데이터 수집
-            for site_id, site_data in self.data.items():
+            # 해당 용량 범위에 속하는 site의 통계량 합산
+            for site_id, site_stats in self.stats.items():
                 site_capacity = self._get_site_capacity(site_id)
                 
                 if min_cap <= site_capacity < max_cap:
-                    site_preds = np.concatenate(site_data["preds"])
-                    site_targets = np.concatenate(site_data["targets"])
-                    group_preds.append(site_preds)
-                    group_targets.append(site_targets)
+                    group_stats += site_stats
                     group_sites.add(site_id)
             
-            if group_preds:  # 데이터가 있는 경우에만 계산
-                group_preds = np.concatenate(group_preds)
-                group_targets = np.concatenate(group_targets)
-                metrics = self._calculate_metrics(group_preds, group_targets, group_name)
+            if group_sites:  # 데이터가 있는 경우에만 계산
+                metrics = self._calculate_metrics(group_stats, group_name)
                 results.append((group_name, metrics, sorted(group_sites)))
         
         # 전체 MAPE 계산
@@ -0,0 +1,756 @@
+"""
+data_preprocessing_{all,day}/<dataset>/2_drop_anomaly.py 의 이상치 제거 과정을 하나로 모은 preprocessing engine.
+
+dataset별 차이는 코드 대신 DATASET_RULES의 선언적 규칙으로 표현하고 (열 선택, 물리 범위, normalized power 기준,
+site별 예외 처리, day / all variant), 파일 단위 작업은 process pool에서 병렬로 실행한다.
+출력 파일은 임시 파일에 쓴 뒤 os.replace로 교체하므로 중간에 중단되어도 깨진 CSV가 남지 않는다.
+
+    python run_preprocessing.py --variant day --workers 16
+    python run_preprocessing.py --datasets GIST,UK --variant all
+"""
+import io
+import os
+import json
+import math
+import time
+import shutil
+import hashlib
+import functools
+import collections
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils import anomaly
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# manifest 형식이나 처리 코드가 바뀌어 기존 출력을 다시 만들어야 할 때 올림
+MANIFEST_VERSION = 1
+
+# 물리적으로 가능한 범위 {열: (min, max)}. 범위 밖 (min 미만 / max 초과) 값은 결측 처리, None이면 해당 방향 제한 없음
+DEFAULT_RANGES = {
+    'Global_Horizontal_Radiation': (None, 2000),
+    'Weather_Temperature_Celsius': (-10, None),
+    'Wind_Speed': (0, None),
+    'Weather_Relative_Humidity': (0, 100),
+}
+
+DEFAULT_RULES = {
+    'data_dir': None,                   # data/ 아래 폴더 이름 (None이면 dataset 이름)
+    'columns': None,                    # 사용할 열 (None이면 전체)
+    'trim_leading_zero_days': False,    # Active_Power가 처음으로 0이 아닌 날 이전 데이터 제거
+    'full_day': 'day',                  # 'day': 날짜별 00~23시 채움, 'range': 첫~마지막 시각 (중복 시각은 마지막 값), None: 채우지 않음
+    'abs_sites': (),                    # Active_Power 부호가 뒤집힌 site (절댓값 사용)
+    'cap_sites': {},                    # {file: (threshold, value)} Active_Power >= threshold 이면 value로 대체
+    'outlier_sites': {},                # {file: threshold} normalized power > threshold 이면 결측
+    'night_zero': None,                 # normalized power < 값 이면 Active_Power = 0 (day variant)
+    'renormalize': True,                # 음수 처리 후 max로 normalized power 다시 계산
+    'ranges': DEFAULT_RANGES,
+    'low_power_max': 0.05,              # normalized power <= 값 & GHI > 200 이면 Active_Power 결측
+    'high_power_min': 0.1,              # normalized power > 값 & GHI < 10 이면 Active_Power 결측 (None이면 적용 안 함)
+    'identical_run': 10,                # 0이 아닌 같은 값이 이만큼 이어지면 Active_Power 결측
+    'nan_run': 2,                       # 어느 열이든 결측이 이만큼 이어진 날은 통째로 제거
+    'drop_normalized': False,           # 결측 구간 검사 전에 Normalized_Active_Power 열 제거
+    'daily_margin': None,               # 발전 시작 1시간 전 ~ 종료 1시간 후만 남김: 'before_nan' / 'after_interpolate' / None
+    'fill_after_interpolate': False,    # 보간 후 남은 결측: Active_Power는 0, 나머지 열은 bfill -> ffill
+    'zero_day_threshold': None,         # Active_Power가 0인 시간이 이만큼 이상인 날 제거
+    'invalid_value': np.nan,            # 이상치를 대체할 값
+    'aggregate': False,                 # site 파일들을 시각별로 합친 dataset 하나를 추가로 생성 (OEDI)
+}
+
+VARIANT_RULES = {
+    'all': {},
+    'day': {
+        'night_zero': 0.05,
+        'daily_margin': 'before_nan',
+        'fill_after_interpolate': True,
+    },
+}
+
+OEDI_COLUMNS = ['timestamp', 'Active_Power', 'Global_Horizontal_Radiation', 'Weather_Temperature_Celsius', 'Wind_Speed']
+
+# dataset별 규칙. 'all' / 'day' key는 해당 variant에서만 덮어쓰는 값
+DATASET_RULES = {
+    'DKASC_AliceSprings': {
+        'full_day': None,
+        'abs_sites': ('67-Site_DKA-M8_A-Phase.csv',),
+        'outlier_sites': {'90-Site_DKA-M3_A-Phase.csv': 0.5},
+    },
+    'DKASC_Yulara': {},
+    'GIST': {
+        'data_dir': 'GIST_dataset',
+        'abs_sites': ('C10_Renewable-E-Bldg.csv', 'C11_GAIA.csv', 'E03_GTI.csv', 'E12_DormB.csv', 'N01_Central-Library.csv',
+                      'N02_LG-Library.csv', 'W11_Facility-Maintenance-Bldg.csv', 'W13_Centeral-Storage.csv'),
+        'cap_sites': {'N01_Central-Library.csv': (30, 29.9)},
+        'day': {'invalid_value': -9999},
+    },
+    'Germany': {
+        'trim_leading_zero_days': True,
+        'outlier_sites': {'DE_KN_industrial2_pv.csv': 0.2, 'DE_KN_residential3_pv.csv': 0.2},
+    },
+    'Miryang': {
+        'outlier_sites': {'C_99kW.csv': 0.5, 'G_50kW.csv': 0.2},
+        'zero_day_threshold': 20,
+        'day': {'night_zero': None, 'daily_margin': 'after_interpolate', 'fill_after_interpolate': False},
+    },
+    'OEDI_California': {
+        'columns': OEDI_COLUMNS,
+        'full_day': 'range',
+        'renormalize': False,
+        'ranges': {
+            'Global_Horizontal_Radiation': (0, 2000),
+            'Weather_Temperature_Celsius': (-10, None),
+            'Wind_Speed': (0, None),
+        },
+        'low_power_max': 0.1,
+        'drop_normalized': True,
+        'aggregate': True,
+    },
+    'OEDI_Georgia': {
+        'columns': OEDI_COLUMNS,
+        'full_day': 'range',
+        'ranges': {
+            'Global_Horizontal_Radiation': (None, 2000),
+            'Weather_Temperature_Celsius': (-10, None),
+            'Wind_Speed': (0, 20),
+        },
+        'aggregate': True,
+    },
+    'UK': {
+        'high_power_min': None,
+    },
+}
+
+
+def get_rules(dataset_name, variant):
+    """DEFAULT_RULES <- VARIANT_RULES[variant] <- DATASET_RULES[dataset] <- DATASET_RULES[dataset][variant] 순으로 합친 규칙"""
+    if dataset_name not in DATASET_RULES:
+        raise ValueError(f"Unknown dataset: {dataset_name} (available: {', '.join(DATASET_RULES)})")
+    if variant not in VARIANT_RULES:
+        raise ValueError(f"Unknown variant: {variant} (available: {', '.join(VARIANT_RULES)})")
+    dataset_rules = DATASET_RULES[dataset_name]
+    rules = {**DEFAULT_RULES, **VARIANT_RULES[variant]}
+    rules.update({k: v for k, v in dataset_rules.items() if k not in VARIANT_RULES})
+    rules.update(dataset_rules.get(variant, {}))
+    rules['data_dir'] = rules['data_dir'] or dataset_name
+    return rules
+
+
+def dataset_paths(dataset_name, variant, data_root=None):
+    """(입력 폴더, 출력 폴더, site별 출력 폴더 (aggregate 일 때만, 아니면 None), 로그 폴더)"""
+    rules = get_rules(dataset_name, variant)
+    data_root = data_root or os.path.join(project_root, 'data')
+    base = os.path.join(data_root, rules['data_dir'])
+    save_dir = os.path.join(base, f'processed_data_{variant}')
+    each_dir = os.path.join(base, f'processed_data_{variant}_each') if rules['aggregate'] else None
+    log_dir = os.path.join(project_root, f'data_preprocessing_{variant}', dataset_name, 'processed_info')
+    return os.path.join(base, 'uniform_format_data'), save_dir, each_dir, log_dir
+
+
+def ensure_full_day_timestamps(df, mode, timestamp_col='timestamp'):
+    """빠진 시각을 결측 행으로 채움 (mode: 'day' 날짜별 00~23시, 'range' 첫~마지막 시각)"""
+    if mode == 'range':
+        df = df.drop_duplicates(subset=timestamp_col, keep='last')
+        start, end = df[timestamp_col].min(), df[timestamp_col].max()
+    else:
+        start = df[timestamp_col].min().floor('D')
+        end = df[timestamp_col].max().ceil('D') - pd.Timedelta(hours=1)
+    full_timestamps = pd.date_range(start=start, end=end, freq='h')
+    df = df.set_index(timestamp_col).reindex(full_timestamps).rename_axis(timestamp_col).reset_index()
+    return df
+
+
+def adjust_daily_margin(df, timestamp_col='timestamp', power_col='Active_Power'):
+    """날짜별로 발전 시작 1시간 전 ~ 발전 종료 1시간 후만 남김 (발전이 없는 날은 그대로)"""
+    timestamps = df[timestamp_col]
+    day = timestamps.dt.date
+    generating = timestamps.where(df[power_col] > 0)
+    first = generating.groupby(day).transform('min')
+    last = generating.groupby(day).transform('max')
+    keep = first.isna() | ((timestamps >= first - pd.Timedelta(hours=1)) & (timestamps <= last + pd.Timedelta(hours=1)))
+    return df[keep & timestamps.notna()]
+
+
+def drop_days_with_excessive_zeros(df, zero_count_threshold, timestamp_col='timestamp', power_col='Active_Power'):
+    day = df[timestamp_col].dt.date
+    zero_count = (df[power_col] == 0).groupby(day).transform('sum')
+    return df[zero_count < zero_count_threshold]
+
+
+def mark_invalid(df, rules, context_end=None):
+    """
+    물리 범위 / 발전량-일사량 / 같은 값 반복 규칙으로 이상치를 invalid_value로 바꿈. 규칙별 개수를 반환.
+    context_end가 주어지면 그 이전 구간 (context) 안에 같은 값 반복이 끊긴 행이 있는지 'context_break'로 함께 반환
+    """
+    invalid = rules['invalid_value']
+    counts = {}
+    range_columns = [c for c in rules['ranges'] if c in df.columns]
+    low, high = anomaly.range_bounds(range_columns, rules['ranges'])
+    runs = anomaly.out_of_range(df[range_columns], low, high)
+    if len(runs):
+        df[range_columns] = df[range_columns].mask(runs.mask(len(df)), invalid)
+    counts.update({f'range_{c}': int(n) for c, n in zip(range_columns, runs.counts_per_column())})
+
+    normalized = df['Normalized_Active_Power']
+    ghi = df['Global_Horizontal_Radiation']
+    mask = (normalized <= rules['low_power_max']) & (ghi > 200)
+    if rules['high_power_min'] is not None:
+        mask |= (normalized > rules['high_power_min']) & (ghi < 10)
+    df.loc[mask, 'Active_Power'] = invalid
+    counts['power_vs_ghi'] = int(mask.sum())
+
+    if context_end is not None:
+        power = df['Active_Power']
+        repeated = ((power != 0) & (power == power.shift(1))).values
+        in_context = (df['timestamp'] < context_end).values
+        counts['context_break'] = bool((~repeated[1:] & in_context[1:]).any())
+    runs = anomaly.identical_runs(df['Active_Power'], rules['identical_run'])
+    df.loc[runs.row_mask(len(df)), 'Active_Power'] = invalid
+    counts['identical_run'] = runs.count()
+    return counts
+
+
+def preprocess_frame(df, rules, file_name, scales=None, context_end=None):
+    """
+    uniform_format_data의 DataFrame 하나를 처리해 (결과 DataFrame, 통계) 반환.
+
+    normalized power에 쓰는 최대값들은 stats['scales']에 기록된다. scales를 넘기면 (이어 붙은 구간만 처리할 때)
+    직접 계산하는 대신 그 값을 쓰고, 이 구간에서 관측한 최대값은 stats['observed']로 돌려준다.
+    """
+    stats = {'rows_in': len(df)}
+    observed = {}
+    if rules['columns'] is not None:
+        df = df[rules['columns']].copy()
+
+    def normalize(key):
+        observed[key] = df['Active_Power'].max().item()
+        scale = observed[key] if scales is None else scales[key]
+        df['Normalized_Active_Power'] = df['Active_Power'] / scale
+
+    # 이어 붙은 구간에서는 이미 처리한 앞부분에 첫 발전일이 있으므로 건너뜀
+    if rules['trim_leading_zero_days'] and scales is None:
+        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+        first_non_zero_date = df.loc[df['Active_Power'] != 0, 'timestamp'].min().floor('D')
+        df = df[df['timestamp'] >= first_non_zero_date]
+        df = ensure_full_day_timestamps(df, rules['full_day'])
+
+    normalize('raw')
+
+    # site별 예외 처리
+    if file_name in rules['abs_sites']:
+        df['Active_Power'] = df['Active_Power'].abs()
+        normalize('abs')
+    if file_name in rules['cap_sites']:
+        threshold, value = rules['cap_sites'][file_name]
+        df.loc[df['Active_Power'] >= threshold, 'Active_Power'] = value
+        normalize('cap')
+    if file_name in rules['outlier_sites']:
+        df.loc[df['Normalized_Active_Power'] > rules['outlier_sites'][file_name], 'Active_Power'] = np.nan
+        normalize('outlier')
+
+    if rules['night_zero'] is not None:
+        df.loc[df['Normalized_Active_Power'] < rules['night_zero'], 'Active_Power'] = 0
+
+    # 작은 음수는 0, 큰 음수는 결측
+    df.loc[(df['Normalized_Active_Power'] >= -0.05) & (df['Normalized_Active_Power'] < 0), 'Active_Power'] = 0
+    df.loc[df['Normalized_Active_Power'] < -0.05, 'Active_Power'] = np.nan
+    if rules['renormalize']:
+        normalize('renormalize')
+
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    if rules['full_day'] is not None:
+        num_rows = len(df)
+        df = ensure_full_day_timestamps(df, rules['full_day'])
+        stats['filled_timestamps'] = len(df) - num_rows
+
+    stats.update(mark_invalid(df, rules, context_end))
+
+    if rules['drop_normalized']:
+        df = df.drop(columns=['Normalized_Active_Power'])
+    if rules['daily_margin'] == 'before_nan':
+        df = adjust_daily_margin(df)
+
+    # 연속 결측이 있는 날은 통째로 제거
+    consecutive_nan_mask = anomaly.nan_runs(df, rules['nan_run']).row_mask(len(df))
+    days_with_nan_run = df.loc[consecutive_nan_mask, 'timestamp'].dt.date.unique()
+    df = df[~df['timestamp'].dt.date.isin(days_with_nan_run)].copy()
+    stats['dropped_days'] = len(days_with_nan_run)
+
+    # 1개 이하 결측은 선형 보간
+    numeric_columns = df.select_dtypes('number').columns
+    # 마지막 행이 결측 없이 끝나는 날의 다음 날 0시: 그 이전 행들의 보간 / bfill 값은 이후 데이터와 무관 (이어 붙이기 기준점)
+    day = df['timestamp'].dt.normalize()
+    complete_day_end = day.ne(day.shift(-1)) & df[numeric_columns].notna().all(axis=1)
+    stats['safe_days'] = day[complete_day_end] + pd.Timedelta(days=1)
+    df[numeric_columns] = df[numeric_columns].interpolate(method='linear', limit=1)
+
+    if rules['daily_margin'] == 'after_interpolate':
+        df = adjust_daily_margin(df)
+    if rules['fill_after_interpolate']:
+        df['Active_Power'] = df['Active_Power'].fillna(0)
+        other_columns = df.columns.drop('Active_Power')
+        df[other_columns] = df[other_columns].bfill().ffill()
+    if rules['zero_day_threshold'] is not None:
+        df = drop_days_with_excessive_zeros(df, rules['zero_day_threshold'])
+
+    stats['rows_out'] = len(df)
+    stats['scales'] = observed if scales is None else scales
+    stats['observed'] = observed
+    return df, stats
+
+
+def write_csv_atomic(df, path):
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def rules_version(rules):
+    """규칙이 바뀌면 달라지는 짧은 hash (manifest에 기록해 규칙 변경 시 전체 재처리)"""
+    return hashlib.sha256(f'{MANIFEST_VERSION}:{sorted(rules.items())!r}'.encode()).hexdigest()[:16]
+
+
+def row_offsets(body, base):
+    """body (행 경계에서 시작하는 CSV bytes) 안 각 data 행의 시작 byte offset"""
+    line_starts = np.flatnonzero(np.frombuffer(body, dtype=np.uint8) == ord('\n')) + 1
+    line_starts = line_starts[line_starts < len(body)]
+    return base + np.concatenate([[0], line_starts]) if len(body) else np.zeros(0, dtype=np.int64)
+
+
+def _max(values):
+    """skipna 최대값을 JSON에 쓸 수 있는 python 값으로 (정수 열이면 int 유지해 출력 파일 이름이 기존과 같도록)"""
+    value = pd.Series(values).max(skipna=True)
+    return value.item() if hasattr(value, 'item') else value
+
+
+def write_output(path, df, split_day, prefix=None):
+    """
+    prefix (이전 출력의 앞부분 bytes, None이면 header부터) 뒤에 df를 이어 써서 원자적으로 교체하고,
+    split_day 이후 행이 시작하는 byte offset을 반환 (다음 실행에서 이 지점부터 다시 씀)
+    """
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    before_split = (df['timestamp'] < split_day).values
+    with open(tmp_path, 'wb') as f:
+        if prefix is not None:
+            f.write(prefix)
+        df[before_split].to_csv(f, index=False, header=prefix is None)
+        offset = f.tell()
+        df[~before_split].to_csv(f, index=False, header=False)
+    os.replace(tmp_path, path)
+    return offset
+
+
+def split_day(safe_days, lower, upper):
+    """lower <= 기준점 <= upper 인 가장 늦은 이어 붙이기 기준점 (없으면 lower)"""
+    candidates = safe_days[(safe_days >= lower) & (safe_days <= upper)]
+    return candidates.max() if len(candidates) else lower
+
+
+def _process_full(data, rules, file_name, save_dir, entry):
+    """파일 전체를 처리. 다음 실행에서 이어 붙은 구간만 처리할 수 있도록 offset / 최대값 등을 entry에 기록"""
+    header_end = data.index(b'\n') + 1
+    raw = pd.read_csv(io.BytesIO(data))
+    df, stats = preprocess_frame(raw.copy(), rules, file_name)
+    safe_days = stats.pop('safe_days')
+
+    timestamps = pd.to_datetime(raw['timestamp'], errors='coerce')
+    offsets = row_offsets(data[header_end:], header_end)
+    appendable = len(raw) > 0 and len(offsets) == len(raw) and timestamps.notna().all() and timestamps.is_monotonic_increasing
+    # 마지막 이틀은 다음 실행에서 다시 계산
+    resume_day = split_day(safe_days, timestamps.iloc[0].normalize(), timestamps.iloc[-1].normalize() - pd.Timedelta(days=1)) \
+        if appendable else df['timestamp'].max() + pd.Timedelta(hours=1)
+    output_name = file_name if rules['aggregate'] else f"{_max(df['Active_Power'])}_{file_name}"
+    output_offset = write_output(os.path.join(save_dir, output_name), df, resume_day)
+    head = df[df['timestamp'] < resume_day]
+
+    entry.update(output=output_name, output_offset=output_offset, head_max=_max(head['Active_Power']),
+                 scales=stats['scales'], rows=len(raw), dtypes=df.dtypes.astype(str).to_dict(),
+                 last_timestamp=None, resume_day=None, context_offset=None, context_row=None)
+    if appendable:
+        context_row = int(np.argmax((timestamps >= resume_day - pd.Timedelta(days=context_days(rules))).values))
+        entry.update(last_timestamp=str(timestamps.iloc[-1]), resume_day=str(resume_day),
+                     context_offset=int(offsets[context_row]), context_row=context_row)
+    return stats
+
+
+def _process_tail(data, rules, file_name, save_dir, entry):
+    """
+    이전 실행 이후 이어 붙은 행만 처리. 이전 실행의 기준점 (resume_day) 이후를 다시 계산하고 그 앞 context_days 일을
+    문맥으로 함께 읽는다. 출력은 기준점 이전 부분을 bytes 그대로 두고 뒤만 다시 쓴다.
+    정규화 최대값이 커지거나 문맥이 부족해 결과가 전체 재처리와 달라질 수 있으면 None을 반환 (전체 재처리)
+    """
+    header = data[:data.index(b'\n') + 1]
+    body = data[entry['context_offset']:]
+    raw = pd.read_csv(io.BytesIO(header + body))
+    timestamps = pd.to_datetime(raw['timestamp'], errors='coerce')
+    new_rows = timestamps.iloc[entry['rows'] - entry['context_row']:]
+    if timestamps.isna().any() or not timestamps.is_monotonic_increasing or new_rows.min() <= pd.Timestamp(entry['last_timestamp']):
+        return None
+
+    old_resume_day = pd.Timestamp(entry['resume_day'])
+    df, stats = preprocess_frame(raw.copy(), rules, file_name, scales=entry['scales'], context_end=old_resume_day)
+    safe_days = stats.pop('safe_days')
+    if not stats.get('context_break', True):
+        return None
+    for key, value in stats['observed'].items():
+        if not pd.isna(value) and (pd.isna(entry['scales'][key]) or value > entry['scales'][key]):
+            return None
+    df = df[df['timestamp'] >= old_resume_day]
+    if list(df.columns) != list(entry['dtypes']):
+        return None
+    try:
+        df = df.astype(entry['dtypes'])
+    except (TypeError, ValueError):
+        return None
+
+    old_path = os.path.join(save_dir, entry['output'])
+    with open(old_path, 'rb') as f:
+        prefix = f.read(entry['output_offset'])
+    resume_day = split_day(safe_days, old_resume_day, timestamps.iloc[-1].normalize() - pd.Timedelta(days=1))
+    head_max = _max([entry['head_max'], _max(df.loc[df['timestamp'] < resume_day, 'Active_Power'])])
+    max_active_power = _max([entry['head_max'], _max(df['Active_Power'])])
+    output_name = file_name if rules['aggregate'] else f'{max_active_power}_{file_name}'
+    output_offset = write_output(os.path.join(save_dir, output_name), df, resume_day, prefix=prefix)
+    if output_name != entry['output']:
+        os.remove(old_path)
+
+    offsets = row_offsets(body, entry['context_offset'])
+    context_row = int(np.argmax((timestamps >= resume_day - pd.Timedelta(days=context_days(rules))).values))
+    entry.update(output=output_name, output_offset=output_offset, head_max=head_max,
+                 rows=entry['context_row'] + len(raw), last_timestamp=str(timestamps.iloc[-1]), resume_day=str(resume_day),
+                 context_offset=int(offsets[context_row]), context_row=entry['context_row'] + context_row)
+    stats['rows_in'] = len(new_rows)
+    return stats
+
+
+def context_days(rules):
+    """이어 붙은 구간 처리 시 기준점 앞에 함께 읽는 날 수 (같은 값 반복 / 연속 결측 검사에 필요한 길이)"""
+    return 1 + math.ceil(max(rules['identical_run'], rules['nan_run']) / 24)
+
+
+def process_file(dataset_name, variant, file_path, save_dir, entry=None):
+    """
+    파일 하나를 처리해 save_dir에 저장 (process pool worker에서 실행). (통계, 새 manifest entry) 반환.
+
+    entry (이전 실행의 manifest 기록)와 비교해
+        unchanged : 크기 / 수정 시각 또는 내용 hash가 같으면 건너뜀
+        append    : 이전 내용이 그대로 앞에 있고 뒤에 행만 붙었으면 마지막 부분만 처리해 출력 뒤쪽만 다시 씀
+        full      : 그 외 (새 파일, 내용 / 규칙 변경) 전체 처리
+    """
+    start = time.perf_counter()
+    rules = get_rules(dataset_name, variant)
+    version = rules_version(rules)
+    file_name = os.path.basename(file_path)
+    stat = os.stat(file_path)
+    output_exists = entry is not None and os.path.exists(os.path.join(save_dir, entry['output']))
+    reusable = output_exists and entry['rules'] == version
+
+    mode, stats = 'unchanged', None
+    if not (reusable and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns)):
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        hasher = hashlib.sha256(data[:entry['size']] if reusable else b'')
+        prefix_unchanged = reusable and len(data) >= entry['size'] and hasher.hexdigest() == entry['sha256']
+        hasher.update(data[entry['size']:] if reusable else data)
+        if not (prefix_unchanged and len(data) == entry['size']):
+            new_entry = dict(entry) if prefix_unchanged else {}
+            if prefix_unchanged and entry['context_offset'] is not None:
+                mode = 'append'
+                stats = _process_tail(data, rules, file_name, save_dir, new_entry)
+            if stats is None:
+                mode = 'full'
+                new_entry = {}
+                stats = _process_full(data, rules, file_name, save_dir, new_entry)
+                if output_exists and entry['output'] != new_entry['output']:
+                    os.remove(os.path.join(save_dir, entry['output']))
+            new_entry.update(rules=version, sha256=hasher.hexdigest())
+            entry = new_entry
+        entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    stats = stats or {}
+    stats.update(dataset=dataset_name, file=file_name, mode=mode, output=os.path.join(save_dir, entry['output']),
+                 sec=time.perf_counter() - start)
+    return stats, entry
+
+
+def manifest_path(dataset_name, variant, data_root=None):
+    _, save_dir, _, _ = dataset_paths(dataset_name, variant, data_root)
+    return os.path.join(os.path.dirname(save_dir), f'preprocess_manifest_{variant}.json')
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class _OffGridError(ValueError):
+    """시각이 하나의 freq 격자 위에 있지 않음 (site마다 정시 기준이 다른 경우 등)"""
+
+
+class _TimeGridSums:
+    """
+    step (ns) 간격의 dense 시각 격자 위에서 열별 합 / Kahan 보정항 / 개수를 누적.
+    groupby().sum() / mean()과 같은 보정 합을 같은 행 순서로 하므로 파일 순서대로 넣으면 결과가 bit 단위로 같다.
+    메모리는 파일 수와 무관하게 (시간 범위 / step) x 열 수.
+    """
+    def __init__(self, step, sum_col):
+        self.step = step
+        self.phase = None                   # 격자 기준 시각 (첫 시각 % step)
+        self.dtype = None                   # pd.to_datetime이 만든 시각 dtype (pandas 버전에 따라 ns / us)
+        self.first = 0                      # 배열 0번 행의 격자 번호
+        self.columns = {sum_col: 0}         # 열 이름 -> 배열 열 index
+        self.numeric = {sum_col: True}      # 모든 chunk에서 숫자형이었는지 (아니면 mean에서 빠짐)
+        self.integer = True                 # sum_col이 계속 정수형이었는지
+        self.sum = np.zeros((0, 1))
+        self.comp = np.zeros((0, 1))
+        self.count = np.zeros((0, 1), dtype=np.int64)
+
+    def _register(self, columns, numeric):
+        for column, is_numeric in zip(columns, numeric):
+            if column not in self.columns:
+                self.columns[column] = len(self.columns)
+                self.numeric[column] = True
+            self.numeric[column] &= is_numeric
+
+    def _reserve(self, lo, hi):
+        """격자 번호 [lo, hi]와 등록된 열이 모두 들어가도록 배열을 늘림"""
+        rows, cols = self.sum.shape
+        last = self.first + rows - 1
+        if rows and self.first <= lo and hi <= last and len(self.columns) <= cols:
+            return
+        if rows:
+            # 늘어나는 쪽으로 현재 크기만큼 여유를 둬서 재할당 횟수를 log로 제한
+            lo = min(lo, self.first - rows) if lo < self.first else self.first
+            hi = max(hi, last + rows) if hi > last else last
+        offset = self.first - lo if rows else 0
+        for name in ('sum', 'comp', 'count'):
+            old = getattr(self, name)
+            new = np.zeros((hi - lo + 1, len(self.columns)), dtype=old.dtype)
+            new[offset:offset + rows, :cols] = old
+            setattr(self, name, new)
+        self.first = lo
+
+    def _accumulate(self, rows, columns, values, comp, count):
+        """rows (중복 없음) x columns 위치에 합을 더함. values / comp / count는 더할 쪽의 합 / 보정항 / 개수"""
+        valid = count > 0
+        sumx, old_comp = self.sum[rows][:, columns], self.comp[rows][:, columns]
+        with np.errstate(invalid='ignore'):
+            y = values - (old_comp + comp)
+            t = sumx + y
+            new_comp = (t - sumx) - y
+        new_comp[new_comp != new_comp] = 0
+        self.sum[np.ix_(rows, columns)] = np.where(valid, t, sumx)
+        self.comp[np.ix_(rows, columns)] = np.where(valid, new_comp, old_comp)
+        self.count[np.ix_(rows, columns)] += count
+
+    def add(self, chunk, timestamp_col, sum_col):
+        columns = [c for c in chunk.columns if c != timestamp_col]
+        self._register(columns, [pd.api.types.is_numeric_dtype(chunk[c]) for c in columns])
+        self.integer &= pd.api.types.is_integer_dtype(chunk[sum_col])
+
+        timestamps = pd.to_datetime(chunk[timestamp_col], errors='coerce')
+        valid = timestamps.notna().to_numpy()
+        self.dtype = timestamps.dtype if self.dtype is None else np.promote_types(self.dtype, timestamps.dtype)
+        ns = timestamps.to_numpy(dtype='datetime64[ns]').view(np.int64)[valid]
+        if not len(ns):
+            return
+        if self.phase is None:
+            self.phase = int(ns[0] % self.step)
+        slots, remainder = np.divmod(ns - self.phase, self.step)
+        if remainder.any():
+            raise _OffGridError(f"{timestamp_col} values are not on a regular {self.step} ns grid.")
+
+        index = [self.columns[c] for c in columns if self.numeric[c]]
+        values = np.column_stack([chunk[sum_col].fillna(0).to_numpy(dtype=float) if c == sum_col
+                                  else chunk[c].to_numpy(dtype=float, na_value=np.nan)
+                                  for c in columns if self.numeric[c]])[valid]
+        self._reserve(int(slots.min()), int(slots.max()))
+        rows = slots - self.first
+        # 같은 시각이 chunk 안에 여러 번 나오면 등장 순서대로 나눠 더함 (groupby와 같은 합 순서)
+        rank = pd.Series(rows).groupby(rows).cumcount().to_numpy()
+        for r in range(rank.max() + 1):
+            selected = rank == r
+            part = values[selected]
+            self._accumulate(rows[selected], index, part, 0.0, (~np.isnan(part)).astype(np.int64))
+
+    def merge(self, other):
+        """다른 파일 묶음의 누적 결과를 더함 (병렬 실행의 마지막 단계)"""
+        self._register(list(other.columns), list(other.numeric.values()))
+        self.integer &= other.integer
+        if other.dtype is not None:
+            self.dtype = other.dtype if self.dtype is None else np.promote_types(self.dtype, other.dtype)
+        if other.phase is None:
+            return
+        if self.phase is None:
+            self.phase = other.phase
+        elif other.phase != self.phase:
+            raise _OffGridError("Partial aggregates are on different time grids.")
+        num_rows = len(other.sum)
+        self._reserve(other.first, other.first + num_rows - 1)
+        rows = np.arange(num_rows) + other.first - self.first
+        self._accumulate(rows, [self.columns[c] for c in other.columns], other.sum, other.comp, other.count)
+
+    def result(self, timestamp_col, sum_col):
+        present = self.count[:, 0] > 0
+        slots = np.flatnonzero(present) + self.first
+        timestamps = (slots * self.step + (self.phase or 0)).astype('datetime64[ns]')
+        aggregated = {timestamp_col: timestamps.astype(self.dtype) if self.dtype is not None else timestamps}
+        sums = self.sum[present, 0]
+        aggregated[sum_col] = sums.astype(np.int64) if self.integer else sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for column in sorted(c for c in self.columns if c != sum_col and self.numeric[c]):
+                index = self.columns[column]
+                aggregated[column] = self.sum[present, index] / self.count[present, index]
+        return pd.DataFrame(aggregated)
+
+
+def _aggregate_files(file_paths, timestamp_col, sum_col, chunksize, step):
+    sums = _TimeGridSums(step, sum_col)
+    for file_path in file_paths:
+        for chunk in pd.read_csv(file_path, chunksize=chunksize):
+            sums.add(chunk, timestamp_col, sum_col)
+    return sums
+
+
+def _aggregate_streaming(file_paths, timestamp_col, sum_col, chunksize, step, workers):
+    if workers <= 1 or len(file_paths) <= 1:
+        return _aggregate_files(file_paths, timestamp_col, sum_col, chunksize, step).result(timestamp_col, sum_col)
+
+    groups = [list(group) for group in np.array_split(file_paths, min(workers, len(file_paths)))]
+    with ProcessPoolExecutor(max_workers=len(groups)) as executor:
+        partials = list(executor.map(functools.partial(_aggregate_files, timestamp_col=timestamp_col, sum_col=sum_col,
+                                                       chunksize=chunksize, step=step), groups))
+    sums = partials[0]
+    for partial in partials[1:]:
+        sums.merge(partial)
+    return sums.result(timestamp_col, sum_col)
+
+
+def create_aggregated_df_in_memory(file_paths, timestamp_col='timestamp', sum_col='Active_Power'):
+    """기존 방식: 모든 파일을 읽어 concat 후 groupby (시각이 격자 위에 없을 때 사용)"""
+    df_list = []
+    for file_path in file_paths:
+        df = pd.read_csv(file_path)
+        df[timestamp_col] = pd.to_datetime(df[timestamp_col], errors='coerce')
+        df[sum_col] = df[sum_col].fillna(0)
+        df_list.append(df)
+    combined_df = pd.concat(df_list)
+    aggregated_sum = combined_df.groupby(timestamp_col)[sum_col].sum()
+    columns_for_mean = combined_df.columns.difference([sum_col, timestamp_col])
+    aggregated_mean = combined_df.groupby(timestamp_col)[columns_for_mean].mean(numeric_only=True)
+    return pd.concat([aggregated_sum, aggregated_mean], axis=1).reset_index()
+
+
+def create_aggregated_df(csv_dir, timestamp_col='timestamp', sum_col='Active_Power', chunksize=100_000, freq='1h', workers=1):
+    """
+    site 파일들을 시각별로 합침: sum_col은 합 (결측은 0), 나머지 숫자 열은 평균 (결측 제외).
+    파일을 chunksize 행씩 읽어 freq 간격 격자 위의 합 / 개수에 누적하므로 메모리가 site 수에 비례하지 않는다.
+    workers > 1 이면 파일을 순서대로 나눠 process pool에서 누적한 뒤 합친다
+    (합하는 순서가 달라져 순차 실행과 마지막 자리 반올림 정도 차이가 날 수 있음).
+
+    모든 시각이 첫 시각 기준 freq 간격 격자 위에 있어야 한다. site마다 정시 기준이 다르거나 (예: 00분 / 30분)
+    간격이 freq와 맞지 않으면 경고를 출력하고 기존 in-memory 방식으로 다시 계산한다 (메모리 제한 없음).
+    """
+    file_paths = [os.path.join(csv_dir, f) for f in sorted(os.listdir(csv_dir)) if f.endswith('.csv')]
+    try:
+        return _aggregate_streaming(file_paths, timestamp_col, sum_col, chunksize, pd.Timedelta(freq).value, workers)
+    except _OffGridError as e:
+        print(f"Warning: {e} Falling back to in-memory aggregation for {csv_dir}")
+        return create_aggregated_df_in_memory(file_paths, timestamp_col, sum_col)
+
+
+def reset_directory(dir_path):
+    shutil.rmtree(dir_path, ignore_errors=True)
+    os.makedirs(dir_path, exist_ok=True)
+
+
+def finalize_dataset(dataset_name, variant, data_root=None, report=True, workers=1):
+    """
+    aggregate dataset 생성 및 check_data / correlation plot 기록.
+    workers는 create_aggregated_df에 그대로 넘긴다 (> 1 이면 순차 실행과 마지막 자리 반올림 정도 차이가 날 수 있음).
+    """
+    rules = get_rules(dataset_name, variant)
+    _, save_dir, each_dir, log_dir = dataset_paths(dataset_name, variant, data_root)
+    if rules['aggregate']:
+        reset_directory(save_dir)
+        aggregated_df = create_aggregated_df(each_dir, workers=workers)
+        max_active_power = aggregated_df['Active_Power'].max(skipna=True)
+        write_csv_atomic(aggregated_df, os.path.join(save_dir, f'{max_active_power}_{dataset_name}.csv'))
+    if report:
+        from utils import check_data, plot_correlation_each
+        reset_directory(log_dir)
+        check_data.process_data_and_log(folder_path=save_dir,
+                                        log_file_path=os.path.join(log_dir, 'processed_data_info.txt'))
+        plot_correlation_each.plot_feature_vs_active_power(data_dir=save_dir, save_dir=log_dir, dataset_name=dataset_name)
+
+
+def run(dataset_names, variant, workers=0, data_root=None, report=True, full=False):
+    """
+    dataset들의 파일을 process pool에서 처리.
+    파일별 작업을 한 pool에 모두 넣으므로 작은 dataset이 먼저 끝나도 core가 놀지 않는다.
+    workers <= 0 이면 CPU 수, 1 이면 현재 프로세스에서 순차 실행.
+
+    dataset마다 manifest (입력 파일 크기 / hash, 규칙 version, 처리한 행 범위)를 두고 바뀐 파일이나
+    이어 붙은 구간만 처리한다. 바뀐 파일이 없는 dataset은 aggregate / report도 다시 만들지 않는다.
+    full=True 이거나 manifest가 없으면 출력 폴더를 비우고 전체를 처리한다.
+    """
+    tasks = []
+    manifests = {}
+    rebuild = set()
+    for dataset_name in dataset_names:
+        input_dir, save_dir, each_dir, _ = dataset_paths(dataset_name, variant, data_root)
+        output_dir = each_dir or save_dir
+        manifest = None if full else load_manifest(manifest_path(dataset_name, variant, data_root))
+        if manifest is None:
+            reset_directory(output_dir)
+            manifest = {}
+            rebuild.add(dataset_name)
+        file_names = sorted(f for f in os.listdir(input_dir) if f.endswith('.csv'))
+        # 입력에서 사라진 파일의 출력 삭제
+        for file_name in set(manifest) - set(file_names):
+            output_path = os.path.join(output_dir, manifest.pop(file_name)['output'])
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            rebuild.add(dataset_name)
+        manifests[dataset_name] = manifest
+        tasks += [(dataset_name, variant, os.path.join(input_dir, f), output_dir, manifest.get(f)) for f in file_names]
+
+    workers = workers if workers > 0 else os.cpu_count()
+    start = time.perf_counter()
+    results = []
+
+    def collect(stats, entry):
+        manifests[stats['dataset']][stats['file']] = entry
+        results.append(stats)
+        if stats['mode'] != 'unchanged':
+            print(f"Processed and saved ({stats['mode']}): {stats['output']} "
+                  f"({stats['rows_in']} -> {stats['rows_out']} rows, {stats['sec']:.1f}s)")
+
+    if workers == 1:
+        for task in tasks:
+            collect(*process_file(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(process_file, *task) for task in tasks]:
+                collect(*future.result())
+    modes = collections.Counter(stats['mode'] for stats in results)
+    print(f"Processed {len(results)} files from {len(dataset_names)} datasets in {time.perf_counter() - start:.1f}s "
+          f"({workers} workers; " + ', '.join(f'{mode} {count}' for mode, count in sorted(modes.items())) + ')')
+
+    for dataset_name in dataset_names:
+        save_manifest(manifest_path(dataset_name, variant, data_root), manifests[dataset_name])
+        changed = any(stats['mode'] != 'unchanged' for stats in results if stats['dataset'] == dataset_name)
+        if changed or dataset_name in rebuild:
+            finalize_dataset(dataset_name, variant, data_root, report, workers=workers)
+    return results
@@ -0,0 +1,145 @@
+import os
+import csv
+import json
+import time
+import resource
+
+import torch
+
+
+def current_rss_mb():
+    """현재 프로세스의 RSS (MB). /proc이 없으면 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+class StageTimer:
+    """
+    학습 / 평가 loop의 step별 구간 시간을 기록하는 가벼운 profiler (--profile).
+
+    loop 안에서 구간이 끝날 때마다 lap(stage)을 호출하면 직전 lap 이후 경과 시간이 그 stage에 더해진다.
+    begin_step()은 이전 step이 끝난 뒤부터의 시간을 'data' (DataLoader 대기)로 기록한다.
+    GPU에서는 비동기 실행 때문에 lap마다 synchronize 해야 구간 시간이 맞으므로 --profile 일 때만 켠다.
+
+    end_epoch()은 step별 timeline과 요약 (stage별 합계, samples/sec, epoch 중 peak RSS, peak device memory)을
+    out_dir/profile_{phase}_epoch{N}.json / .csv 로 저장한다.
+    trace_steps=(start, stop) 이면 첫 epoch의 [start, stop) step 구간을 torch.profiler로 잡아 chrome trace로 저장한다.
+    enabled=False 이면 모든 메서드가 아무것도 하지 않는다.
+
+    epoch_peak_rss_mb는 step이 끝날 때마다 /proc/self/statm으로 잰 현재 RSS의 최대값 (Linux 외에서는 None),
+    process_peak_rss_mb는 ru_maxrss로 dataset 생성 등을 포함한 프로세스 시작 이후 전체의 peak (줄어들지 않음).
+    """
+    STAGES = ('data', 'h2d', 'forward', 'backward', 'optimizer', 'checkpoint', 'other')
+
+    def __init__(self, phase, out_dir, device, enabled=True, trace_steps=None):
+        self.phase = phase
+        self.out_dir = out_dir
+        self.device = device
+        self.enabled = enabled
+        self.trace_steps = trace_steps
+        self.epoch = 0
+        self.trace = None
+        self.traced = False
+        self.start_epoch()
+
+    def start_epoch(self):
+        """epoch (또는 평가 1회) 시작 시 호출. 이전 기록을 비우고 시간 / peak memory 측정을 다시 시작"""
+        self.rows = []
+        self.current = None
+        self.step_idx = 0
+        self.epoch_start = time.perf_counter()
+        self.last = self.epoch_start
+        self.epoch_peak_rss = current_rss_mb() if self.enabled else None
+        if self.enabled and self.device.type == 'cuda':
+            torch.cuda.reset_peak_memory_stats(self.device)
+
+    def _now(self):
+        if self.device.type == 'cuda':
+            torch.cuda.synchronize(self.device)
+        return time.perf_counter()
+
+    def begin_step(self):
+        if not self.enabled:
+            return
+        if self.trace_steps is not None and not self.traced and self.step_idx == self.trace_steps[0]:
+            self.trace = torch.profiler.profile(record_shapes=True, profile_memory=True)
+            self.trace.__enter__()
+        now = self._now()
+        self.current = dict.fromkeys(self.STAGES, 0.0)
+        self.current['data'] = now - self.last
+        self.last = now
+
+    def lap(self, stage):
+        if not self.enabled or self.current is None:
+            return
+        now = self._now()
+        self.current[stage] += now - self.last
+        self.last = now
+
+    def end_step(self, num_samples):
+        if not self.enabled or self.current is None:
+            return
+        self.lap('other')
+        self.rows.append(dict(step=self.step_idx, samples=num_samples, **self.current))
+        rss = current_rss_mb()
+        if rss is not None:
+            self.epoch_peak_rss = max(self.epoch_peak_rss or 0.0, rss)
+        self.current = None
+        self.step_idx += 1
+        if self.trace is not None and self.step_idx >= self.trace_steps[1]:
+            self._stop_trace()
+
+    def _stop_trace(self):
+        self.trace.__exit__(None, None, None)
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.trace.export_chrome_trace(os.path.join(self.out_dir, f'trace_{self.phase}_epoch{self.epoch}.json'))
+        self.trace = None
+        self.traced = True
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.epoch_start
+        num_samples = sum(row['samples'] for row in self.rows)
+        summary = {
+            'phase': self.phase,
+            'epoch': self.epoch,
+            'steps': len(self.rows),
+            'samples': num_samples,
+            'elapsed_sec': elapsed,
+            'samples_per_sec': num_samples / elapsed if elapsed > 0 else 0.0,
+            'stage_sec': {stage: sum(row[stage] for row in self.rows) for stage in self.STAGES},
+            'epoch_peak_rss_mb': self.epoch_peak_rss,
+            # Linux에서 ru_maxrss 단위는 KB
+            'process_peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'peak_device_mem_mb': (torch.cuda.max_memory_allocated(self.device) / 2 ** 20
+                                   if self.device.type == 'cuda' else None),
+        }
+        return summary
+
+    def end_epoch(self):
+        """현재 epoch의 timeline을 저장하고 요약을 돌려줌"""
+        if not self.enabled:
+            return None
+        if self.trace is not None:
+            self._stop_trace()
+        summary = self.summary()
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f'profile_{self.phase}_epoch{self.epoch}')
+        with open(path + '.json', 'w') as f:
+            json.dump({'summary': summary, 'timeline': self.rows}, f, indent=2)
+        with open(path + '.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['step', 'samples', *self.STAGES])
+            writer.writeheader()
+            writer.writerows(self.rows)
+
+        stages = ', '.join(f'{stage} {sec:.2f}s' for stage, sec in summary['stage_sec'].items() if sec > 0)
+        print(f"[profile] {self.phase} epoch {self.epoch}: {summary['samples_per_sec']:.1f} samples/s | {stages} | "
+              + (f"epoch peak RSS {summary['epoch_peak_rss_mb']:.0f} MB, " if summary['epoch_peak_rss_mb'] is not None else '')
+              + f"process peak RSS {summary['process_peak_rss_mb']:.0f} MB"
+              + (f", peak device {summary['peak_device_mem_mb']:.0f} MB" if summary['peak_device_mem_mb'] is not None else ''))
+        self.epoch += 1
+        self.start_epoch()
+        return summary
@@ -0,0 +1,81 @@
+import torch
+
+
+def ridge_memory_bytes(n_features):
+    """
+    solve_ridge까지 필요한 dense float64 (n_features + 1)^2 행렬 메모리:
+    train / val Gram 행렬, 중심화한 C, 고유벡터 Q
+    """
+    return 4 * (n_features + 1) ** 2 * 8
+
+
+class RidgeStats:
+    """
+    가중 최소제곱을 위한 충분 통계량을 배치 단위로 누적 (float64).
+    feature h에 bias 항 1을 붙인 x = [h, 1]에 대해 gram = Σ w x xᵀ, cross = Σ w x tᵀ, tt = Σ w ||t||² 를 저장한다.
+    """
+    def __init__(self, n_features, n_targets, device):
+        self.gram = torch.zeros(n_features + 1, n_features + 1, dtype=torch.float64, device=device)
+        self.cross = torch.zeros(n_features + 1, n_targets, dtype=torch.float64, device=device)
+        self.tt = torch.zeros((), dtype=torch.float64, device=device)
+        self.weight_sum = torch.zeros((), dtype=torch.float64, device=device)
+        self.n = 0
+
+    def update(self, h, t, w):
+        """
+        h: [bs x n_features], t: [bs x n_targets], w: [bs] 샘플 가중치
+        """
+        h, t, w = h.double(), t.double(), w.double()
+        sw = w.sqrt()[:, None]
+        x = torch.cat([h, torch.ones_like(h[:, :1])], dim=1) * sw
+        t = t * sw
+        self.gram += x.T @ x
+        self.cross += x.T @ t
+        self.tt += (t * t).sum()
+        self.weight_sum += w.sum()
+        self.n += h.shape[0]
+
+
+def solve_ridge(train, val, lambdas=None):
+    """
+    train 통계량으로 bias는 규제하지 않는 ridge 해를 구하고, val 통계량으로 lambda를 고른다.
+    고유분해를 한 번만 하고 lambda마다 val 가중 MSE를 닫힌 형태로 계산한다.
+
+    Args:
+        train, val (RidgeStats)
+        lambdas (list, optional): 후보 lambda. 없으면 feature 분산 평균 기준 10^-6 ~ 10^2 배
+
+    Returns:
+        weight [n_targets x n_features], bias [n_targets], best lambda, [(lambda, val mse), ...]
+    """
+    d = train.gram.shape[0] - 1
+    n_targets = train.cross.shape[1]
+
+    # intercept를 규제하지 않도록 가중 평균으로 중심화
+    W = train.weight_sum
+    mu_h = train.gram[:d, d] / W
+    mu_t = train.cross[d] / W
+    C = train.gram[:d, :d] - W * torch.outer(mu_h, mu_h)
+    Rc = train.cross[:d] - W * torch.outer(mu_h, mu_t)
+
+    evals, Q = torch.linalg.eigh(C)
+    evals = evals.clamp(min=0)
+    QR = Q.T @ Rc
+    if lambdas is None:
+        scale = evals.mean().item()
+        lambdas = [scale * 10.0 ** k for k in range(-6, 3)]
+
+    results = []
+    best = None
+    for lam in lambdas:
+        beta = Q @ (QR / (evals + lam)[:, None])                        # [d x n_targets]
+        bias = mu_t - beta.T @ mu_h                                      # [n_targets]
+        A = torch.cat([beta, bias[None]], dim=0)                         # [(d+1) x n_targets]
+        sse = val.tt - 2 * (A * val.cross).sum() + (A * (val.gram @ A)).sum()
+        mse = (sse / (val.n * n_targets)).item()
+        results.append((lam, mse))
+        if best is None or mse < best[0]:
+            best = (mse, lam, beta, bias)
+
+    _, best_lambda, beta, bias = best
+    return beta.T.float(), bias.float(), best_lambda, results
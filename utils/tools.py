@@ -47,9 +47,11 @@ def adjust_learning_rate(optimizer, scheduler, epoch, args, printout=True):
 
 
 class EarlyStopping:
-    def __init__(self, patience=7, verbose=False, delta=0):
+    def __init__(self, patience=7, verbose=False, delta=0, save=True, checkpoint_manager=None):
         self.patience = patience
         self.verbose = verbose
+        self.save = save  # 분산 학습에서는 rank 0만 checkpoint를 씀
+        self.checkpoint_manager = checkpoint_manager  # 있으면 background thread에서 저장
         self.counter = 0
         self.best_score = None
         self.early_stop = False
@@ -75,11 +77,53 @@ class EarlyStopping:
     def save_checkpoint(self, val_loss, model, path):
         if self.verbose:
             print(f'Validation loss decreased ({self.val_loss_min:.6f} --> {val_loss:.6f}).  Saving model ...')
-        torch.save(model.state_dict(), path + '/' + 'checkpoint.pth')
+        self._save(model, path, 'checkpoint.pth')
         self.val_loss_min = val_loss
 
     def save_latest_checkpoint(self, val_loss, model, path):
-        torch.save(model.state_dict(), path + '/' + 'model_latest.pth')
+        self._save(model, path, 'model_latest.pth')
+
+    def _save(self, model, path, filename):
+        if not self.save:
+            return
+        state_dict = unwrap_model(model).state_dict()
+        if self.checkpoint_manager is not None:
+            self.checkpoint_manager.save(filename, state_dict)
+        else:
+            torch.save(state_dict, path + '/' + filename)
+
+    def state_dict(self):
+        return {'counter': self.counter, 'best_score': self.best_score,
+                'early_stop': self.early_stop, 'val_loss_min': self.val_loss_min}
+
+    def load_state_dict(self, state):
+        self.counter = state['counter']
+        self.best_score = state['best_score']
+        self.early_stop = state['early_stop']
+        self.val_loss_min = state['val_loss_min']
+
+
+def unwrap_model(model):
+    """DDP로 감싼 모델이면 내부 모듈을 돌려줌 (checkpoint key에 'module.'이 붙지 않도록)"""
+    return model.module if isinstance(model, torch.nn.parallel.DistributedDataParallel) else model
+
+
+class SyncCounter:
+    """
+    학습 / 평가 loop에서 명시적으로 device tensor를 host 값으로 가져오는 (.item()) 횟수를 센다.
+    loop의 host 동기화는 모두 item()을 거치도록 해서, 매 step 동기화가 다시 들어가는 회귀를 epoch별 횟수로 확인한다.
+    이 counter를 거치지 않는 동기화 (예: 새로 추가한 bare .item() / .cpu())는 세지 않으므로,
+    CUDA에서 숨은 동기화까지 찾으려면 --sync_debug (torch.cuda.set_sync_debug_mode)를 함께 사용한다.
+    """
+    def __init__(self):
+        self.count = 0
+
+    def item(self, tensor):
+        self.count += 1
+        return tensor.item()
+
+    def reset(self):
+        self.count = 0
 
 
 class dotdict(dict):